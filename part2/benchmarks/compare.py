@@ -0,0 +1,83 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/new.json --threshold 0.1
+
+Exits with status 1 if any metric regressed by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+# Metrics where a larger value is better; every other numeric metric is lower-is-better
+HIGHER_IS_BETTER = {"rows_per_sec", "throughput_rps"}
+
+# Fields that identify a case rather than measure it
+KEY_FIELDS = ("rows", "mode", "concurrency", "batch_size", "requests", "dimension", "codec")
+
+IGNORED_FIELDS = {"records_processed", "file_mb", "status_codes"}
+
+
+def _case_key(case: Dict) -> Tuple:
+    return tuple((field, case[field]) for field in KEY_FIELDS if field in case)
+
+
+def compare(old: Dict, new: Dict, threshold: float) -> List[Dict]:
+    rows = []
+    for suite, new_cases in new.get("results", {}).items():
+        old_cases = {_case_key(c): c for c in old.get("results", {}).get(suite, [])}
+        for case in new_cases:
+            key = _case_key(case)
+            baseline = old_cases.get(key)
+            if baseline is None:
+                continue
+            for metric, value in case.items():
+                if metric in KEY_FIELDS or metric in IGNORED_FIELDS:
+                    continue
+                if not isinstance(value, (int, float)) or not isinstance(baseline.get(metric), (int, float)):
+                    continue
+                before = baseline[metric]
+                if before == 0:
+                    continue
+                change = (value - before) / before
+                worse = -change if metric in HIGHER_IS_BETTER else change
+                rows.append({
+                    "suite": suite,
+                    "case": dict(key),
+                    "metric": metric,
+                    "before": before,
+                    "after": value,
+                    "change_pct": round(change * 100, 2),
+                    "regression": worse > threshold,
+                })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative regression (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        old = json.load(f)
+    with open(args.candidate) as f:
+        new = json.load(f)
+
+    rows = compare(old, new, args.threshold)
+    for row in rows:
+        case = ",".join(f"{k}={v}" for k, v in row["case"].items())
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"{row['suite']:<10} {case:<40} {row['metric']:<16} "
+              f"{row['before']:>12} -> {row['after']:>12} ({row['change_pct']:+.1f}%) {flag}")
+
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Deterministic local stand-ins for Gemini, Pinecone and the LLM used by the benchmarks"""
+import asyncio
+import hashlib
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+EMBEDDING_DIMENSION = 768
+
+
+def fake_embedding(text: str, dimension: int = EMBEDDING_DIMENSION) -> List[float]:
+    """Unit vector derived from a hash of the text, identical across runs and processes"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector.tolist()
+
+
+class InjectedFault(Exception):
+    """Error raised by FaultInjector, carrying an HTTP status like the real SDK exceptions"""
+
+    def __init__(self, code: int):
+        super().__init__(f"Injected fault (HTTP {code})")
+        self.code = code
+
+
+class FaultInjector:
+    """Make a fraction of calls fail with an HTTP status and another fraction stall"""
+
+    def __init__(self, error_rate: float = 0.0, error_status: int = 503, slow_rate: float = 0.0,
+                 slow_latency: float = 1.0, seed: Optional[int] = None):
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.error_rate:
+            raise InjectedFault(self.error_status)
+        if roll < self.error_rate + self.slow_rate:
+            time.sleep(self.slow_latency)
+
+
+class FakeEmbeddings(Embeddings):
+    """LangChain embeddings stand-in with optional simulated network latency and faults"""
+
+    def __init__(self, model: str = "fake", google_api_key: Optional[str] = None,
+                 latency: float = 0.0, faults: Optional[FaultInjector] = None, **kwargs: Any):
+        self.model = model
+        self.latency = latency
+        self.faults = faults
+
+    def embed_documents(self, texts: List[str], **kwargs: Any) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.faults is not None:
+            self.faults()
+        return [fake_embedding(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+
+class FakeVectorIndex:
+    """In-memory cosine-similarity index shared by the fake Pinecone client and vector store"""
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION):
+        self.dimension = dimension
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors = np.zeros((0, dimension), dtype=np.float32)
+        self._metadata: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, vectors, namespace: Optional[str] = None, **kwargs: Any):
+        with self._lock:
+            new_rows = []
+            for vector_id, values, metadata in vectors:
+                row = np.asarray(values, dtype=np.float32)
+                if vector_id in self._positions:
+                    position = self._positions[vector_id]
+                    self._vectors[position] = row
+                    self._metadata[position] = dict(metadata or {})
+                else:
+                    self._positions[vector_id] = len(self._ids)
+                    self._ids.append(vector_id)
+                    self._metadata.append(dict(metadata or {}))
+                    new_rows.append(row)
+            if new_rows:
+                self._vectors = np.vstack([self._vectors, np.stack(new_rows)])
+        return {"upserted_count": len(vectors)}
+
+    def search(self, vector: List[float], top_k: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            if not self._ids:
+                return []
+            scores = self._vectors @ np.asarray(vector, dtype=np.float32)
+            top_k = min(top_k, len(self._ids))
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            best = best[np.argsort(-scores[best])]
+            return [
+                {"id": self._ids[i], "score": float(scores[i]), "metadata": self._metadata[i]}
+                for i in best
+            ]
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True,
+              namespace: Optional[str] = None, **kwargs: Any):
+        return _FakeQueryResponse(self.search(vector, top_k))
+
+
+class _FakeMatch(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class _FakeQueryResponse:
+    def __init__(self, matches):
+        self.matches = [_FakeMatch(match) for match in matches]
+
+
+# Single shared index so vectors written during ingestion are visible to query benchmarks
+VECTOR_INDEX = FakeVectorIndex()
+
+
+class FakePineconeClient:
+    """Drop-in for services.pinecone_client.PineconeClient"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.index = VECTOR_INDEX
+
+    async def init(self):
+        return None
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return fake_embedding(text)
+
+    async def upsert_vector(self, vector_id: str, text: str, metadata: Dict[str, Any] = None) -> bool:
+        embedding = await self.generate_embedding(text)
+        metadata = dict(metadata or {})
+        metadata.setdefault("text", text)
+        self.index.upsert([(vector_id, embedding, metadata)])
+        return True
+
+    async def upsert_batch(self, items: List[tuple]):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.index.upsert([
+            (vector_id, fake_embedding(text), {**(metadata or {}), "text": text})
+            for vector_id, text, metadata in items
+        ])
+
+    async def query(self, query_text: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        return self.index.search(await self.generate_embedding(query_text), top_k)
+
+
+class FakeVectorStore:
+    """Drop-in for langchain_pinecone.PineconeVectorStore backed by the shared fake index"""
+
+    def __init__(self, index_name: Optional[str] = None, embedding: Optional[Embeddings] = None,
+                 namespace: Optional[str] = None, **kwargs: Any):
+        self.embedding = embedding or FakeEmbeddings()
+        self.index = VECTOR_INDEX
+
+    def add_texts(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None, **kwargs: Any):
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [str(uuid.uuid4()) for _ in texts]
+        vectors = self.embedding.embed_documents(list(texts))
+        self.index.upsert([
+            (vector_id, vector, {**metadata, "text": text})
+            for vector_id, vector, metadata, text in zip(ids, vectors, metadatas, texts)
+        ])
+        return ids
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        matches = self.index.search(embedding, k)
+        return [
+            Document(page_content=match["metadata"].get("text", ""), metadata=match["metadata"])
+            for match in matches
+        ]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search(query, k, **kwargs)
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(embedding, k, **kwargs)
+
+
+BENCHMARK_SQL = (
+    "SELECT COUNT(*), SUM(premium), AVG(sum_insured) FROM insurance_policies "
+    "WHERE premium > 0"
+)
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted chat model that drives both the SQL agent and the ReAct agent through one tool round.
+
+    - Text ReAct prompts (the SQL agent) get an `sql_db_query` action, then a final answer
+      quoting the observation.
+    - Tool-calling prompts (the LangGraph agent) get one `sql_query` and one `rag_search`
+      call, then a final answer built from the tool results.
+    """
+
+    latency: float = 0.0
+    model: str = "fake-chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        text = str(last.content)
+        usage = {"input_tokens": sum(len(str(m.content)) // 4 for m in messages), "output_tokens": 32}
+
+        if "sql_db_query" in text and "Action Input" in text:
+            # Text-based ReAct loop used by create_sql_agent
+            if "Observation:" in text.rsplit("Question:", 1)[-1]:
+                observation = text.rsplit("Observation:", 1)[-1].split("Thought:")[0].strip()
+                return AIMessage(content=f" I now know the final answer\nFinal Answer: {observation}",
+                                 usage_metadata={**usage, "total_tokens": sum(usage.values())})
+            return AIMessage(
+                content=f" I should query the policy table.\nAction: sql_db_query\nAction Input: {BENCHMARK_SQL}",
+                usage_metadata={**usage, "total_tokens": sum(usage.values())},
+            )
+
+        if isinstance(last, ToolMessage):
+            results = [str(m.content)[:200] for m in messages if isinstance(m, ToolMessage)]
+            return AIMessage(content="Answer based on: " + " | ".join(results),
+                             usage_metadata={**usage, "total_tokens": sum(usage.values())})
+
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {"name": "sql_query", "args": {"__arg1": text}, "id": f"call_{uuid.uuid4().hex[:8]}"},
+                {"name": "rag_search", "args": {"__arg1": text}, "id": f"call_{uuid.uuid4().hex[:8]}"},
+            ],
+            usage_metadata={**usage, "total_tokens": sum(usage.values())},
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+
+def install(llm_latency: float = 0.0, embedding_latency: float = 0.0,
+            embedding_faults: Optional[FaultInjector] = None):
+    """Swap the remote Gemini/Pinecone clients for local fakes.
+
+    Must run before any `src` module is imported, because the application binds these
+    classes at import time.
+    """
+    import langchain_google_genai
+    import langchain_pinecone
+
+    class _ChatModel(FakeChatModel):
+        def __init__(self, **kwargs: Any):
+            super().__init__(latency=llm_latency, callbacks=kwargs.get("callbacks"),
+                             model=kwargs.get("model", "fake-chat"))
+
+    class _Embeddings(FakeEmbeddings):
+        def __init__(self, **kwargs: Any):
+            super().__init__(latency=embedding_latency, faults=embedding_faults, **kwargs)
+
+    langchain_google_genai.ChatGoogleGenerativeAI = _ChatModel
+    langchain_pinecone.PineconeVectorStore = FakeVectorStore
+
+    import src.services.embeddings as embeddings
+    import src.services.vector_outbox as vector_outbox
+    from src.utils.resilience import gemini_embeddings
+
+    class _Provider(_Embeddings):
+        name = "fake"
+        dimension = EMBEDDING_DIMENSION
+        batch_size = 100
+        dependency = gemini_embeddings
+
+    embeddings.PROVIDERS[embeddings.settings.EMBEDDING_PROVIDER] = _Provider
+
+    vector_outbox.PineconeClient = lambda: FakePineconeClient(latency=embedding_latency)
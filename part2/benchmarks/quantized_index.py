@@ -0,0 +1,273 @@
+"""Quantized vector index prototype, evaluated by the `quantization` benchmark suite.
+
+Not used by the service: it measures what an in-process compact copy of the policy embeddings
+would cost in memory and recall before one is wired in.
+
+Vectors are stored as int8 scalar-quantized codes (4x smaller than float32) or product-quantized
+codes (dimension / subspace_dim bytes per vector). Search scores every vector against the
+compact codes, then rescores the best `rescore_k` candidates with full-precision vectors read
+from a memory-mapped float32 file or fetched through a callback (e.g. from Pinecone), so
+ranking quality is close to exact search while resident memory stays small.
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ScalarQuantizer:
+    """Per-dimension affine int8 quantization trained from the min/max of a sample"""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.offset: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    @property
+    def code_size(self) -> int:
+        return self.dimension
+
+    def train(self, vectors: np.ndarray):
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        self.scale = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+        self.offset = low.astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self.offset) / self.scale) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return (codes.astype(np.float32) + 128) * self.scale + self.offset
+
+    def scores(self, query: np.ndarray, codes: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Inner product of `query` with every decoded vector, without decoding them all at once"""
+        # q . ((c + 128) * s + o) = (q * s) . c + 128 * sum(q * s) + q . o
+        weighted = (query * self.scale).astype(np.float32)
+        constant = 128.0 * float(weighted.sum()) + float(query @ self.offset)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), chunk_size):
+            block = codes[start:start + chunk_size].astype(np.float32)
+            out[start:start + chunk_size] = block @ weighted + constant
+        return out
+
+
+class ProductQuantizer:
+    """Split vectors into `n_subspaces` chunks and encode each as one of 256 k-means centroids"""
+
+    def __init__(self, dimension: int, n_subspaces: int = 96, n_iterations: int = 15, seed: int = 0):
+        if dimension % n_subspaces:
+            raise ValueError(f"dimension {dimension} is not divisible by n_subspaces {n_subspaces}")
+        self.dimension = dimension
+        self.n_subspaces = n_subspaces
+        self.sub_dimension = dimension // n_subspaces
+        self.n_iterations = n_iterations
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None  # (n_subspaces, 256, sub_dimension)
+
+    @property
+    def code_size(self) -> int:
+        return self.n_subspaces
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.n_subspaces, self.sub_dimension)
+
+    def train(self, vectors: np.ndarray):
+        rng = np.random.default_rng(self.seed)
+        parts = self._split(vectors.astype(np.float32))
+        n_centroids = min(256, len(vectors))
+        codebooks = np.zeros((self.n_subspaces, 256, self.sub_dimension), dtype=np.float32)
+        for m in range(self.n_subspaces):
+            data = parts[:, m, :]
+            centroids = data[rng.choice(len(data), n_centroids, replace=False)].copy()
+            for _ in range(self.n_iterations):
+                assignment = self._nearest(data, centroids)
+                sums = np.stack([
+                    np.bincount(assignment, weights=data[:, d], minlength=n_centroids)
+                    for d in range(self.sub_dimension)
+                ], axis=1)
+                counts = np.bincount(assignment, minlength=n_centroids)[:, None]
+                empty = counts[:, 0] == 0
+                centroids = np.where(empty[:, None], centroids, sums / np.maximum(counts, 1)).astype(np.float32)
+            codebooks[m, :n_centroids] = centroids
+        self.codebooks = codebooks
+
+    @staticmethod
+    def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = (
+            (data ** 2).sum(axis=1)[:, None]
+            - 2 * data @ centroids.T
+            + (centroids ** 2).sum(axis=1)[None, :]
+        )
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(vectors.astype(np.float32))
+        codes = np.empty((len(vectors), self.n_subspaces), dtype=np.uint8)
+        for m in range(self.n_subspaces):
+            codes[:, m] = self._nearest(parts[:, m, :], self.codebooks[m])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self.codebooks[np.arange(self.n_subspaces)[None, :], codes]
+        return parts.reshape(len(codes), self.dimension)
+
+    def scores(self, query: np.ndarray, codes: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Asymmetric distance computation: one 256-entry lookup table per subspace"""
+        tables = np.einsum("msd,md->ms", self.codebooks, self._split(query[None, :])[0])
+        out = np.empty(len(codes), dtype=np.float32)
+        columns = np.arange(self.n_subspaces)
+        for start in range(0, len(codes), chunk_size):
+            block = codes[start:start + chunk_size]
+            out[start:start + chunk_size] = tables[columns, block].sum(axis=1)
+        return out
+
+
+class QuantizedVectorIndex:
+    """Inner-product search over quantized codes with full-precision rescoring of the top candidates.
+
+    Full-precision vectors come from `full_precision_path` (a float32 memmap written alongside the
+    codes, so only the rows touched during rescoring are paged in) or from `fetch_vectors`, a
+    callback returning float32 vectors for a list of ids. Without either, results are ranked by
+    the approximate scores alone.
+    """
+
+    # Candidates rescored per requested result when rescore_k is not given; PQ codes are much
+    # coarser than int8 ones, so the true neighbours sit further down the approximate ranking
+    RESCORE_FACTOR = {"int8": 4, "pq": 32}
+
+    def __init__(self, dimension: int, codec: str = "int8",
+                 n_subspaces: int = 96, full_precision_path: Optional[str] = None,
+                 fetch_vectors: Optional[Callable[[List[str]], np.ndarray]] = None):
+        if codec == "int8":
+            self.quantizer = ScalarQuantizer(dimension)
+        elif codec == "pq":
+            self.quantizer = ProductQuantizer(dimension, n_subspaces)
+        else:
+            raise ValueError(f"Unknown codec '{codec}', expected 'int8' or 'pq'")
+        self.dimension = dimension
+        self.codec = codec
+        self.full_precision_path = full_precision_path
+        self.fetch_vectors = fetch_vectors
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.codes: Optional[np.ndarray] = None
+        self._full: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, ids: Sequence[str], vectors: np.ndarray,
+              metadata: Optional[Sequence[Dict[str, Any]]] = None, train_sample: int = 50000):
+        """Train the quantizer on (a sample of) the vectors and encode all of them"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {vectors.shape[1]}")
+        sample = vectors
+        if len(vectors) > train_sample:
+            rows = np.random.default_rng(0).choice(len(vectors), train_sample, replace=False)
+            sample = vectors[rows]
+        self.quantizer.train(sample)
+        self.codes = self.quantizer.encode(vectors)
+        self.ids = list(ids)
+        self.metadata = list(metadata) if metadata is not None else [{} for _ in self.ids]
+
+        if self.full_precision_path:
+            full = np.lib.format.open_memmap(self.full_precision_path, mode="w+", dtype=np.float32,
+                                             shape=vectors.shape)
+            full[:] = vectors
+            full.flush()
+            del full
+            self._full = np.load(self.full_precision_path, mmap_mode="r")
+        logger.info(
+            f"Built {self.codec} index over {len(self.ids)} vectors "
+            f"({self.bytes_per_vector():.0f} bytes/vector resident)"
+        )
+
+    def bytes_per_vector(self) -> float:
+        return float(self.quantizer.code_size * np.dtype(np.int8).itemsize)
+
+    def resident_bytes(self) -> int:
+        """Bytes held in memory by the codes (full-precision vectors stay on disk)"""
+        return int(self.codes.nbytes) if self.codes is not None else 0
+
+    def _full_precision(self, positions: np.ndarray) -> Optional[np.ndarray]:
+        if self._full is not None:
+            return np.asarray(self._full[np.sort(positions)])[np.argsort(np.argsort(positions))]
+        if self.fetch_vectors is not None:
+            return np.asarray(self.fetch_vectors([self.ids[p] for p in positions]), dtype=np.float32)
+        return None
+
+    def search(self, query: Sequence[float], k: int = 5, rescore_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Top-k by inner product (cosine for normalized embeddings)"""
+        if self.codes is None or not self.ids:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        approx = self.quantizer.scores(query, self.codes)
+
+        n_candidates = min(len(self.ids), max(k, rescore_k if rescore_k is not None else self.RESCORE_FACTOR[self.codec] * k))
+        candidates = np.argpartition(-approx, n_candidates - 1)[:n_candidates]
+        scores = approx[candidates]
+
+        full = self._full_precision(candidates) if rescore_k != 0 else None
+        if full is not None:
+            scores = full @ query
+
+        order = np.argsort(-scores)[:k]
+        return [
+            {"id": self.ids[candidates[i]], "score": float(scores[i]), "metadata": self.metadata[candidates[i]]}
+            for i in order
+        ]
+
+    def save(self, path: str):
+        """Write codes, ids, metadata and quantizer state to an .npz file (no pickled objects)"""
+        np.savez(path, codec=np.asarray(self.codec), codes=self.codes, ids=np.asarray(self.ids, dtype=np.str_),
+                 metadata=np.asarray(json.dumps(self.metadata)), **self._quantizer_state())
+
+    def _quantizer_state(self) -> Dict[str, np.ndarray]:
+        if isinstance(self.quantizer, ScalarQuantizer):
+            return {"offset": self.quantizer.offset.astype(np.float32), "scale": self.quantizer.scale.astype(np.float32)}
+        return {"codebooks": self.quantizer.codebooks.astype(np.float32)}
+
+    @classmethod
+    def load(cls, path: str, dimension: int, codec: str = "int8", **kwargs) -> "QuantizedVectorIndex":
+        index = cls(dimension=dimension, codec=codec, **kwargs)
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["codec"]) != codec:
+                raise ValueError(f"{path} holds a {data['codec']} index, not {codec}")
+            if data["codes"].shape[1] != index.quantizer.code_size:
+                raise ValueError(
+                    f"{path} holds {data['codes'].shape[1]}-byte codes, expected {index.quantizer.code_size}"
+                )
+            index.codes = data["codes"]
+            index.ids = data["ids"].tolist()
+            index.metadata = json.loads(str(data["metadata"]))
+            if codec == "int8":
+                index.quantizer.offset, index.quantizer.scale = data["offset"], data["scale"]
+            else:
+                index.quantizer.codebooks = data["codebooks"]
+        if index.full_precision_path and os.path.exists(index.full_precision_path):
+            index._full = np.load(index.full_precision_path, mmap_mode="r")
+        return index
+
+
+def exact_search(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def evaluate_recall(index: QuantizedVectorIndex, vectors: np.ndarray, queries: np.ndarray,
+                    k: int = 10, rescore_k: Optional[int] = None) -> float:
+    """Average recall@k of `index` against exact search over the original vectors"""
+    position = {vector_id: i for i, vector_id in enumerate(index.ids)}
+    hits = 0
+    for query in queries:
+        truth = set(exact_search(vectors, query, k).tolist())
+        found = {position[result["id"]] for result in index.search(query, k, rescore_k)}
+        hits += len(truth & found)
+    return hits / (k * len(queries))
@@ -0,0 +1,490 @@
+"""Benchmark runner for ingestion, /query, DB upserts, the quantized vector index, the policy period index, split validation and remote-call resilience.
+
+Remote dependencies (Gemini, Pinecone) are replaced by the deterministic fakes in
+`benchmarks.fakes`; PostgreSQL is real and taken from the usual DB_* settings, so point
+them at a disposable local database.
+
+Usage:
+    python -m benchmarks.run --suites ingest,query,db_upsert --sizes 1k,100k
+    python -m benchmarks.run --sizes 1m --output benchmarks/results/nightly.json
+    python -m benchmarks.run --suites quantization --sizes 10k,100k
+    python -m benchmarks.run --suites resilience --fault-rate 0.1 --slow-rate 0.05
+    python -m benchmarks.run --suites period_index --sizes 100k,1m
+    python -m benchmarks.run --suites validation --sizes 1m
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench-password"
+
+QUESTIONS = [
+    "What is the total premium across all policies?",
+    "Which policies have a sum insured above 1 billion?",
+    "Show policies for DANGOTE CEMENT PLC",
+    "What is the average own retention premium?",
+    "Which policies expire in the next 30 days?",
+]
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    multiplier = 1
+    if value.endswith("k"):
+        multiplier, value = 1_000, value[:-1]
+    elif value.endswith("m"):
+        multiplier, value = 1_000_000, value[:-1]
+    return int(float(value) * multiplier)
+
+
+def reset_peak_rss():
+    """Reset the kernel's high-water mark so each case reports its own peak (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+async def reset_table():
+    from sqlalchemy import text
+    from src.database import AsyncSessionLocal
+    from src.main import run_database_migrations
+
+    await run_database_migrations()
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("TRUNCATE insurance_policies, vector_outbox, exposure_accumulators"))
+        await session.commit()
+
+
+async def bench_ingest(sizes: List[int], seed: int) -> List[Dict]:
+    from benchmarks.workbook import cached_workbook
+    from src.database import AsyncSessionLocal
+    from src.services.ingestion import ingest_excel_data
+    from src.services.vector_outbox import outbox_drainer
+
+    results = []
+    for n_rows in sizes:
+        path = cached_workbook(DATA_DIR, n_rows, seed)
+        with open(path, "rb") as f:
+            content = f.read()
+        await reset_table()
+
+        reset_peak_rss()
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            response = await ingest_excel_data(session, content, os.path.basename(path))
+        elapsed = time.perf_counter() - started
+
+        # Vectors are synced by the outbox drainer after commit; drain here so queries can find them
+        sync_started = time.perf_counter()
+        await outbox_drainer.drain_pending()
+        sync_elapsed = time.perf_counter() - sync_started
+
+        results.append({
+            "rows": n_rows,
+            "records_processed": response.get("records_processed"),
+            "seconds": round(elapsed, 4),
+            "vector_sync_seconds": round(sync_elapsed, 4),
+            "rows_per_sec": round(n_rows / elapsed, 2),
+            "peak_rss_mb": round(peak_rss_mb(), 2),
+            "file_mb": round(len(content) / (1024 * 1024), 2),
+        })
+        print(f"ingest rows={n_rows}: {results[-1]}")
+    return results
+
+
+async def bench_query(concurrency_levels: List[int], requests_per_level: int) -> List[Dict]:
+    import httpx
+    from src.main import app
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 auth=(BENCH_USERNAME, BENCH_PASSWORD), timeout=None) as client:
+        for concurrency in concurrency_levels:
+            latencies: List[float] = []
+            statuses: Dict[int, int] = {}
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(i: int):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/query", json={"question": QUESTIONS[i % len(QUESTIONS)]})
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(requests_per_level)))
+            elapsed = time.perf_counter() - started
+
+            results.append({
+                "concurrency": concurrency,
+                "requests": requests_per_level,
+                "throughput_rps": round(requests_per_level / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+                "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+            })
+            print(f"query concurrency={concurrency}: {results[-1]}")
+    return results
+
+
+async def bench_db_upsert(sizes: List[int], seed: int, batch_size: int) -> List[Dict]:
+    from sqlalchemy import text
+    from benchmarks.workbook import generate_rows
+    from src.database import AsyncSessionLocal
+
+    results = []
+    for n_rows in sizes:
+        rows = generate_rows(n_rows, seed)
+        columns = list(rows[0].keys())
+        statement = text(
+            f"INSERT INTO insurance_policies ({', '.join(columns)}) "
+            f"VALUES ({', '.join(':' + c for c in columns)}) "
+            f"ON CONFLICT (policy_number) DO UPDATE SET "
+            + ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "policy_number")
+        )
+        for mode in ("row", "batch"):
+            await reset_table()
+            started = time.perf_counter()
+            async with AsyncSessionLocal() as session:
+                if mode == "row":
+                    for row in rows:
+                        await session.execute(statement, row)
+                else:
+                    for i in range(0, len(rows), batch_size):
+                        await session.execute(statement, rows[i:i + batch_size])
+                await session.commit()
+            elapsed = time.perf_counter() - started
+            results.append({
+                "rows": n_rows,
+                "mode": mode,
+                "batch_size": 1 if mode == "row" else batch_size,
+                "seconds": round(elapsed, 4),
+                "rows_per_sec": round(n_rows / elapsed, 2),
+            })
+            print(f"db_upsert rows={n_rows} mode={mode}: {results[-1]}")
+    return results
+
+
+def synthetic_embeddings(n: int, dimension: int, seed: int, n_clusters: int = 64):
+    """Unit vectors drawn around random centers, closer to real embedding geometry than pure noise"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, n_clusters, n)] + 0.6 * rng.standard_normal((n, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def bench_quantization(sizes: List[int], seed: int, dimension: int, n_queries: int = 200, k: int = 10) -> List[Dict]:
+    from benchmarks.quantized_index import QuantizedVectorIndex, evaluate_recall
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    results = []
+    for n_vectors in sizes:
+        vectors = synthetic_embeddings(n_vectors + n_queries, dimension, seed)
+        corpus, queries = vectors[:n_vectors], vectors[n_vectors:]
+        ids = [f"vec-{i}" for i in range(n_vectors)]
+        for codec in ("int8", "pq"):
+            index = QuantizedVectorIndex(
+                dimension, codec,
+                full_precision_path=os.path.join(DATA_DIR, f"full_{codec}_{n_vectors}.npy"),
+            )
+            started = time.perf_counter()
+            index.build(ids, corpus)
+            build_seconds = time.perf_counter() - started
+
+            latencies: List[float] = []
+            for query in queries:
+                started = time.perf_counter()
+                index.search(query, k)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            full_bytes = corpus.shape[1] * corpus.dtype.itemsize
+            results.append({
+                "rows": n_vectors,
+                "codec": codec,
+                "dimension": dimension,
+                "bytes_per_vector": index.bytes_per_vector(),
+                "compression_ratio": round(full_bytes / index.bytes_per_vector(), 2),
+                "resident_mb": round(index.resident_bytes() / (1024 * 1024), 2),
+                f"recall_at_{k}_approx": round(evaluate_recall(index, corpus, queries, k, rescore_k=0), 4),
+                f"recall_at_{k}_rescored": round(evaluate_recall(index, corpus, queries, k), 4),
+                "build_seconds": round(build_seconds, 4),
+                "p50_ms": round(percentile(latencies, 50), 3),
+                "p95_ms": round(percentile(latencies, 95), 3),
+            })
+            print(f"quantization rows={n_vectors} codec={codec}: {results[-1]}")
+    return results
+
+
+def bench_resilience(requests: int, error_rate: float, slow_rate: float, slow_latency: float,
+                     seed: int) -> List[Dict]:
+    """Query embeddings against a fault-injecting stand-in: bare calls vs retries vs retries + hedging"""
+    from benchmarks.fakes import FakeEmbeddings, FaultInjector, InjectedFault
+    from src.utils.resilience import CircuitBreaker, CircuitOpenError, RemoteDependency
+
+    results = []
+    for mode in ("plain", "retry", "retry_hedged"):
+        embeddings = FakeEmbeddings(faults=FaultInjector(error_rate, 503, slow_rate, slow_latency, seed))
+        # Breaker effectively disabled so the comparison measures retries and hedging only
+        dependency = RemoteDependency(f"bench_{mode}", breaker=CircuitBreaker(f"bench_{mode}", 10 ** 9, 1.0))
+        latencies: List[float] = []
+        succeeded = 0
+        for i in range(requests):
+            started = time.perf_counter()
+            try:
+                if mode == "plain":
+                    embeddings.embed_query(QUESTIONS[i % len(QUESTIONS)])
+                elif mode == "retry":
+                    dependency.call(embeddings.embed_query, QUESTIONS[i % len(QUESTIONS)])
+                else:
+                    dependency.hedged_call(embeddings.embed_query, QUESTIONS[i % len(QUESTIONS)])
+                succeeded += 1
+            except (InjectedFault, CircuitOpenError, TimeoutError):
+                pass
+            latencies.append((time.perf_counter() - started) * 1000)
+        results.append({
+            "mode": mode,
+            "requests": requests,
+            "error_rate": error_rate,
+            "slow_rate": slow_rate,
+            "success_rate": round(succeeded / requests, 4),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+        })
+        print(f"resilience mode={mode}: {results[-1]}")
+    return results
+
+
+async def bench_period_index(sizes: List[int], seed: int, batch_size: int, n_queries: int = 200) -> List[Dict]:
+    """In-force / overlap / expiring queries: in-memory interval index vs SQL range scans"""
+    import random
+    from datetime import date, timedelta
+    from sqlalchemy import text
+    from benchmarks.workbook import generate_rows
+    from src.database import AsyncSessionLocal, sync_engine
+    from src.services.period_index import PolicyPeriodIndex, sql_period_query
+
+    results = []
+    for n_rows in sizes:
+        rows = generate_rows(n_rows, seed)
+        columns = list(rows[0].keys())
+        statement = text(
+            f"INSERT INTO insurance_policies ({', '.join(columns)}) "
+            f"VALUES ({', '.join(':' + c for c in columns)})"
+        )
+        await reset_table()
+        async with AsyncSessionLocal() as session:
+            for i in range(0, len(rows), batch_size):
+                await session.execute(statement, rows[i:i + batch_size])
+            await session.commit()
+        del rows
+
+        index = PolicyPeriodIndex()
+        started = time.perf_counter()
+        await asyncio.to_thread(index.refresh)
+        build_seconds = time.perf_counter() - started
+
+        rng = random.Random(seed)
+        days = [date(2024, 1, 1) + timedelta(days=rng.randrange(0, 730)) for _ in range(n_queries)]
+        cases = {
+            "in_force": [("in_force", day, day) for day in days],
+            "overlap_30d": [("in_force", day, day + timedelta(days=30)) for day in days],
+            "expiring_30d": [("expiring", day, day + timedelta(days=30)) for day in days],
+        }
+        for case, queries in cases.items():
+            timings: Dict[str, List[float]] = {"sql": [], "index": []}
+            matches, matched_rows = True, 0
+            with sync_engine.connect() as connection:
+                for kind, start, end in queries:
+                    started = time.perf_counter()
+                    expected = sql_period_query(kind, start, end, connection)
+                    timings["sql"].append((time.perf_counter() - started) * 1000)
+
+                    started = time.perf_counter()
+                    if kind == "expiring":
+                        found = index.expiring(start, end)
+                    elif start == end:
+                        found = index.in_force(start)
+                    else:
+                        found = index.overlapping(start, end)
+                    timings["index"].append((time.perf_counter() - started) * 1000)
+                    matches = matches and found == expected
+                    matched_rows += len(found)
+            results.append({
+                "rows": n_rows,
+                "query": case,
+                "queries": len(queries),
+                "mean_matches": round(matched_rows / len(queries), 1),
+                "index_build_seconds": round(build_seconds, 4),
+                "sql_p50_ms": round(percentile(timings["sql"], 50), 3),
+                "sql_p95_ms": round(percentile(timings["sql"], 95), 3),
+                "index_p50_ms": round(percentile(timings["index"], 50), 3),
+                "index_p95_ms": round(percentile(timings["index"], 95), 3),
+                "results_match": matches,
+            })
+            print(f"period_index rows={n_rows} query={case}: {results[-1]}")
+    return results
+
+
+def bench_validation(sizes: List[int], seed: int, repeats: int = 5) -> List[Dict]:
+    """Reinsurance split checks over whole generated files, with a fraction of rows corrupted"""
+    import numpy as np
+    import pandas as pd
+    from benchmarks.workbook import generate_rows
+    from src.utils.validation import check_reinsurance_splits, summarize_split_violations
+
+    results = []
+    for n_rows in sizes:
+        frame = pd.DataFrame(generate_rows(n_rows, seed))
+        corrupted = np.random.default_rng(seed).choice(n_rows, max(1, n_rows // 100), replace=False)
+        frame.loc[corrupted, "treaty_premium"] *= 1.5
+
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            codes = check_reinsurance_splits(frame)
+            timings.append(time.perf_counter() - started)
+        results.append({
+            "rows": n_rows,
+            "seconds_p50": round(percentile(timings, 50), 4),
+            "rows_per_sec": round(n_rows / percentile(timings, 50), 2),
+            "corrupted_rows": len(corrupted),
+            "flagged_rows": int(np.count_nonzero(codes)),
+            "violations": summarize_split_violations(codes),
+        })
+        print(f"validation rows={n_rows}: {results[-1]}")
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def main(args) -> Dict:
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s]
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    results: Dict[str, List[Dict]] = {}
+
+    if "ingest" in suites:
+        results["ingest"] = await bench_ingest(sizes, args.seed)
+    if "query" in suites:
+        if "ingest" not in suites:
+            # Seed the table and the fake vector index so tools have data to return
+            await bench_ingest([sizes[0]], args.seed)
+        levels = [int(c) for c in args.concurrency.split(",") if c]
+        results["query"] = await bench_query(levels, args.requests)
+    if "db_upsert" in suites:
+        results["db_upsert"] = await bench_db_upsert(sizes, args.seed, args.batch_size)
+    if "quantization" in suites:
+        results["quantization"] = bench_quantization(sizes, args.seed, args.dimension)
+    if "validation" in suites:
+        results["validation"] = bench_validation(sizes, args.seed)
+    if "period_index" in suites:
+        results["period_index"] = await bench_period_index(sizes, args.seed, args.batch_size)
+    if "resilience" in suites:
+        results["resilience"] = bench_resilience(
+            args.requests, args.fault_rate, args.slow_rate, args.slow_latency_ms / 1000, args.seed
+        )
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run ingestion, query and vector index benchmarks against local stand-ins")
+    parser.add_argument("--suites", default="ingest,query,db_upsert")
+    parser.add_argument("--sizes", default="1k,100k", help="Row counts, e.g. 1k,100k,1m")
+    parser.add_argument("--concurrency", default="1,4,16", help="Concurrent /query clients per level")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dimension", type=int, default=768,
+                        help="Embedding dimension for the quantization suite (768 Gemini, 384 MiniLM)")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=5.0)
+    parser.add_argument("--fault-rate", type=float, default=0.0, help="Fraction of embedding calls failing with 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of embedding calls that stall")
+    parser.add_argument("--slow-latency-ms", type=float, default=1000.0)
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/<timestamp>.json)")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+
+    os.environ["API_USERNAME"] = BENCH_USERNAME
+    os.environ["API_PASSWORD"] = BENCH_PASSWORD
+
+    from benchmarks import fakes
+
+    faults = None
+    if args.fault_rate or args.slow_rate:
+        faults = fakes.FaultInjector(args.fault_rate, 503, args.slow_rate, args.slow_latency_ms / 1000, args.seed)
+    fakes.install(llm_latency=args.llm_latency_ms / 1000, embedding_latency=args.embedding_latency_ms / 1000,
+                  embedding_faults=faults)
+
+    report = asyncio.run(main(args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Results written to {output}")
@@ -0,0 +1,119 @@
+"""Synthetic insurance workbooks in the data_1/data_2/data_3 layout accepted by ingestion"""
+import os
+from datetime import date, timedelta
+from typing import Iterator, List
+
+import numpy as np
+from openpyxl import Workbook
+
+SHEET_NAMES = ["data_1", "data_2", "data_3"]
+
+COLUMNS = [
+    "INSURED",
+    "POLICY NUMBER",
+    "DEBIT NOTE",
+    "PERIOD OF INSURANCE",
+    "SUM INSURED",
+    "PREMIUM",
+    "OWN RETENTION PPN",
+    "OWN RETENTION SUM INSURED",
+    "OWN RETENTION PREMIUM",
+    "TREATY PPN",
+    "TREATY SUM INSURED",
+    "TREATY PREMIUM",
+    "FACULTATIVE OUTWARD PPN",
+    "FACULTATIVE OUTWARD SUM INSURED",
+    "FACULTATIVE OUTWARD PREMIUM",
+]
+
+INSURED_NAMES = [
+    "DANGOTE CEMENT PLC", "ACCESS BANK PLC", "MTN NIGERIA", "NESTLE NIGERIA",
+    "LAFARGE AFRICA", "SEPLAT ENERGY", "FLOUR MILLS", "UNILEVER NIGERIA",
+    "GUINNESS NIGERIA", "TOTAL ENERGIES", "ZENITH BANK", "OANDO PLC",
+]
+POLICY_PREFIXES = ["E/I", "E/F", "E/P", "E/C", "UA/"]
+
+CHUNK_SIZE = 50_000
+
+
+def _rows(n_rows: int, seed: int, offset: int) -> Iterator[List]:
+    """Yield rows in chunks so a million-row workbook never lives in memory at once"""
+    rng = np.random.default_rng(seed + offset)
+    base = date(2024, 1, 1)
+    for chunk_start in range(0, n_rows, CHUNK_SIZE):
+        n = min(CHUNK_SIZE, n_rows - chunk_start)
+        sum_insured = np.round(rng.uniform(1e6, 5e9, n), 2)
+        premium = np.round(sum_insured * rng.uniform(0.0005, 0.01, n), 2)
+        own = rng.uniform(10, 90, n)
+        treaty = rng.uniform(0, 100 - own)
+        fac = 100 - own - treaty
+        start_offsets = rng.integers(0, 365, n)
+        durations = rng.choice([30, 90, 180, 365], n)
+        names = rng.integers(0, len(INSURED_NAMES), n)
+        prefixes = rng.integers(0, len(POLICY_PREFIXES), n)
+
+        for i in range(n):
+            row_number = offset + chunk_start + i
+            start = base + timedelta(days=int(start_offsets[i]))
+            end = start + timedelta(days=int(durations[i]))
+            yield [
+                INSURED_NAMES[names[i]],
+                f"{POLICY_PREFIXES[prefixes[i]]}{row_number:08d}",
+                f"DN{row_number:08d}",
+                f"{start:%d/%m/%Y} - {end:%d/%m/%Y}",
+                float(sum_insured[i]),
+                float(premium[i]),
+                round(float(own[i]), 4),
+                round(float(sum_insured[i] * own[i] / 100), 2),
+                round(float(premium[i] * own[i] / 100), 2),
+                round(float(treaty[i]), 4),
+                round(float(sum_insured[i] * treaty[i] / 100), 2),
+                round(float(premium[i] * treaty[i] / 100), 2),
+                round(float(fac[i]), 4),
+                round(float(sum_insured[i] * fac[i] / 100), 2),
+                round(float(premium[i] * fac[i] / 100), 2),
+            ]
+
+
+def generate_workbook(path: str, n_rows: int, seed: int = 42) -> str:
+    """Write an .xlsx file with `n_rows` policies split evenly across data_1..data_3"""
+    workbook = Workbook(write_only=True)
+    per_sheet = [n_rows // 3 + (1 if i < n_rows % 3 else 0) for i in range(3)]
+    offset = 0
+    for sheet_name, sheet_rows in zip(SHEET_NAMES, per_sheet):
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(COLUMNS)
+        for row in _rows(sheet_rows, seed, offset):
+            sheet.append(row)
+        offset += sheet_rows
+    workbook.save(path)
+    return path
+
+
+def cached_workbook(directory: str, n_rows: int, seed: int = 42) -> str:
+    """Return the path of a generated workbook, generating it only on first use"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"policies_{n_rows}_{seed}.xlsx")
+    if not os.path.exists(path):
+        generate_workbook(path, n_rows, seed)
+    return path
+
+
+def generate_rows(n_rows: int, seed: int = 42) -> List[dict]:
+    """Policy rows keyed by database column name, for DB-only benchmarks"""
+    columns = [
+        "insured_name", "policy_number", "debit_note", "insurance_period",
+        "sum_insured", "premium",
+        "own_retention_ppn", "own_retention_sum_insured", "own_retention_premium",
+        "treaty_retention_ppn", "treaty_sum_insured", "treaty_premium",
+        "facultative_outward_ppn", "facultative_outward_sum_insured", "facultative_outward_premium",
+    ]
+    rows = []
+    for values in _rows(n_rows, seed, 0):
+        row = dict(zip(columns, values))
+        start, end = row.pop("insurance_period").split(" - ")
+        row.pop("debit_note")
+        row["insurance_period_start_date"] = date(int(start[6:]), int(start[3:5]), int(start[:2]))
+        row["insurance_period_end_date"] = date(int(end[6:]), int(end[3:5]), int(end[:2]))
+        rows.append(row)
+    return rows
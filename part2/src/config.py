@@ -1,4 +1,6 @@
+import logging
 import os
+from typing import List
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import google.generativeai as genai
@@ -16,6 +18,14 @@ class Settings(BaseSettings):
     # AI Service API Keys
     GOOGLE_API_KEY: str
 
+    # Gemini model routing: auto picks per question/step, fast | strong pin every step
+    LLM_FAST_MODEL: str = "gemini-1.5-flash"
+    LLM_STRONG_MODEL: str = "gemini-1.5-pro"
+    LLM_TEMPERATURE: float = 0.7
+    LLM_SQL_TEMPERATURE: float = 0.0
+    LLM_ROUTING: str = "auto"
+    LLM_ESCALATE_AFTER_TOOL_CALLS: int = 3
+
     # Pinecone Configuration
     PINECONE_API_KEY: str
     PINECONE_INDEX_NAME: str = "insurance-rag-index"
@@ -23,18 +33,142 @@ class Settings(BaseSettings):
     PINECONE_NAMESPACE: str = "insurance_namespace"
     TABLE_NAME: str = "insurance_policies"
 
+    # Embedding provider: gemini (remote) | onnx (local CPU model). The Pinecone index dimension
+    # must match the provider's, so switching providers needs a new index and a re-index.
+    EMBEDDING_PROVIDER: str = "gemini"
+    GEMINI_EMBEDDING_MODEL: str = "models/embedding-001"
+    GEMINI_EMBEDDING_DIMENSION: int = 768
+    EMBEDDING_ONNX_MODEL_PATH: str = "models/embedding"  # directory with model.onnx and tokenizer.json, or an .onnx file
+    EMBEDDING_ONNX_TOKENIZER_PATH: str = ""  # default: tokenizer.json next to the model
+    EMBEDDING_ONNX_INTRA_OP_THREADS: int = 1
+    EMBEDDING_WORKERS: int = 4  # batches embedded concurrently by the onnx provider
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_MAX_TOKENS: int = 256
+    EMBEDDING_QUERY_PREFIX: str = ""  # e.g. "query: " for E5-style models
+    EMBEDDING_DOCUMENT_PREFIX: str = ""
+
+    # Remote calls (Gemini, Pinecone): per-attempt timeout, overall deadline, retries and breaker
+    REMOTE_ATTEMPT_TIMEOUT_SECONDS: float = 10.0
+    REMOTE_DEADLINE_SECONDS: float = 30.0
+    REMOTE_MAX_ATTEMPTS: int = 3
+    REMOTE_BACKOFF_BASE_SECONDS: float = 0.2
+    REMOTE_BACKOFF_MAX_SECONDS: float = 5.0
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_SECONDS: float = 30.0
+    EMBEDDING_HEDGE_AFTER_SECONDS: float = 0.3  # 0 disables hedged query embeddings
+    AGENT_TIMEOUT_SECONDS: float = 120.0
+    SQL_TOOL_WORKERS: int = 8  # threads running sql_query tool calls for the async agent
+
     # API Security
     API_USERNAME: str = "admin"
     API_PASSWORD: str = "password"
+    AUTH_CACHE_TTL_SECONDS: float = 300.0
+    AUTH_CACHE_MAX_SIZE: int = 1024
+
+    # Admission control for /query
+    QUERY_MAX_IN_FLIGHT: int = 8
+    QUERY_MAX_QUEUE: int = 16
+    QUERY_QUEUE_TIMEOUT_SECONDS: float = 2.0
+
+    # POST /query/batch
+    QUERY_BATCH_MAX_QUESTIONS: int = 100
+    QUERY_BATCH_MAX_PARALLEL: int = 4
+    QUERY_EMBEDDING_CACHE_MAX_SIZE: int = 4096
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Ingestion
+    INGEST_BATCH_SIZE: int = 500
+    INGEST_LOOKUP_BATCH_SIZE: int = 5000
+
+    # Reinsurance split checks at ingest: warn (store flags) | reject (skip violating rows) | off
+    SPLIT_VALIDATION_MODE: str = "warn"
+    SPLIT_PPN_TOLERANCE: float = 0.01  # percentage points
+    SPLIT_AMOUNT_REL_TOLERANCE: float = 1e-4  # fraction of the policy total
+    SPLIT_AMOUNT_ABS_TOLERANCE: float = 1.0
+
+    # Cache backend shared by the application caches: memory (per process) | sqlite (shared
+    # by every worker on the host through CACHE_PATH)
+    CACHE_BACKEND: str = "memory"
+    CACHE_PATH: str = "cache.sqlite3"
+    CACHE_MMAP_BYTES: int = 256 * 1024 * 1024
+
+    # Vector outbox: ingestion queues embeddings, a background drainer syncs them to Pinecone
+    OUTBOX_DRAINER_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_SECONDS: float = 2.0
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_LEASE_SECONDS: float = 300.0
+    OUTBOX_RETRY_BASE_SECONDS: float = 5.0
+    OUTBOX_RETRY_MAX_SECONDS: float = 600.0
+    OUTBOX_RETENTION_HOURS: float = 24.0
+
+    # Question -> validated SQL cache for the SQL agent
+    NL2SQL_CACHE_MAX_SIZE: int = 2048
+    NL2SQL_CACHE_TTL_SECONDS: float = 7 * 24 * 3600.0
+    SCHEMA_VERSION_TTL_SECONDS: float = 60.0
+
+    # Read-only SQL result cache, keyed by statement and table data version
+    SQL_RESULT_CACHE_MAX_SIZE: int = 1024
+    SQL_RESULT_CACHE_TTL_SECONDS: float = 3600.0
+    SQL_RESULT_CACHE_MAX_BYTES: int = 256 * 1024
+    DATA_VERSION_TTL_SECONDS: float = 2.0
+
+    # Retrieval context passed to the agent by rag_search
+    CONTEXT_TOKEN_BUDGET: int = 800
+    CONTEXT_FETCH_FROM_DB: bool = True
+
+    # In-memory interval index over policy periods (in-force / expiry questions)
+    PERIOD_INDEX_MAX_DELTA: int = 10000  # rows changed by ingests before the tree is rebuilt
+    PERIOD_QUERY_MAX_RESULTS: int = 10000
+    PERIOD_TOOL_MAX_ROWS: int = 20
+
+    # Columnar analytics snapshot for aggregate questions
+    ANALYTICS_MAX_GROUPS: int = 50
+
+    # Exposure accumulators behind GET /reports/exposure; changing the bands needs a rebuild
+    EXPOSURE_RETENTION_BANDS: List[float] = [25.0, 50.0, 75.0]  # own retention PPN band edges
+    EXPOSURE_REPORT_MAX_ROWS: int = 10000
+
+    # Policy lookup cache
+    POLICY_CACHE_MAX_SIZE: int = 10000
+    POLICY_CACHE_TTL_SECONDS: float = 300.0
+
+    # Policy export
+    EXPORT_QUEUE_CHUNKS: int = 16
+    EXPORT_ARROW_BATCH_BYTES: int = 4 * 1024 * 1024
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "app.log"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 5
+    LOG_JSON: bool = True
+    LOG_MAX_PER_SECOND_PER_CALL_SITE: int = 20
+    LOG_RATE_LIMITED_LOGGERS: List[str] = [  # loggers with per-row loops; others are never limited
+        "src.services.ingestion", "src.services.pinecone_client", "src.services.vector_outbox",
+    ]
+    DB_ECHO: bool = False
+
+    # Tracing
+    TRACING_EXPORTER: str = "none"  # none | json | console
+    TRACING_EXPORT_PATH: str = "traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 1.0
 
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 settings = Settings()
-# Configure Gemini only if key present
-if settings.GOOGLE_API_KEY:
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
-else:
-    # Log or raise a friendly runtime error later where LLM is used
-    print("WARNING: GOOGLE_API_KEY not set. Gemini calls will fail until provided.")
+
+_genai_configured = False
+
+def configure_genai():
+    """Configure the Gemini SDK once, on first use rather than at import"""
+    global _genai_configured
+    if _genai_configured:
+        return
+    if settings.GOOGLE_API_KEY:
+        genai.configure(api_key=settings.GOOGLE_API_KEY)
+        _genai_configured = True
+    else:
+        logging.getLogger(__name__).warning("GOOGLE_API_KEY not set. Gemini calls will fail until provided.")
@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from src.config import settings
+from src.utils.tracing import instrument_engine
 
 # Synchronous engine for LangChain
 sync_engine = create_engine(
@@ -13,11 +14,14 @@ sync_engine = create_engine(
 # Async engine for FastAPI
 async_engine = create_async_engine(
     f"postgresql+asyncpg://{settings.DB_USERNAME}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}",
-    echo=True,
+    echo=settings.DB_ECHO,
     pool_size=10,
     max_overflow=20
 )
 
+instrument_engine(sync_engine)
+instrument_engine(async_engine)
+
 AsyncSessionLocal = sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
@@ -1,22 +1,200 @@
 import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Sequence
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage  
+from langchain_core.callbacks import BaseCallbackHandler
 from src.config import settings
+from src.services.readiness import readiness
+from src.utils.metrics import (
+    LLM_CALLS, LLM_ROUTED_STEPS, LLM_SECONDS, LLM_TOKENS, QUERY_LLM_CALLS, QUERY_TOKENS
+)
+from src.utils.tracing import tracer
 
 GEMINI_API_KEY = settings.GOOGLE_API_KEY
 
-# Configure Gemini for LangChain
-llm = ChatGoogleGenerativeAI(
-    google_api_key=GEMINI_API_KEY,
-    model="gemini-1.5-pro",
-    temperature=0.7
+
+class LLMUsage:
+    """LLM call and token totals accumulated over one request"""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+_current_usage: ContextVar[Optional[LLMUsage]] = ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def track_llm_usage():
+    """Collect LLM calls and tokens made inside the block and record them as per-query metrics"""
+    usage = LLMUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+        QUERY_LLM_CALLS.observe(usage.calls)
+        QUERY_TOKENS.observe(usage.total_tokens)
+
+
+def _extract_token_usage(response: Any) -> tuple:
+    """Return (input_tokens, output_tokens) from an LLMResult"""
+    input_tokens = output_tokens = 0
+    for generations in getattr(response, "generations", []) or []:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None) or {}
+            input_tokens += usage.get("input_tokens", 0) or 0
+            output_tokens += usage.get("output_tokens", 0) or 0
+    if not (input_tokens or output_tokens):
+        llm_output = getattr(response, "llm_output", None) or {}
+        usage = llm_output.get("usage_metadata") or llm_output.get("token_usage") or {}
+        input_tokens = usage.get("input_tokens", usage.get("prompt_tokens", 0)) or 0
+        output_tokens = usage.get("output_tokens", usage.get("completion_tokens", 0)) or 0
+    return input_tokens, output_tokens
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Count LLM calls, latency and tokens per model, globally and for the current request"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._started: Dict[Any, float] = {}
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: Any, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: Any, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+
+    def on_llm_end(self, response: Any, *, run_id: Any = None, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            LLM_SECONDS.observe(time.perf_counter() - started, model=self.model)
+        input_tokens, output_tokens = _extract_token_usage(response)
+        LLM_CALLS.inc(model=self.model)
+        LLM_TOKENS.inc(input_tokens, model=self.model, kind="input")
+        LLM_TOKENS.inc(output_tokens, model=self.model, kind="output")
+
+        usage = _current_usage.get()
+        if usage is not None:
+            usage.calls += 1
+            usage.input_tokens += input_tokens
+            usage.output_tokens += output_tokens
+
+
+class LLMTracingCallback(BaseCallbackHandler):
+    """Record a span for every LLM call, parented to the span active when the call starts"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._spans = {}
+
+    def _start(self, run_id: Any, prompt_count: int):
+        if tracer.current_span() is None:
+            return
+        self._spans[run_id] = tracer.create_span("llm", {
+            "gen_ai.system": "gemini",
+            "gen_ai.request.model": self.model,
+            "llm.prompt_count": prompt_count,
+        }, kind="CLIENT")
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: Any, **kwargs: Any) -> None:
+        self._start(run_id, len(prompts))
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: Any, **kwargs: Any) -> None:
+        self._start(run_id, len(messages))
+
+    def on_llm_end(self, response: Any, *, run_id: Any, **kwargs: Any) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            input_tokens, output_tokens = _extract_token_usage(response)
+            span.set_attribute("gen_ai.usage.input_tokens", input_tokens)
+            span.set_attribute("gen_ai.usage.output_tokens", output_tokens)
+            tracer.end_span(span)
+
+    def on_llm_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.record_exception(error)
+            tracer.end_span(span)
+
+
+# Configure Gemini for LangChain (constructed lazily, see readiness)
+def _build_chat_model(model: str, temperature: float):
+    return ChatGoogleGenerativeAI(
+        google_api_key=GEMINI_API_KEY,
+        model=model,
+        temperature=temperature,
+        timeout=settings.REMOTE_ATTEMPT_TIMEOUT_SECONDS,
+        max_retries=settings.REMOTE_MAX_ATTEMPTS - 1,
+        callbacks=[LLMMetricsCallback(model), LLMTracingCallback(model)]
+    )
+
+def _build_llm():
+    return _build_chat_model(settings.LLM_STRONG_MODEL, settings.LLM_TEMPERATURE)
+
+def _build_fast_llm():
+    return _build_chat_model(settings.LLM_FAST_MODEL, settings.LLM_TEMPERATURE)
+
+def _build_sql_llm():
+    # SQL generation is deterministic: same question, same statement (and NL-to-SQL cache hits)
+    return _build_chat_model(settings.LLM_FAST_MODEL, settings.LLM_SQL_TEMPERATURE)
+
+llm_component = readiness.register("llm", _build_llm)
+fast_llm_component = readiness.register("fast_llm", _build_fast_llm)
+sql_llm_component = readiness.register("sql_llm", _build_sql_llm)
+
+def get_llm():
+    return llm_component.get()
+
+# Question features that need the strong model: reasoning, comparison or multi-part answers
+_COMPLEX_PATTERN = re.compile(
+    r"\b(why|explain|compare|comparison|versus|vs|trend|analy[sz]e|analysis|recommend|assess|"
+    r"risk|summari[sz]e|difference|impact|correlat\w*|forecast)\b",
+    re.IGNORECASE,
 )
 
+def classify_question(question: str) -> str:
+    """'fast' for lookups and simple aggregates, 'strong' for reasoning-heavy or multi-part questions"""
+    if settings.LLM_ROUTING in ("fast", "strong"):
+        return settings.LLM_ROUTING
+    words = len(question.split())
+    parts = question.count("?") + len(re.findall(r"\b(and also|as well as|then)\b", question, re.IGNORECASE))
+    if words > 30 or parts > 1 or _COMPLEX_PATTERN.search(question):
+        return "strong"
+    return "fast"
+
+def route_step(messages: Sequence[Any]) -> str:
+    """Tier for the next agent step: the question's tier, escalated once the agent needs many tool rounds"""
+    question = next((str(m.content) for m in messages if getattr(m, "type", None) == "human"), "")
+    tier = classify_question(question)
+    tool_calls = sum(1 for m in messages if getattr(m, "type", None) == "tool")
+    if tier == "fast" and settings.LLM_ROUTING == "auto" and tool_calls >= settings.LLM_ESCALATE_AFTER_TOOL_CALLS:
+        tier = "strong"
+    LLM_ROUTED_STEPS.inc(tier=tier)
+    return tier
+
+def get_model(tier: str):
+    return fast_llm_component.get() if tier == "fast" else llm_component.get()
+
 async def query_gemini(prompt, model="gemini-1.5-pro"):
-    """Query Gemini with the latest Gemini 1.5 Pro model"""
+    """Query Gemini with the strong model"""
     try:
         messages = [HumanMessage(content=prompt)]
-        response = await llm.ainvoke(messages)
+        response = await get_llm().ainvoke(messages)
         return response.content
     except Exception as e:
-        raise RuntimeError(f"Gemini API error: {str(e)}")
\ No newline at end of file
+        raise RuntimeError(f"Gemini API error: {str(e)}")
@@ -1,6 +1,5 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
 import logging
 import asyncio
 from sqlalchemy import text
@@ -8,14 +7,15 @@ from sqlalchemy.ext.asyncio import create_async_engine
 import os
 import base64
 from .config import settings
-from src.routes import ingest, query, health
+from src.routes import ingest, query, health, policies, reports
+from src.services.exposure import initialize_exposure
+from src.services.readiness import readiness
+from src.services.vector_outbox import outbox_drainer
+from src.utils.logging_config import configure_logging, shutdown_logging
+from src.utils.security import get_current_user
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.FileHandler("app.log"), logging.StreamHandler()]
-)
+# Configure logging (non-blocking queue handler, JSON lines, rotating app.log)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +76,60 @@ async def run_database_migrations():
         """
         ALTER TABLE insurance_policies 
         ADD COLUMN IF NOT EXISTS facultative_outward_premium DOUBLE PRECISION
+        """,
+        """
+        ALTER TABLE insurance_policies 
+        ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)
+        """,
+        """
+        ALTER TABLE insurance_policies 
+        ADD COLUMN IF NOT EXISTS validation_flags SMALLINT NOT NULL DEFAULT 0
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS vector_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            policy_number VARCHAR(255) NOT NULL,
+            vector_id VARCHAR(36) NOT NULL,
+            content_hash VARCHAR(64),
+            payload JSONB NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            claimed_at TIMESTAMPTZ,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            processed_at TIMESTAMPTZ
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS ix_vector_outbox_pending
+        ON vector_outbox (available_at, id) WHERE status IN ('pending', 'processing')
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS exposure_accumulators (
+            grouping_set SMALLINT NOT NULL,
+            period_month VARCHAR(16) NOT NULL,
+            retention_band VARCHAR(32) NOT NULL,
+            insured_name VARCHAR(255) NOT NULL,
+            policy_count BIGINT NOT NULL DEFAULT 0,
+            sum_insured DOUBLE PRECISION NOT NULL DEFAULT 0,
+            premium DOUBLE PRECISION NOT NULL DEFAULT 0,
+            own_retention_sum_insured DOUBLE PRECISION NOT NULL DEFAULT 0,
+            own_retention_premium DOUBLE PRECISION NOT NULL DEFAULT 0,
+            treaty_sum_insured DOUBLE PRECISION NOT NULL DEFAULT 0,
+            treaty_premium DOUBLE PRECISION NOT NULL DEFAULT 0,
+            facultative_outward_sum_insured DOUBLE PRECISION NOT NULL DEFAULT 0,
+            facultative_outward_premium DOUBLE PRECISION NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (grouping_set, period_month, retention_band, insured_name)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name VARCHAR(255) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
         """
     ]
     
@@ -103,8 +157,19 @@ app = FastAPI(
 async def startup_event():
     logger.info("Running database migrations...")
     await run_database_migrations()
+    # Build LLM, SQL agent and vector store clients in the background; /health/ready reports progress
+    readiness.start_warm_up()
+    # First deploy of the exposure accumulators: build them from the existing book in the background
+    app.state.exposure_init = asyncio.create_task(initialize_exposure())
+    if settings.OUTBOX_DRAINER_ENABLED:
+        outbox_drainer.start()
     logger.info("Application startup complete")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await outbox_drainer.stop()
+    shutdown_logging()
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -114,24 +179,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Security
-security = HTTPBasic()
-
-def authenticate(credentials: HTTPBasicCredentials = Depends(security)):
-    correct_username = credentials.username == settings.API_USERNAME
-    correct_password = credentials.password == settings.API_PASSWORD
-
-    if not (correct_username and correct_password):
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid credentials",
-            headers={"WWW-Authenticate": "Basic"},
-        )
-    return credentials.username
-
-# Include routers
-app.include_router(ingest.router, prefix="/ingest", tags=["Ingestion"])
-app.include_router(query.router, prefix="/query", tags=["Query"])
+# Include routers (health applies auth per route so liveness/readiness probes stay open)
+app.include_router(ingest.router, prefix="/ingest", tags=["Ingestion"], dependencies=[Depends(get_current_user)])
+app.include_router(query.router, prefix="/query", tags=["Query"], dependencies=[Depends(get_current_user)])
+app.include_router(policies.router, prefix="/policies", tags=["Policies"], dependencies=[Depends(get_current_user)])
+app.include_router(reports.router, prefix="/reports", tags=["Reports"], dependencies=[Depends(get_current_user)])
 app.include_router(health.router, prefix="/health", tags=["Health"])
 
 @app.get("/")
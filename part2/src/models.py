@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime
+from sqlalchemy import Column, String, Float, DateTime, SmallInteger
 from sqlalchemy.ext.declarative import declarative_base
 import pandas as pd
 
@@ -22,20 +22,24 @@ class InsurancePolicy(Base):
     facultative_outward_premium = Column(Float)
     insurance_period_start_date = Column(DateTime)
     insurance_period_end_date = Column(DateTime)
+    vector_id = Column(String(36))
+    content_hash = Column(String(64))  # SHA-256 of the ingested row, used to skip unchanged rows on re-ingest
+    validation_flags = Column(SmallInteger, default=0)  # SPLIT_* bitmask from utils.validation
 
-# Use this code snippet to update your CSV
-df = pd.read_csv("processed_insurance.csv")
+if __name__ == "__main__":
+    # Use this code snippet to update your CSV
+    df = pd.read_csv("processed_insurance.csv")
 
-# Rename treaty_retention_ppn to treaty_ppn if needed
-if 'treaty_retention_ppn' in df.columns and 'treaty_ppn' not in df.columns:
-    df.rename(columns={'treaty_retention_ppn': 'treaty_ppn'}, inplace=True)
+    # Rename treaty_retention_ppn to treaty_ppn if needed
+    if 'treaty_retention_ppn' in df.columns and 'treaty_ppn' not in df.columns:
+        df.rename(columns={'treaty_retention_ppn': 'treaty_ppn'}, inplace=True)
 
-# Add missing columns
-if 'insured_name' not in df.columns:
-    df['insured_name'] = 'Unknown'  # Default value
-    
-for col in ['facultative_outward_ppn', 'facultative_outward_sum_insured', 'facultative_outward_premium']:
-    if col not in df.columns:
-        df[col] = 0.0  # Default numeric value
+    # Add missing columns
+    if 'insured_name' not in df.columns:
+        df['insured_name'] = 'Unknown'  # Default value
         
-df.to_csv("processed_insurance.csv", index=False)
\ No newline at end of file
+    for col in ['facultative_outward_ppn', 'facultative_outward_sum_insured', 'facultative_outward_premium']:
+        if col not in df.columns:
+            df[col] = 0.0  # Default numeric value
+            
+    df.to_csv("processed_insurance.csv", index=False)
\ No newline at end of file
@@ -1,7 +1,16 @@
+import asyncio
 from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import get_db
+from src.services.analytics import analytics_engine
+from src.services.readiness import readiness
+from src.services.sql_cache import run_cached_query
+from src.routes.query import query_admission
+from src.utils.security import get_current_user
+from src.utils.metrics import REGISTRY
+from src.utils.resilience import DEPENDENCIES
 
 router = APIRouter()
 
@@ -15,26 +24,76 @@ async def health_check(db: AsyncSession = Depends(get_db)):
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
 
-@router.get("/metrics")
+@router.get("/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness_check(db: AsyncSession = Depends(get_db)):
+    """Readiness probe: the database answers and all required clients are initialized"""
+    try:
+        await db.execute(text("SELECT 1"))
+        database = "connected"
+    except Exception as e:
+        database = f"disconnected: {str(e)}"
+
+    ready = database == "connected" and readiness.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "database": database,
+            "components": readiness.snapshot(),
+        },
+    )
+
+@router.get("/metrics", dependencies=[Depends(get_current_user)])
 async def get_metrics(db: AsyncSession = Depends(get_db)):
     """Get basic usage metrics"""
     try:
-        # Get record count
-        result = await db.execute(text("SELECT COUNT(*) FROM insurance_policies"))
-        count = result.scalar()
+        # Record count from the analytics snapshot once loaded, so this does not touch Postgres
+        if analytics_engine.loaded:
+            snapshot = await asyncio.to_thread(analytics_engine.snapshot)
+            count = snapshot.rows
+        else:
+            rows = await run_cached_query(db, "SELECT COUNT(*) FROM insurance_policies")
+            count = rows[0][0]
         
         return {
             "total_policies": count,
-            "database_status": "connected"
+            "database_status": "connected",
+            "query_admission": query_admission.snapshot(),
+            "circuit_breakers": {name: dependency.snapshot() for name, dependency in DEPENDENCIES.items()}
         }
     except Exception as e:
         return {"error": f"Failed to retrieve metrics: {str(e)}"}
 
-@router.get("/data-summary")
+@router.get("/prometheus", response_class=PlainTextResponse, dependencies=[Depends(get_current_user)])
+async def get_prometheus_metrics():
+    """Expose latency histograms and counters in the Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/data-summary", dependencies=[Depends(get_current_user)])
 async def get_data_summary(db: AsyncSession = Depends(get_db)):
     """Get database statistics"""
     try:
-        result = await db.execute(text("""
+        if analytics_engine.loaded:
+            result = await asyncio.to_thread(
+                analytics_engine.aggregate,
+                ["count", "avg:premium", "sum:premium",
+                 "min:insurance_period_start_date", "max:insurance_period_end_date"]
+            )
+            summary = result["rows"][0] if result["rows"] else {}
+            return {
+                "total_policies": summary.get("count", 0),
+                "average_premium": summary.get("avg:premium") or 0,
+                "total_premium": summary.get("sum:premium") or 0,
+                "earliest_policy": summary.get("min:insurance_period_start_date"),
+                "latest_policy": summary.get("max:insurance_period_end_date")
+            }
+
+        rows = await run_cached_query(db, """
             SELECT 
                 COUNT(*) as total_policies,
                 AVG(premium) as avg_premium,
@@ -42,9 +101,9 @@ async def get_data_summary(db: AsyncSession = Depends(get_db)):
                 MIN(insurance_period_start_date) as earliest_policy,
                 MAX(insurance_period_end_date) as latest_policy
             FROM insurance_policies
-        """))
+        """)
         
-        summary = result.fetchone()
+        summary = rows[0]
         
         return {
             "total_policies": summary[0],
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import date, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database import get_db
+from src.config import settings
+from src.schemas import InsurancePolicy, PolicyListResponse, PolicyPeriodResponse
+from src.services.export import EXPORT_FORMATS, stream_policies
+from src.services.period_index import find_policies
+from src.services.policies import get_policy_json, list_policies
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/export")
+async def export_policies(
+    format: str = Query("csv", description="csv, ndjson or arrow"),
+    start_date: Optional[date] = Query(None, description="Policies starting on or after this date"),
+    end_date: Optional[date] = Query(None, description="Policies ending on or before this date"),
+    insured_name: Optional[str] = Query(None, description="Case-insensitive substring of the insured name")
+):
+    """
+    Stream insurance policies as a chunked download
+    
+    - Uses PostgreSQL `COPY ... TO STDOUT`; rows are never collected in memory
+    - Returns: CSV (with header), NDJSON (one object per line) or an Arrow IPC stream
+    """
+    export_format = format.lower()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(400, f"Unsupported export format '{format}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+    if export_format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(400, "Arrow export requires the pyarrow package")
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        stream_policies(export_format, start_date, end_date, insured_name),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="insurance_policies.{extension}"'}
+    )
+
+
+@router.get("", response_model=PolicyListResponse)
+async def get_policies(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=1000),
+    insured_name: Optional[str] = Query(None, description="Case-insensitive substring of the insured name"),
+    start_date: Optional[date] = Query(None, description="Policies starting on or after this date"),
+    end_date: Optional[date] = Query(None, description="Policies ending on or before this date"),
+    min_premium: Optional[float] = Query(None),
+    max_premium: Optional[float] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List policies ordered by policy number
+    
+    - Keyset pagination: pass `next_cursor` from a page as `cursor` to get the next one
+    - Returns: Policies and the cursor of the next page (null on the last page)
+    """
+    page = await list_policies(
+        db, cursor, limit, insured_name, start_date, end_date, min_premium, max_premium
+    )
+    # Validated and serialized by the response model in one pass (pydantic-core), not via jsonable_encoder
+    return Response(content=PolicyListResponse.model_validate(page).model_dump_json(), media_type="application/json")
+
+async def _period_response(kind: str, start: date, end: date, limit: int) -> PolicyPeriodResponse:
+    if end < start:
+        raise HTTPException(400, "end must not be before start")
+    policy_numbers = await asyncio.to_thread(find_policies, kind, start, end)
+    return PolicyPeriodResponse(
+        start=start, end=end, count=len(policy_numbers),
+        policy_numbers=policy_numbers[:limit], truncated=len(policy_numbers) > limit
+    )
+
+@router.get("/in-force", response_model=PolicyPeriodResponse)
+async def get_policies_in_force(
+    on: Optional[date] = Query(None, description="Policies in force on this date (default: today)"),
+    start: Optional[date] = Query(None, description="With end: policies in force at any time in [start, end]"),
+    end: Optional[date] = Query(None),
+    limit: int = Query(1000, ge=1, le=settings.PERIOD_QUERY_MAX_RESULTS)
+):
+    """
+    List policies whose insurance period covers a date or overlaps a date range
+    
+    - Served from the in-memory period index (falls back to SQL while it loads)
+    - Returns: Total match count and up to `limit` policy numbers in policy-number order
+    """
+    if start is not None or end is not None:
+        if start is None or end is None:
+            raise HTTPException(400, "start and end must be given together")
+        return await _period_response("in_force", start, end, limit)
+    day = on or date.today()
+    return await _period_response("in_force", day, day, limit)
+
+@router.get("/expiring", response_model=PolicyPeriodResponse)
+async def get_expiring_policies(
+    within_days: int = Query(30, ge=0, le=3660),
+    as_of: Optional[date] = Query(None, description="Start of the window (default: today)"),
+    limit: int = Query(1000, ge=1, le=settings.PERIOD_QUERY_MAX_RESULTS)
+):
+    """
+    List policies whose insurance period ends within `within_days` days of `as_of`
+    """
+    start = as_of or date.today()
+    return await _period_response("expiring", start, start + timedelta(days=within_days), limit)
+
+@router.get("/{policy_number:path}", response_model=InsurancePolicy)
+async def get_policy(policy_number: str, db: AsyncSession = Depends(get_db)):
+    """
+    Fetch a single policy by its policy number (served from a read-through cache)
+
+    - Cached entries are JSON already serialized through the InsurancePolicy model
+    """
+    payload = await get_policy_json(db, policy_number)
+    if payload is None:
+        raise HTTPException(404, f"Policy {policy_number} not found")
+    return Response(content=payload, media_type="application/json")
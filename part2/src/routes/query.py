@@ -1,15 +1,29 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
+from src.services.admission import AdmissionController
 from src.services.rag import InsuranceRAGSystem
+from src.services.sql_cache import normalize_question
 from src.database import get_db
 from src.utils.security import sanitize_sql_input
-from src.schemas import QueryResponse
+from src.schemas import BatchQueryRequest, BatchQueryResult, QueryResponse
+from src.utils.tracing import tracer
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Bounds concurrent agent runs; excess requests are queued briefly, then shed with 429/503
+query_admission = AdmissionController(
+    "query",
+    max_in_flight=settings.QUERY_MAX_IN_FLIGHT,
+    max_queue=settings.QUERY_MAX_QUEUE,
+    queue_timeout=settings.QUERY_QUEUE_TIMEOUT_SECONDS,
+)
+
 class QueryRequest(BaseModel):
     question: str
 
@@ -24,12 +38,75 @@ async def query_insurance_data(
     - **question**: Natural language question about insurance data
     - Returns: Answer with source citations
     """
+    async with query_admission.slot():
+        return await _answer_query(request)
+
+@router.post("/batch")
+async def query_batch(request: BatchQueryRequest):
+    """
+    Answer many questions in one request, streamed back as NDJSON in completion order
+
+    - **questions**: Natural language questions; repeats (ignoring case, spacing and trailing
+      punctuation) are answered once and reported with `duplicate_of`
+    - **max_parallel**: Agent runs in flight at once (capped by QUERY_BATCH_MAX_PARALLEL)
+    """
+    if len(request.questions) > settings.QUERY_BATCH_MAX_QUESTIONS:
+        raise HTTPException(400, f"At most {settings.QUERY_BATCH_MAX_QUESTIONS} questions per batch")
+
+    return StreamingResponse(_stream_batch(request), media_type="application/x-ndjson")
+
+async def _stream_batch(request: BatchQueryRequest):
+    tasks = []
+    try:
+        # Deduplicate: the first occurrence of each question is answered, repeats point at it
+        first_index = {}
+        duplicates = {}
+        for index, question in enumerate(request.questions):
+            key = normalize_question(question)
+            if key in first_index:
+                duplicates.setdefault(first_index[key], []).append(index)
+            else:
+                first_index[key] = index
+        unique = sorted(first_index.values())
+        logger.info(f"Batch of {len(request.questions)} questions, {len(unique)} unique")
+
+        parallel = min(request.max_parallel or settings.QUERY_BATCH_MAX_PARALLEL, settings.QUERY_BATCH_MAX_PARALLEL)
+        semaphore = asyncio.Semaphore(parallel)
+
+        async def run(index: int) -> BatchQueryResult:
+            question = request.questions[index]
+            async with semaphore:
+                try:
+                    # Each agent run takes its own /query admission slot, like a single question
+                    async with query_admission.slot():
+                        response = await _answer_query(QueryRequest(question=question))
+                    return BatchQueryResult(index=index, question=question, answer=response.answer,
+                                            sources=response.sources)
+                except HTTPException as e:
+                    return BatchQueryResult(index=index, question=question, error=str(e.detail))
+
+        tasks = [asyncio.create_task(run(index)) for index in unique]
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            yield result.model_dump_json() + "\n"
+            for index in duplicates.get(result.index, []):
+                copy = result.model_copy(update={
+                    "index": index, "question": request.questions[index], "duplicate_of": result.index
+                })
+                yield copy.model_dump_json() + "\n"
+    finally:
+        # Client went away mid-stream: stop agent runs nobody will read
+        for task in tasks:
+            task.cancel()
+
+async def _answer_query(request: QueryRequest) -> QueryResponse:
     try:
         # Sanitize user input
         sanitized_question = sanitize_sql_input(request.question)
         
-        rag_system = InsuranceRAGSystem()
-        response = await rag_system.generate_response(sanitized_question)
+        with tracer.start_span("query_insurance_data", {"query.length": len(sanitized_question)}, kind="SERVER"):
+            rag_system = InsuranceRAGSystem()
+            response = await rag_system.generate_response(sanitized_question)
         
         return QueryResponse(
             answer=response,
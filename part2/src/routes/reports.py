@@ -0,0 +1,56 @@
+import re
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
+from src.database import get_db
+from src.schemas import ExposureReportResponse
+from src.services.exposure import DIMENSIONS, exposure_report, rebuild_exposure
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+_MONTH = re.compile(r"^\d{4}-\d{2}$")
+
+@router.get("/exposure", response_model=ExposureReportResponse, response_model_exclude_none=True)
+async def get_exposure_report(
+    group_by: List[str] = Query(["period_month"], description="Any of period_month, retention_band, insured_name"),
+    from_month: Optional[str] = Query(None, description="First period month (YYYY-MM), inclusive"),
+    to_month: Optional[str] = Query(None, description="Last period month (YYYY-MM), inclusive"),
+    retention_band: Optional[str] = Query(None, description="Own retention band, e.g. 25-50"),
+    insured_name: Optional[str] = Query(None, description="Case-insensitive substring of the insured name"),
+    limit: int = Query(1000, ge=1, le=settings.EXPOSURE_REPORT_MAX_ROWS),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Premium and sum insured accumulated by period month, retention band and/or insured
+
+    - Read from accumulators maintained incrementally by ingestion, never from the policy table
+    - Returns: One bucket per group (ordered by the group keys), the filtered totals and whether buckets were cut at `limit`
+    """
+    group_by = [key for value in group_by for key in value.split(",") if key]
+    unknown = [key for key in group_by if key not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(400, f"Unsupported group_by {', '.join(unknown)}. Use any of: {', '.join(DIMENSIONS)}")
+    for month in (from_month, to_month):
+        if month is not None and not _MONTH.match(month):
+            raise HTTPException(400, f"Invalid month '{month}', expected YYYY-MM")
+    try:
+        return await exposure_report(db, group_by, from_month, to_month, retention_band, insured_name, limit)
+    except Exception as e:
+        logger.error(f"Error building exposure report: {str(e)}")
+        raise HTTPException(500, f"Error building exposure report: {str(e)}")
+
+@router.post("/exposure/rebuild")
+async def rebuild_exposure_report(db: AsyncSession = Depends(get_db)):
+    """
+    Recompute the exposure accumulators from the policy table (after backfills that bypass ingestion)
+    """
+    try:
+        rows = await rebuild_exposure(db)
+        return {"status": "success", "accumulator_rows": rows}
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error rebuilding exposure accumulators: {str(e)}")
+        raise HTTPException(500, f"Error rebuilding exposure accumulators: {str(e)}")
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional, List
+from pydantic import BaseModel, Field, AliasChoices
+from datetime import date, datetime
+from typing import Dict, Optional, List
 
 class InsurancePolicyBase(BaseModel):
     policy_number: str
@@ -10,7 +10,7 @@ class InsurancePolicyBase(BaseModel):
     own_retention_ppn: float
     own_retention_sum_insured: float
     own_retention_premium: float
-    treaty_ppn: float  # Renamed from treaty_retention_ppn
+    treaty_ppn: float = Field(validation_alias=AliasChoices("treaty_ppn", "treaty_retention_ppn"))  # Renamed from treaty_retention_ppn
     treaty_sum_insured: float
     treaty_premium: float
     facultative_outward_ppn: Optional[float] = None
@@ -24,10 +24,43 @@ class InsurancePolicyCreate(InsurancePolicyBase):
 
 class InsurancePolicy(InsurancePolicyBase):
     vector_id: Optional[str] = None
+    validation_flags: int = 0
     
     class Config:
         from_attributes = True
 
+class PolicyListResponse(BaseModel):
+    items: List[InsurancePolicy]
+    next_cursor: Optional[str] = None
+
+class PolicyPeriodResponse(BaseModel):
+    start: date
+    end: date
+    count: int
+    policy_numbers: List[str]
+    truncated: bool = False
+
+class ExposureBucket(BaseModel):
+    """Accumulated exposure of one bucket; dimensions not grouped on are omitted"""
+    period_month: Optional[str] = None
+    retention_band: Optional[str] = None
+    insured_name: Optional[str] = None
+    policy_count: int
+    sum_insured: float
+    premium: float
+    own_retention_sum_insured: float
+    own_retention_premium: float
+    treaty_sum_insured: float
+    treaty_premium: float
+    facultative_outward_sum_insured: float
+    facultative_outward_premium: float
+
+class ExposureReportResponse(BaseModel):
+    group_by: List[str]
+    buckets: List[ExposureBucket]
+    totals: ExposureBucket
+    truncated: bool = False
+
 class QueryRequest(BaseModel):
     question: str
 
@@ -35,10 +68,31 @@ class QueryResponse(BaseModel):
     answer: str
     sources: List[str]
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str] = Field(min_length=1)
+    max_parallel: Optional[int] = Field(default=None, ge=1)
+
+class BatchQueryResult(BaseModel):
+    """One NDJSON line of a /query/batch response; `index` is the question's position in the request"""
+    index: int
+    question: str
+    answer: Optional[str] = None
+    sources: List[str] = []
+    error: Optional[str] = None
+    duplicate_of: Optional[int] = None
+
 class IngestionResponse(BaseModel):
     status: str
     message: str
     records_processed: int
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    rejected: int = 0
+    split_violations: Dict[str, int] = {}
+    vectors_queued: int = 0
+    vectors_failed: int = 0
 
 class HealthResponse(BaseModel):
     status: str
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque
+
+from fastapi import HTTPException
+
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "insurance_admission_in_flight", "Requests currently executing behind an admission controller", ["route"]
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "insurance_admission_queue_depth", "Requests waiting for an admission slot", ["route"]
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "insurance_admission_rejections", "Requests shed by an admission controller", ["route", "reason"]
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "insurance_admission_wait_seconds", "Time admitted requests spent queued", ["route"]
+)
+
+
+class AdmissionController:
+    """Bounded concurrency with a short FIFO wait queue and a queueing deadline.
+
+    At most `max_in_flight` requests execute at once and at most `max_queue` wait for a slot.
+    A request arriving with a full queue is rejected immediately with 429; a queued request
+    that is not admitted within `queue_timeout` seconds is rejected with 503. Both carry a
+    Retry-After header.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._recent_service_times: Deque[float] = deque(maxlen=50)
+        ADMISSION_IN_FLIGHT.set_function(lambda: self.in_flight, route=name)
+        ADMISSION_QUEUE_DEPTH.set_function(lambda: len(self._waiters), route=name)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Estimate seconds until a slot frees up from recent service times"""
+        if not self._recent_service_times:
+            return 1
+        average = sum(self._recent_service_times) / len(self._recent_service_times)
+        waves = (self.queue_depth + 1) / max(self.max_in_flight, 1)
+        return max(1, math.ceil(average * waves))
+
+    def _reject(self, status_code: int, reason: str, detail: str):
+        ADMISSION_REJECTIONS.inc(route=self.name, reason=reason)
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    async def acquire(self):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            ADMISSION_WAIT_SECONDS.observe(0.0, route=self.name)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject(429, "queue_full", "Too many concurrent requests, please retry later")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we gave up waiting; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject(503, "queue_timeout", "Server is overloaded, please retry later")
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, route=self.name)
+
+    def release(self):
+        # Hand the slot directly to the oldest live waiter so in_flight never exceeds the limit
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._recent_service_times.append(time.perf_counter() - started)
+            self.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "rejected_queue_full": ADMISSION_REJECTIONS.value(route=self.name, reason="queue_full"),
+            "rejected_queue_timeout": ADMISSION_REJECTIONS.value(route=self.name, reason="queue_timeout"),
+        }
@@ -1,60 +1,241 @@
 from langgraph.prebuilt import create_react_agent
-from langchain_community.utilities import SQLDatabase
 from langchain_community.agent_toolkits.sql.base import create_sql_agent
 from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
 from langchain.tools import Tool
 from langchain_pinecone import PineconeVectorStore
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.schema import Document
-from sqlalchemy import create_engine
 from src.config import settings
-from src.llm import llm
+from src.database import sync_engine
+from src.llm import get_model, route_step, sql_llm_component
+from src.services.analytics import NUMERIC_COLUMNS, run_analytics_request
+from src.services.context_builder import build_context, fetch_policies, render_table
+from src.services.embeddings import embed_query, embedding_provider
+from src.services.period_index import find_policies
+from src.services.readiness import readiness
+from src.services.sql_cache import (
+    CachedSQLDatabase, SQLCaptureCallback, evict_sql, get_cached_sql, normalize_question, store_sql
+)
+from src.utils.cache import get_cache
+from src.utils.metrics import AGENT_SECONDS, PINECONE_SECONDS, TOOL_SECONDS
+from src.utils.resilience import CircuitOpenError, gemini_chat, pinecone
+from src.utils.tracing import tracer
+import asyncio
+import contextvars
+import json
 import logging
-from typing import List
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-# Create synchronous engine for LangChain
-sync_engine = create_engine(
-    f"postgresql+psycopg2://{settings.DB_USERNAME}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+# Normalized rag_search input -> query embedding, so repeated searches skip the round-trip
+query_embedding_cache = get_cache(
+    "query_embedding", settings.QUERY_EMBEDDING_CACHE_MAX_SIZE, settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS
 )
 
-# SQL Tool
-db = SQLDatabase(engine=sync_engine)
-toolkit = SQLDatabaseToolkit(db=db, llm=llm)
-sql_agent = create_sql_agent(
-    llm=llm,
-    toolkit=toolkit,
-    verbose=True,
-    handle_parsing_errors=True
+# Heavy clients are built on first use (or by the startup warm-up), never at import time:
+# SQLDatabase introspects Postgres and PineconeVectorStore contacts Pinecone.
+
+def _build_sql_database():
+    return CachedSQLDatabase(engine=sync_engine)
+
+def _build_sql_agent():
+    llm = sql_llm_component.get()
+    toolkit = SQLDatabaseToolkit(db=sql_database.get(), llm=llm)
+    return create_sql_agent(
+        llm=llm,
+        toolkit=toolkit,
+        verbose=True,
+        handle_parsing_errors=True
+    )
+
+def _build_vectorstore():
+    return PineconeVectorStore(
+        index_name=settings.PINECONE_INDEX_NAME,
+        embedding=embedding_provider.get(),
+        namespace="insurance_namespace"
+    )
+
+_bound_models = {}
+
+def _select_model(state, runtime):
+    """Per-step model choice (see llm.route_step); tool-bound models are built once per tier"""
+    tier = route_step(state["messages"])
+    if tier not in _bound_models:
+        _bound_models[tier] = get_model(tier).bind_tools(tools)
+    return _bound_models[tier]
+
+SYSTEM_PROMPT = (
+    "You answer questions about insurance policies using four tools: policy_analytics for "
+    "totals, averages, counts, minimums and maximums (optionally grouped or filtered), "
+    "policy_period for which policies are in force on a date or expire within a date range, "
+    "sql_query for other filters and figures over the policy table, and rag_search for finding "
+    "policies by description. When a question needs several independent lookups (for example a total "
+    "from sql_query and matching policies from rag_search), request all of those tool calls "
+    "in the same turn; they run in parallel. Only wait for a result first when the next "
+    "call depends on it."
 )
 
+def _build_agent():
+    # Build both tiers up front so readiness reflects them and the first query pays no init cost
+    get_model("fast")
+    get_model("strong")
+    return create_react_agent(_select_model, tools, prompt=SYSTEM_PROMPT)
+
+sql_database = readiness.register("sql_database", _build_sql_database)
+sql_agent = readiness.register("sql_agent", _build_sql_agent)
+vectorstore = readiness.register("vectorstore", _build_vectorstore)
+agent = readiness.register("agent", _build_agent)
+
+# SQL Tool
+def _run_cached_sql(query: str, span) -> Optional[str]:
+    """Answer from SQL the agent already produced for this question, skipping the LLM"""
+    try:
+        sql = get_cached_sql(query)
+    except Exception as e:
+        logger.error(f"SQL cache lookup failed: {str(e)}")
+        return None
+    if sql is None:
+        span.set_attribute("sql.cache", "miss")
+        return None
+    try:
+        rows = sql_database.get().run(sql)
+    except Exception as e:
+        logger.warning(f"Cached SQL failed, evicting: {str(e)}")
+        evict_sql(query)
+        span.set_attribute("sql.cache", "evicted")
+        return None
+    span.set_attribute("sql.cache", "hit")
+    return f"SQL: {sql}\nResult: {rows}"
+
 def sql_query_tool(query: str) -> str:
     """Execute SQL queries on insurance database"""
     try:
-        result = sql_agent.run(query)
+        with tracer.start_span("tool.sql_query", {"tool.input": query}) as span, TOOL_SECONDS.time(tool="sql_query"):
+            result = _run_cached_sql(query, span)
+            if result is None:
+                capture = SQLCaptureCallback()
+                result = sql_agent.get().run(query, callbacks=[capture])
+                if capture.validated_sql:
+                    try:
+                        store_sql(query, capture.validated_sql)
+                    except Exception as e:
+                        logger.error(f"Failed to cache SQL: {str(e)}")
         return str(result)
     except Exception as e:
         logger.error(f"SQL query error: {str(e)}")
         return f"Error executing SQL query: {str(e)}"
 
 # RAG Tool
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/embedding-001",
-    google_api_key=settings.GOOGLE_API_KEY
-)
+def _embedding_key(query: str) -> str:
+    # Vectors from different providers are not interchangeable (the cache may outlive a switch)
+    return f"{settings.EMBEDDING_PROVIDER}:{normalize_question(query)}"
 
-vectorstore = PineconeVectorStore(
-    index_name=settings.PINECONE_INDEX_NAME,
-    embedding=embeddings,
-    namespace="insurance_namespace"
-)
+def _query_embedding(query: str) -> List[float]:
+    key = _embedding_key(query)
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        embedding = embed_query(query)
+        query_embedding_cache.set(key, embedding)
+    return embedding
 
 def rag_search_tool(query: str) -> str:
     """Search for similar insurance policies using semantic search"""
     try:
-        docs = vectorstore.similarity_search(query, k=5)
-        return "\n\n".join([doc.page_content for doc in docs])
+        with tracer.start_span("tool.rag_search", {"tool.input": query}) as span, \
+                TOOL_SECONDS.time(tool="rag_search"), PINECONE_SECONDS.time(operation="similarity_search"):
+            store = vectorstore.get()
+            embedding = _query_embedding(query)
+            docs = pinecone.call(store.similarity_search_by_vector, embedding, k=5)
+            span.set_attribute("rag.documents", len(docs))
+        return build_context(docs)
+    except Exception as e:
+        logger.error(f"RAG search error: {str(e)}")
+        return f"Error retrieving documents: {str(e)}"
+
+# Policy period tool
+def _parse_period_request(query: str) -> Tuple[str, date, date]:
+    """Kind and date range from 'YYYY-MM-DD', 'YYYY-MM-DD to YYYY-MM-DD', 'expiring ...' or '... within N days'"""
+    request = query.strip().lower()
+    kind = "expiring" if "expir" in request else "in_force"
+    dates = [date.fromisoformat(value) for value in re.findall(r"\d{4}-\d{2}-\d{2}", request)]
+    days = re.search(r"(\d+)\s*days?", request)
+    start = dates[0] if dates else date.today()
+    if len(dates) > 1:
+        end = dates[1]
+    elif days:
+        end = start + timedelta(days=int(days.group(1)))
+    else:
+        end = start
+    return kind, min(start, end), max(start, end)
+
+def policy_period_tool(query: str) -> str:
+    """Find policies in force on a date / during a range, or expiring within a range"""
+    try:
+        with tracer.start_span("tool.policy_period", {"tool.input": query}) as span, \
+                TOOL_SECONDS.time(tool="policy_period"):
+            kind, start, end = _parse_period_request(query)
+            policy_numbers = find_policies(kind, start, end)
+            span.set_attribute("period.matches", len(policy_numbers))
+            if kind == "expiring":
+                summary = f"{len(policy_numbers)} policies expire between {start} and {end}."
+            elif start == end:
+                summary = f"{len(policy_numbers)} policies are in force on {start}."
+            else:
+                summary = f"{len(policy_numbers)} policies are in force at some point between {start} and {end}."
+            shown = policy_numbers[:settings.PERIOD_TOOL_MAX_ROWS]
+            if not shown:
+                return summary
+            rows = fetch_policies(shown)
+            table = render_table([rows.get(number, {"policy_number": number}) for number in shown])
+            more = len(policy_numbers) - len(shown)
+            return f"{summary}\n{table}" + (f"\n(+{more} more policies not listed)" if more > 0 else "")
+    except ValueError as e:
+        return f"Could not read dates from '{query}': {str(e)}. Use YYYY-MM-DD."
+    except Exception as e:
+        logger.error(f"Policy period query error: {str(e)}")
+        return f"Error finding policies by period: {str(e)}"
+
+# Analytics tool
+def policy_analytics_tool(query: str) -> str:
+    """Aggregate policy columns from the in-process columnar snapshot"""
+    try:
+        with tracer.start_span("tool.policy_analytics", {"tool.input": query}), \
+                TOOL_SECONDS.time(tool="policy_analytics"):
+            return run_analytics_request(query)
+    except (ValueError, TypeError) as e:
+        # Bad request from the model: say what was wrong so it can correct the input
+        return f"Invalid analytics request: {str(e)}"
+    except Exception as e:
+        logger.error(f"Policy analytics error: {str(e)}")
+        return f"Error computing analytics: {str(e)}"
+
+# SQL tool calls block on the SQL agent and Postgres; run them on a dedicated bounded pool
+_sql_executor = ThreadPoolExecutor(max_workers=settings.SQL_TOOL_WORKERS, thread_name_prefix="sql-tool")
+
+async def asql_query_tool(query: str) -> str:
+    """Async entry point for sql_query, so it can run concurrently with other tool calls"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_sql_executor, contextvars.copy_context().run, sql_query_tool, query)
+
+async def apolicy_analytics_tool(query: str) -> str:
+    return await asyncio.to_thread(contextvars.copy_context().run, policy_analytics_tool, query)
+
+async def apolicy_period_tool(query: str) -> str:
+    return await asyncio.to_thread(contextvars.copy_context().run, policy_period_tool, query)
+
+async def arag_search_tool(query: str) -> str:
+    """Async entry point for rag_search: hedged embedding, then async vector search"""
+    try:
+        with tracer.start_span("tool.rag_search", {"tool.input": query}) as span, TOOL_SECONDS.time(tool="rag_search"):
+            store = vectorstore.get() if vectorstore.ready else await asyncio.to_thread(vectorstore.get)
+            embedding = await asyncio.to_thread(_query_embedding, query)
+            with PINECONE_SECONDS.time(operation="similarity_search"):
+                docs = await pinecone.acall(store.asimilarity_search_by_vector, embedding, k=5)
+            span.set_attribute("rag.documents", len(docs))
+            return await asyncio.to_thread(build_context, docs)
     except Exception as e:
         logger.error(f"RAG search error: {str(e)}")
         return f"Error retrieving documents: {str(e)}"
@@ -64,23 +245,53 @@ tools = [
     Tool(
         name="sql_query",
         func=sql_query_tool,
+        coroutine=asql_query_tool,
         description="Use for structured queries on insurance data like sums, averages, filters, and specific policy details."
     ),
+    Tool(
+        name="policy_analytics",
+        func=policy_analytics_tool,
+        coroutine=apolicy_analytics_tool,
+        description=(
+            "Use for totals, averages, counts, minimums and maximums over policies, optionally grouped "
+            "or filtered. Input is JSON, e.g. "
+            + json.dumps({"metrics": ["count", "sum:premium"], "group_by": "insured_name",
+                          "filters": {"insured_name": "dangote", "premium": [1000, None], "in_force_on": "2024-03-01"},
+                          "limit": 10})
+            + ". Aggregates: count, sum, avg, min, max. Columns: " + ", ".join(NUMERIC_COLUMNS)
+            + ", insurance_period_start_date, insurance_period_end_date. "
+            "group_by: insured_name, start_month, end_month, start_year or end_year."
+        )
+    ),
+    Tool(
+        name="policy_period",
+        func=policy_period_tool,
+        coroutine=apolicy_period_tool,
+        description=(
+            "Use for which policies are in force on a date or during a date range, or expire within a range. "
+            "Input: 'YYYY-MM-DD', 'YYYY-MM-DD to YYYY-MM-DD', 'expiring YYYY-MM-DD to YYYY-MM-DD' "
+            "or 'expiring within N days'."
+        )
+    ),
     Tool(
         name="rag_search",
         func=rag_search_tool,
+        coroutine=arag_search_tool,
         description="Use for semantic search on policy details, finding similar policies, or understanding policy context."
     )
 ]
 
-# Create LangGraph ReAct Agent
-agent = create_react_agent(llm, tools)
-
-def query_agent(question: str) -> str:
-    """Query the agent with a question and return the response"""
+async def aquery_agent(question: str) -> str:
+    """Async agent run; independent tool calls requested in one step execute concurrently"""
     try:
-        response = agent.invoke({"messages": [{"role": "user", "content": question}]})
+        with tracer.start_span("query_agent") as span, AGENT_SECONDS.time():
+            compiled = agent.get() if agent.ready else await asyncio.to_thread(agent.get)
+            response = await gemini_chat.acall(compiled.ainvoke, {"messages": [{"role": "user", "content": question}]})
+            span.set_attribute("agent.messages", len(response['messages']))
         return response['messages'][-1].content
+    except CircuitOpenError as e:
+        logger.error(f"Agent query rejected: {str(e)}")
+        return "The language model is temporarily unavailable. Please try again shortly."
     except Exception as e:
         logger.error(f"Agent query error: {str(e)}")
-        return "I apologize, but I encountered an error while processing your query."
\ No newline at end of file
+        return "I apologize, but I encountered an error while processing your query."
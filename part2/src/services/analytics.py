@@ -0,0 +1,319 @@
+"""In-process columnar snapshot of insurance_policies for aggregate questions.
+
+The numeric and date columns are held as NumPy arrays, and insured names as factorized codes.
+Aggregates (count/sum/avg/min/max) with optional filters and a group-by key are computed with
+vectorized column operations and np.bincount, without a round-trip to Postgres. The snapshot
+records the table's data version. When an ingest (in this or another process) moves that
+version, a replacement is loaded in a background thread and queries keep using the current
+snapshot, so analytic latency does not depend on Postgres load.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src.config import settings
+from src.database import sync_engine
+from src.services.readiness import readiness
+from src.services.sql_cache import read_table_version
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_SECONDS = REGISTRY.histogram(
+    "insurance_analytics_seconds", "Latency of columnar snapshot loads and aggregate queries", ["operation"]
+)
+
+NUMERIC_COLUMNS = [
+    "sum_insured", "premium",
+    "own_retention_ppn", "own_retention_sum_insured", "own_retention_premium",
+    "treaty_retention_ppn", "treaty_sum_insured", "treaty_premium",
+    "facultative_outward_ppn", "facultative_outward_sum_insured", "facultative_outward_premium",
+]
+DATE_COLUMNS = ["insurance_period_start_date", "insurance_period_end_date"]
+AGGREGATES = ("count", "sum", "avg", "min", "max")
+GROUP_KEYS = ("insured_name", "start_month", "end_month", "start_year", "end_year")
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+_LOAD_QUERY = (
+    f"SELECT insured_name, {', '.join(NUMERIC_COLUMNS + DATE_COLUMNS)} FROM {settings.TABLE_NAME}"
+)
+
+
+def _date_to_day(value: Any) -> float:
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    if isinstance(value, datetime):
+        value = value.date()
+    return float((np.datetime64(value, "D") - _EPOCH).astype(np.int64))
+
+
+def parse_metric(spec: str) -> Tuple[str, Optional[str]]:
+    """'count' or '<aggregate>:<column>', e.g. 'sum:premium'"""
+    func, _, column = spec.strip().lower().partition(":")
+    if func not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate '{func}', expected one of {', '.join(AGGREGATES)}")
+    if func == "count" and not column:
+        return func, None
+    if column not in NUMERIC_COLUMNS + DATE_COLUMNS:
+        raise ValueError(f"Unknown column '{column}'")
+    if column in DATE_COLUMNS and func in ("sum", "avg"):
+        raise ValueError(f"Cannot {func} a date column")
+    return func, column
+
+
+class ColumnarSnapshot:
+    """Immutable column arrays of the policy table at one data version"""
+
+    def __init__(self, frame: pd.DataFrame, version: Optional[int] = None):
+        self.version = version
+        self.rows = len(frame)
+        # Dates are stored as float day numbers (NaN when missing) so they share the numeric paths
+        self.columns: Dict[str, np.ndarray] = {
+            column: pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            for column in NUMERIC_COLUMNS
+        }
+        for column in DATE_COLUMNS:
+            days = pd.to_datetime(frame[column], errors="coerce").to_numpy(dtype="datetime64[D]")
+            values = (days - _EPOCH).astype(np.int64).astype(np.float64)
+            values[np.isnat(days)] = np.nan
+            self.columns[column] = values
+        codes, names = pd.factorize(frame["insured_name"])
+        self.name_codes = codes.astype(np.int64)
+        self.names = np.asarray(names, dtype=object)
+        self._groups: Dict[Optional[str], Tuple[np.ndarray, List[Any]]] = {}
+
+    def _filter(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Row mask for filters: insured_name (substring), in_force_on (date), or column: [low, high]"""
+        if not filters:
+            return None
+        mask = np.ones(self.rows, dtype=bool)
+        for key, value in filters.items():
+            if key == "insured_name":
+                matched = pd.Index(self.names).str.contains(str(value), case=False, regex=False, na=False)
+                mask &= np.isin(self.name_codes, np.flatnonzero(matched))
+            elif key == "in_force_on":
+                day = _date_to_day(value)
+                mask &= (self.columns[DATE_COLUMNS[0]] <= day) & (self.columns[DATE_COLUMNS[1]] >= day)
+            elif key in self.columns:
+                low, high = value if isinstance(value, (list, tuple)) else (value, value)
+                convert = _date_to_day if key in DATE_COLUMNS else float
+                values = self.columns[key]
+                if low is not None:
+                    mask &= values >= convert(low)
+                if high is not None:
+                    mask &= values <= convert(high)
+            else:
+                raise ValueError(f"Unknown filter '{key}'")
+        return mask
+
+    def _group_codes(self, group_by: Optional[str]) -> Tuple[np.ndarray, List[Any]]:
+        """Group number per row and the label of each group (None for missing keys); computed once per key"""
+        if group_by not in self._groups:
+            self._groups[group_by] = self._compute_group_codes(group_by)
+        return self._groups[group_by]
+
+    def _compute_group_codes(self, group_by: Optional[str]) -> Tuple[np.ndarray, List[Any]]:
+        if group_by is None:
+            return np.zeros(self.rows, dtype=np.int64), [None]
+        if group_by == "insured_name":
+            codes, labels = self.name_codes, list(self.names)
+        elif group_by in ("start_month", "end_month", "start_year", "end_year"):
+            days = self.columns[DATE_COLUMNS[0] if group_by.startswith("start") else DATE_COLUMNS[1]]
+            unit = "M" if group_by.endswith("month") else "Y"
+            present = ~np.isnan(days)
+            periods = np.full(self.rows, -1, dtype=np.int64)
+            periods[present] = (_EPOCH + days[present].astype(np.int64)).astype(f"datetime64[{unit}]").astype(np.int64)
+            uniques, inverse = np.unique(periods[present], return_inverse=True)
+            codes = np.full(self.rows, -1, dtype=np.int64)
+            codes[present] = inverse
+            labels = [str(np.datetime64(int(p), unit)) for p in uniques]
+        else:
+            raise ValueError(f"Unknown group_by '{group_by}', expected one of {', '.join(GROUP_KEYS)}")
+        # Rows without a key form their own trailing group
+        return np.where(codes < 0, len(labels), codes), labels + [None]
+
+    def aggregate(self, metrics: Sequence[str], group_by: Optional[str] = None,
+                  filters: Optional[Dict[str, Any]] = None, order_by: Optional[str] = None,
+                  descending: bool = True, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Aggregate `metrics` (e.g. ['count', 'sum:premium']) over matching rows, per group"""
+        parsed = [parse_metric(metric) for metric in metrics] or [("count", None)]
+        names = [f"{func}:{column}" if column else func for func, column in parsed]
+        codes, labels = self._group_codes(group_by)
+        mask = self._filter(filters)
+        if mask is not None:
+            codes = codes[mask]
+        n_groups = len(labels)
+        row_counts = np.bincount(codes, minlength=n_groups)
+        present = np.flatnonzero(row_counts)
+
+        # Min/max: one stable sort by group, then a reduceat over each group's run
+        order = bounds = None
+        results: Dict[str, np.ndarray] = {}
+        for name, (func, column) in zip(names, parsed):
+            if func == "count":
+                results[name] = row_counts[present].astype(np.float64)
+                continue
+            values = self.columns[column] if mask is None else self.columns[column][mask]
+            valid = ~np.isnan(values)
+            if func in ("sum", "avg"):
+                sums = np.bincount(codes, weights=np.where(valid, values, 0.0), minlength=n_groups)
+                counts = np.bincount(codes, weights=valid, minlength=n_groups)
+                # Like SQL, a group with no values has a NULL sum rather than 0
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    totals = sums if func == "sum" else sums / counts
+                results[name] = np.where(counts > 0, totals, np.nan)[present]
+            else:
+                if order is None:
+                    order = np.argsort(codes, kind="stable")
+                    bounds = np.searchsorted(codes[order], present)
+                reducer = np.fmin if func == "min" else np.fmax  # skip NaN unless the group is all NaN
+                results[name] = reducer.reduceat(values[order], bounds) if len(present) else np.empty(0)
+
+        key = order_by or names[0]
+        if key not in results:
+            raise ValueError(f"order_by must be one of the requested metrics: {', '.join(names)}")
+        # Missing values sort last either way; ties keep group order
+        ordering = np.nan_to_num(results[key], nan=-np.inf if descending else np.inf)
+        ranking = np.argsort(-ordering if descending else ordering, kind="stable")
+        total_groups = len(ranking)
+        ranking = ranking[:limit or settings.ANALYTICS_MAX_GROUPS]
+
+        rows = []
+        for i in ranking:
+            row: Dict[str, Any] = {group_by: labels[present[i]]} if group_by else {}
+            for name, (func, column) in zip(names, parsed):
+                value = float(results[name][i])
+                if np.isnan(value):
+                    row[name] = None
+                elif func == "count":
+                    row[name] = int(value)
+                elif column in DATE_COLUMNS:
+                    row[name] = (_EPOCH + np.timedelta64(int(value), "D")).item()
+                else:
+                    row[name] = value
+            rows.append(row)
+        return {
+            "columns": ([group_by] if group_by else []) + names,
+            "rows": rows,
+            "groups": total_groups,
+            "matched_rows": int(row_counts.sum()),
+            "data_version": self.version,
+        }
+
+
+class AnalyticsEngine:
+    """Holds the current snapshot and swaps in a reloaded one when the data version moves"""
+
+    def __init__(self):
+        self._snapshot: Optional[ColumnarSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def load(self) -> ColumnarSnapshot:
+        """Read the policy table into a new snapshot and make it current"""
+        with self._lock, ANALYTICS_SECONDS.time(operation="load"):
+            with sync_engine.connect() as connection:
+                version = read_table_version(connection)
+                frame = pd.read_sql(text(_LOAD_QUERY), connection)
+            self._snapshot = ColumnarSnapshot(frame, version)
+            self._checked_at = time.monotonic()
+        logger.info(f"Loaded analytics snapshot of {self._snapshot.rows} policies (data version {version})")
+        return self._snapshot
+
+    def _background_load(self):
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"Failed to refresh analytics snapshot: {str(e)}")
+
+    def request_refresh(self):
+        """Reload in the background; queries keep using the current snapshot meanwhile"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self._background_load, name="analytics-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def snapshot(self) -> ColumnarSnapshot:
+        """Current snapshot, loading it on first use and scheduling a reload when the data changed"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+        if time.monotonic() - self._checked_at >= settings.DATA_VERSION_TTL_SECONDS:
+            self._checked_at = time.monotonic()
+            try:
+                with sync_engine.connect() as connection:
+                    version = read_table_version(connection)
+                if version != snapshot.version:
+                    self.request_refresh()
+            except Exception as e:
+                logger.error(f"Failed to read data version for analytics: {str(e)}")
+        return snapshot
+
+    def aggregate(self, metrics: Sequence[str], **options: Any) -> Dict[str, Any]:
+        snapshot = self.snapshot()
+        with ANALYTICS_SECONDS.time(operation="aggregate"):
+            return snapshot.aggregate(metrics, **options)
+
+
+def _format_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value).replace("|", "/")
+
+
+def render_result(result: Dict[str, Any]) -> str:
+    """Pipe-separated table of an aggregate result, for the agent"""
+    lines = ["|".join(result["columns"])]
+    lines.extend("|".join(_format_cell(row.get(column)) for column in result["columns"]) for row in result["rows"])
+    if result["groups"] > len(result["rows"]):
+        lines.append(f"(top {len(result['rows'])} of {result['groups']} groups)")
+    lines.append(f"({result['matched_rows']} matching policies)")
+    return "\n".join(lines)
+
+
+def run_analytics_request(request: str) -> str:
+    """Agent entry point: a JSON aggregate request rendered as a table"""
+    spec = json.loads(request)
+    if not isinstance(spec, dict):
+        raise ValueError("Expected a JSON object")
+    metrics = spec.get("metrics") or ["count"]
+    if isinstance(metrics, str):
+        metrics = [metrics]
+    result = analytics_engine.aggregate(
+        metrics,
+        group_by=spec.get("group_by"),
+        filters=spec.get("filters"),
+        order_by=spec.get("order_by"),
+        descending=spec.get("descending", True),
+        limit=spec.get("limit"),
+    )
+    return render_result(result)
+
+
+analytics_engine = AnalyticsEngine()
+
+
+def _load_analytics() -> AnalyticsEngine:
+    analytics_engine.load()
+    return analytics_engine
+
+
+# Loaded by the startup warm-up; callers fall back to SQL until it is ready
+analytics_component = readiness.register("analytics", _load_analytics, required=False)
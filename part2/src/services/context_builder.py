@@ -0,0 +1,160 @@
+"""Render retrieved policies as a compact table for the agent prompt.
+
+Instead of one labelled paragraph per policy, policies become rows of a single pipe-separated
+table with short headers printed once. Columns that are empty for every row are dropped,
+columns with one shared value are hoisted into a single line, and rows are added in retrieval
+order until the token budget is spent.
+"""
+import logging
+import math
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+
+from src.config import settings
+from src.database import sync_engine
+from src.utils.metrics import COUNT_BUCKETS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKENS = REGISTRY.histogram(
+    "insurance_context_tokens", "Estimated tokens of retrieval context before and after compaction",
+    ["stage"], buckets=COUNT_BUCKETS
+)
+
+# Column -> short header, in display order
+CONTEXT_COLUMNS = {
+    "policy_number": "policy",
+    "insured_name": "insured",
+    "sum_insured": "sum_insured",
+    "premium": "premium",
+    "own_retention_ppn": "own_ppn",
+    "own_retention_sum_insured": "own_si",
+    "own_retention_premium": "own_prem",
+    "treaty_retention_ppn": "treaty_ppn",
+    "treaty_sum_insured": "treaty_si",
+    "treaty_premium": "treaty_prem",
+    "facultative_outward_ppn": "fac_ppn",
+    "facultative_outward_sum_insured": "fac_si",
+    "facultative_outward_premium": "fac_prem",
+    "insurance_period_start_date": "start",
+    "insurance_period_end_date": "end",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count (~4 characters per token) without a tokenizer round-trip"""
+    return math.ceil(len(text) / 4)
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value).replace("|", "/").replace("\n", " ").strip()
+
+
+def fetch_policies(policy_numbers: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """Load full rows for the given policies in one query"""
+    if not policy_numbers:
+        return {}
+    query = text(
+        f"SELECT {', '.join(CONTEXT_COLUMNS)} FROM {settings.TABLE_NAME} "
+        f"WHERE policy_number = ANY(:policy_numbers)"
+    )
+    with sync_engine.connect() as connection:
+        rows = connection.execute(query, {"policy_numbers": list(policy_numbers)}).mappings().all()
+    return {row["policy_number"]: dict(row) for row in rows}
+
+
+def render_table(records: List[Dict[str, Any]], token_budget: Optional[int] = None) -> str:
+    """Compact table of `records`, truncated to `token_budget` estimated tokens"""
+    if not records:
+        return "No matching policies found."
+    budget = settings.CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+
+    cells = [{column: _format_value(record.get(column)) for column in CONTEXT_COLUMNS} for record in records]
+    present = [column for column in CONTEXT_COLUMNS if any(row[column] for row in cells)]
+    shared = [
+        column for column in present
+        if len(cells) > 1 and column != "policy_number" and len({row[column] for row in cells}) == 1
+    ]
+    columns = [column for column in present if column not in shared]
+
+    lines = []
+    if shared:
+        lines.append("All rows: " + ", ".join(f"{CONTEXT_COLUMNS[c]}={cells[0][c]}" for c in shared))
+    lines.append("|".join(CONTEXT_COLUMNS[column] for column in columns))
+    used = estimate_tokens("\n".join(lines))
+
+    included = 0
+    for row in cells:
+        line = "|".join(row[column] for column in columns)
+        cost = estimate_tokens(line) + 1
+        if included and used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+        included += 1
+    if included < len(cells):
+        lines.append(f"(+{len(cells) - included} more policies omitted)")
+    return "\n".join(lines)
+
+
+def fit_texts(texts: Sequence[str], token_budget: int) -> List[str]:
+    """Keep texts in order within `token_budget` estimated tokens, cutting the one that crosses it"""
+    kept: List[str] = []
+    used = 0
+    for text_part in texts:
+        cost = estimate_tokens(text_part) + 1  # separator
+        if used + cost <= token_budget:
+            kept.append(text_part)
+            used += cost
+            continue
+        remaining = token_budget - used - 2  # separator and truncation marker
+        if remaining > 0:
+            kept.append(text_part[:remaining * 4].rstrip() + " ...")
+        break
+    if len(kept) < len(texts):
+        kept.append(f"(+{len(texts) - len(kept)} more documents omitted)")
+    return kept
+
+
+def build_context(docs: Sequence[Any], token_budget: Optional[int] = None) -> str:
+    """Render retrieved documents as a compact policy table and record token counts before and after"""
+    raw = "\n\n".join(doc.page_content for doc in docs)
+
+    records: List[Dict[str, Any]] = []
+    unstructured: List[str] = []
+    for doc in docs:
+        metadata = dict(getattr(doc, "metadata", None) or {})
+        if metadata.get("policy_number"):
+            records.append(metadata)
+        else:
+            unstructured.append(doc.page_content)
+
+    # Vector metadata carries only a few fields; fill in the rest from Postgres in one round-trip
+    if records and settings.CONTEXT_FETCH_FROM_DB:
+        try:
+            rows = fetch_policies([record["policy_number"] for record in records])
+            records = [{**record, **rows.get(record["policy_number"], {})} for record in records]
+        except Exception as e:
+            logger.error(f"Failed to fetch policies for context: {str(e)}")
+
+    budget = settings.CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    parts = [render_table(records, budget)] if records else []
+    if unstructured:
+        # Documents without policy metadata share whatever budget the table left
+        used = sum(estimate_tokens(part) + 1 for part in parts)
+        parts.extend(fit_texts(unstructured, max(budget - used, 0)))
+    context = "\n\n".join(parts) if parts else render_table([])
+
+    CONTEXT_TOKENS.observe(estimate_tokens(raw), stage="raw")
+    CONTEXT_TOKENS.observe(estimate_tokens(context), stage="compact")
+    return context
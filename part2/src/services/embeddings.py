@@ -0,0 +1,199 @@
+"""Embedding providers behind one interface, selected by EMBEDDING_PROVIDER.
+
+- gemini: the remote Gemini embedding model; calls go through the gemini_embeddings
+  RemoteDependency (timeouts, retries, circuit breaker, hedged query embeddings).
+- onnx: a local ONNX Runtime model (for example a sentence-transformers export) loaded from
+  EMBEDDING_ONNX_MODEL_PATH. Texts are tokenized, length-sorted and split into batches that run
+  concurrently on a thread pool, then mean-pooled and L2-normalized.
+
+Providers are LangChain `Embeddings`, so the vector store uses the same object as ingestion and
+the Pinecone client. Each reports its `dimension`, which the Pinecone index must match.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import google.generativeai as genai
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.config import configure_genai, settings
+from src.services.readiness import readiness
+from src.utils.metrics import EMBEDDING_SECONDS
+from src.utils.resilience import RemoteDependency, gemini_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider(Embeddings):
+    """Embeddings with a known output dimension; `dependency` guards remote providers"""
+
+    name = "base"
+    dimension: int = 0
+    batch_size: int = 100
+    dependency: Optional[RemoteDependency] = None
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """Gemini embedding model; documents and queries use their retrieval task types"""
+
+    name = "gemini"
+    batch_size = 100  # texts per embed_content request
+    dependency = gemini_embeddings
+
+    def __init__(self):
+        configure_genai()
+        self.model = settings.GEMINI_EMBEDDING_MODEL
+        self.dimension = settings.GEMINI_EMBEDDING_DIMENSION
+
+    def _embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            result = genai.embed_content(model=self.model, content=texts[i:i + self.batch_size], task_type=task_type)
+            vectors.extend(result["embedding"])
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts), "retrieval_document")
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts), "retrieval_query")
+
+    def embed_query(self, text: str) -> List[float]:
+        return genai.embed_content(model=self.model, content=text, task_type="retrieval_query")["embedding"]
+
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """Local CPU embedding model run with ONNX Runtime"""
+
+    name = "onnx"
+
+    def __init__(self, model_path: Optional[str] = None):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError("The onnx embedding provider requires the onnxruntime and tokenizers packages")
+
+        model_path = model_path or settings.EMBEDDING_ONNX_MODEL_PATH
+        model_file = model_path if model_path.endswith(".onnx") else os.path.join(model_path, "model.onnx")
+        tokenizer_file = settings.EMBEDDING_ONNX_TOKENIZER_PATH or os.path.join(os.path.dirname(model_file), "tokenizer.json")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = settings.EMBEDDING_ONNX_INTRA_OP_THREADS
+        self.session = ort.InferenceSession(model_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_file)
+        self.tokenizer.enable_truncation(max_length=settings.EMBEDDING_MAX_TOKENS)
+        if self.tokenizer.padding is None:
+            self.tokenizer.enable_padding()
+        self.batch_size = settings.EMBEDDING_BATCH_SIZE
+        self.pool = ThreadPoolExecutor(max_workers=settings.EMBEDDING_WORKERS, thread_name_prefix="embedding")
+        self.dimension = self._run(["dimension probe"]).shape[1]
+        logger.info(f"Loaded ONNX embedding model {model_file} ({self.dimension} dimensions)")
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        output = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+        if output.ndim == 3:
+            # Token embeddings: mean over the real (unpadded) tokens
+            weights = mask[:, :, None].astype(np.float32)
+            output = (output * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        output = output.astype(np.float32)
+        output /= np.maximum(np.linalg.norm(output, axis=1, keepdims=True), 1e-12)
+        return output
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Similar lengths per batch keep padding (wasted compute) small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for batch, output in zip(batches, self.pool.map(lambda batch: self._run([texts[i] for i in batch]), batches)):
+            vectors[batch] = output
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed([settings.EMBEDDING_DOCUMENT_PREFIX + text for text in texts])
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._embed([settings.EMBEDDING_QUERY_PREFIX + text for text in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+
+PROVIDERS: Dict[str, Callable[[], EmbeddingProvider]] = {
+    "gemini": GeminiEmbeddingProvider,
+    "onnx": OnnxEmbeddingProvider,
+}
+
+
+def _build_provider() -> EmbeddingProvider:
+    if settings.EMBEDDING_PROVIDER not in PROVIDERS:
+        raise ValueError(
+            f"Unknown EMBEDDING_PROVIDER '{settings.EMBEDDING_PROVIDER}'. Use one of: {', '.join(PROVIDERS)}"
+        )
+    return PROVIDERS[settings.EMBEDDING_PROVIDER]()
+
+
+embedding_provider = readiness.register("embeddings", _build_provider)
+
+
+def embed_documents(texts: Sequence[str]) -> List[List[float]]:
+    """Embed documents, one guarded call per request-sized batch for remote providers"""
+    provider = embedding_provider.get()
+    texts = list(texts)
+    with EMBEDDING_SECONDS.time(source=provider.name):
+        if provider.dependency is None:
+            return provider.embed_documents(texts)
+        vectors = []
+        for i in range(0, len(texts), provider.batch_size):
+            vectors.extend(provider.dependency.call(provider.embed_documents, texts[i:i + provider.batch_size]))
+        return vectors
+
+
+def embed_queries(texts: Sequence[str]) -> List[List[float]]:
+    provider = embedding_provider.get()
+    with EMBEDDING_SECONDS.time(source=provider.name):
+        if provider.dependency is None:
+            return provider.embed_queries(list(texts))
+        return provider.dependency.call(provider.embed_queries, list(texts))
+
+
+def embed_query(text: str) -> List[float]:
+    """Query embeddings are small idempotent reads: a slow remote attempt is hedged with a duplicate"""
+    provider = embedding_provider.get()
+    with EMBEDDING_SECONDS.time(source=provider.name):
+        if provider.dependency is None:
+            return provider.embed_query(text)
+        return provider.dependency.hedged_call(provider.embed_query, text)
+
+
+async def aembed_documents(texts: Sequence[str]) -> List[List[float]]:
+    provider = embedding_provider.get() if embedding_provider.ready else await asyncio.to_thread(embedding_provider.get)
+    texts = list(texts)
+    with EMBEDDING_SECONDS.time(source=provider.name):
+        if provider.dependency is None:
+            return await asyncio.to_thread(provider.embed_documents, texts)
+        vectors = []
+        for i in range(0, len(texts), provider.batch_size):
+            vectors.extend(await provider.dependency.acall(provider.embed_documents, texts[i:i + provider.batch_size]))
+        return vectors
+
+
+async def aembed_query(text: str) -> List[float]:
+    return await asyncio.to_thread(embed_query, text)
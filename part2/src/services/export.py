@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from datetime import date
+from io import BytesIO
+from typing import AsyncIterator, List, Optional, Tuple
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BYTES = REGISTRY.counter(
+    "insurance_export_bytes", "Bytes streamed by the policy export endpoint", ["format"]
+)
+
+# Column order of every export format
+EXPORT_COLUMNS = [
+    "policy_number",
+    "insured_name",
+    "sum_insured",
+    "premium",
+    "own_retention_ppn",
+    "own_retention_sum_insured",
+    "own_retention_premium",
+    "treaty_retention_ppn",
+    "treaty_sum_insured",
+    "treaty_premium",
+    "facultative_outward_ppn",
+    "facultative_outward_sum_insured",
+    "facultative_outward_premium",
+    "insurance_period_start_date",
+    "insurance_period_end_date",
+    "vector_id",
+]
+
+_STRING_COLUMNS = {"policy_number", "insured_name", "vector_id"}
+_DATE_COLUMNS = {"insurance_period_start_date", "insurance_period_end_date"}
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+
+_DONE = object()
+
+
+def build_export_query(start_date: Optional[date] = None, end_date: Optional[date] = None,
+                       insured_name: Optional[str] = None) -> Tuple[str, List]:
+    """SELECT over insurance_policies with optional filters, using asyncpg positional parameters"""
+    conditions, args = [], []
+    if start_date is not None:
+        args.append(start_date)
+        conditions.append(f"insurance_period_start_date >= ${len(args)}")
+    if end_date is not None:
+        args.append(end_date)
+        conditions.append(f"insurance_period_end_date <= ${len(args)}")
+    if insured_name:
+        args.append(f"%{insured_name}%")
+        conditions.append(f"insured_name ILIKE ${len(args)}")
+
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM {settings.TABLE_NAME}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query, args
+
+
+async def _copy_chunks(query: str, args: List, copy_options: dict) -> AsyncIterator[bytes]:
+    """Run COPY (query) TO STDOUT and yield the raw chunks as Postgres sends them.
+
+    A bounded queue between the COPY sink and the consumer applies backpressure: when the
+    HTTP client reads slowly, asyncpg stops reading from the server, so memory stays at
+    roughly EXPORT_QUEUE_CHUNKS chunks regardless of table size.
+    """
+    async with AsyncSessionLocal() as session:
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=settings.EXPORT_QUEUE_CHUNKS)
+
+        async def sink(chunk: bytes):
+            await chunks.put(bytes(chunk))
+
+        async def run_copy():
+            try:
+                await driver_connection.copy_from_query(query, *args, output=sink, **copy_options)
+            finally:
+                await chunks.put(_DONE)
+
+        copy_task = asyncio.create_task(run_copy())
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is _DONE:
+                    break
+                yield chunk
+            # Surface COPY errors to the response stream
+            await copy_task
+        finally:
+            if not copy_task.done():
+                copy_task.cancel()
+                try:
+                    await copy_task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+
+async def _stream_csv(query: str, args: List) -> AsyncIterator[bytes]:
+    async for chunk in _copy_chunks(query, args, {"format": "csv", "header": True}):
+        yield chunk
+
+
+async def _stream_ndjson(query: str, args: List) -> AsyncIterator[bytes]:
+    # row_to_json emits one JSON document per row; CSV mode with control characters as
+    # quote/delimiter passes it through unescaped (text mode would double every backslash)
+    json_query = f"SELECT row_to_json(t) FROM ({query}) t"
+    options = {"format": "csv", "quote": "\x01", "delimiter": "\x02"}
+    async for chunk in _copy_chunks(json_query, args, options):
+        yield chunk
+
+
+def _last_row_end(data: bytes) -> int:
+    """Offset just past the last newline that ends a CSV row, or 0 when none does
+
+    Quoted fields may contain newlines; a newline ends a row only when the quotes before it
+    are balanced (an escaped quote is doubled, so it does not change the parity).
+    """
+    end = data.rfind(b"\n")
+    quotes = data.count(b'"', 0, end) if end >= 0 else 0
+    while end >= 0:
+        if quotes % 2 == 0:
+            return end + 1
+        previous = data.rfind(b"\n", 0, end)
+        quotes -= data.count(b'"', max(previous, 0), end)
+        end = previous
+    return 0
+
+
+async def _stream_arrow(query: str, args: List) -> AsyncIterator[bytes]:
+    """Re-encode the CSV COPY stream as Arrow IPC record batches of bounded size"""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    fields = []
+    for column in EXPORT_COLUMNS:
+        if column in _STRING_COLUMNS:
+            fields.append(pa.field(column, pa.string()))
+        elif column in _DATE_COLUMNS:
+            fields.append(pa.field(column, pa.date32()))
+        else:
+            fields.append(pa.field(column, pa.float64()))
+    schema = pa.schema(fields)
+    convert_options = pa_csv.ConvertOptions(
+        column_types={field.name: field.type for field in schema},
+        strings_can_be_null=True,
+    )
+    read_options = pa_csv.ReadOptions(column_names=EXPORT_COLUMNS)
+
+    sink = BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    def write_lines(lines: bytes):
+        table = pa_csv.read_csv(BytesIO(lines), read_options=read_options, convert_options=convert_options)
+        for batch in table.to_batches():
+            writer.write_batch(batch)
+
+    yield drain()  # schema message
+
+    parts: List[bytes] = []
+    buffered = 0
+    async for chunk in _copy_chunks(query, args, {"format": "csv", "header": False}):
+        parts.append(chunk)
+        buffered += len(chunk)
+        if buffered < settings.EXPORT_ARROW_BATCH_BYTES:
+            continue
+        pending = b"".join(parts)
+        cut = _last_row_end(pending)
+        if cut == 0:
+            parts = [pending]
+            continue
+        write_lines(pending[:cut])
+        parts = [pending[cut:]]
+        buffered = len(parts[0])
+        yield drain()
+
+    if buffered:
+        write_lines(b"".join(parts))
+    writer.close()
+    yield drain()
+
+
+async def stream_policies(export_format: str, start_date: Optional[date] = None,
+                          end_date: Optional[date] = None,
+                          insured_name: Optional[str] = None) -> AsyncIterator[bytes]:
+    """Stream insurance_policies in the requested format without materializing the result"""
+    query, args = build_export_query(start_date, end_date, insured_name)
+    streams = {"csv": _stream_csv, "ndjson": _stream_ndjson, "arrow": _stream_arrow}
+    total = 0
+    try:
+        async for chunk in streams[export_format](query, args):
+            if chunk:
+                total += len(chunk)
+                EXPORT_BYTES.inc(len(chunk), format=export_format)
+                yield chunk
+    except Exception as e:
+        logger.error(f"Policy export failed after {total} bytes: {str(e)}")
+        raise
+    logger.info(f"Exported {total} bytes of policies as {export_format}")
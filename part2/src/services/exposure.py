@@ -0,0 +1,300 @@
+"""Portfolio exposure accumulators: premium and sum insured by period month, retention band and insured.
+
+exposure_accumulators holds one row per bucket for every grouping set of the three dimensions
+(the CUBE): `grouping_set` is a bitmask of the dimensions a row keeps, and rolled-up dimensions
+store '*'. Ingestion applies deltas in the same transaction as the policy upsert: every written
+policy's previous contribution is subtracted and its new one added, so the table always matches
+insurance_policies without rescanning it. Reports read only the rows of one grouping set, so
+their cost depends on the number of buckets returned, not on the size of the book.
+
+Writers serialize on a transaction-level advisory lock, which makes the "previous values" read
+by an ingest exact even when several ingests run at once. rebuild_exposure recomputes the table
+from insurance_policies (after backfills that bypass ingestion, or a change of retention bands).
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EXPOSURE_DELTA_ROWS = REGISTRY.counter(
+    "insurance_exposure_delta_rows", "Exposure accumulator rows changed by ingests"
+)
+EXPOSURE_REBUILD_SECONDS = REGISTRY.gauge(
+    "insurance_exposure_rebuild_seconds", "Duration of the last full exposure accumulator rebuild"
+)
+
+DIMENSIONS = ("period_month", "retention_band", "insured_name")
+AMOUNT_COLUMNS = [
+    "sum_insured", "premium",
+    "own_retention_sum_insured", "own_retention_premium",
+    "treaty_sum_insured", "treaty_premium",
+    "facultative_outward_sum_insured", "facultative_outward_premium",
+]
+MEASURES = ["policy_count"] + AMOUNT_COLUMNS
+# Policy columns an accumulator row is derived from
+SOURCE_COLUMNS = ["insurance_period_start_date", "own_retention_ppn", "insured_name"] + AMOUNT_COLUMNS
+
+ALL = "*"
+# Float residue left when a rewrite cancels out, far below a cent
+AMOUNT_EPSILON = 1e-6
+UNKNOWN_MONTH = "unknown"
+UNKNOWN_BAND = "unknown"
+UNKNOWN_INSURED = "Unknown"
+
+# Arbitrary constant shared by every writer of exposure_accumulators
+EXPOSURE_LOCK_KEY = 0x6578706F
+
+_LOCK = text("SELECT pg_advisory_xact_lock(:key)")
+
+_APPLY_DELTA = text(f"""
+    INSERT INTO exposure_accumulators (grouping_set, {', '.join(DIMENSIONS)}, {', '.join(MEASURES)})
+    VALUES (:grouping_set, {', '.join(':' + c for c in DIMENSIONS)}, {', '.join(':' + c for c in MEASURES)})
+    ON CONFLICT (grouping_set, {', '.join(DIMENSIONS)}) DO UPDATE SET
+    {', '.join(f'{c} = exposure_accumulators.{c} + EXCLUDED.{c}' for c in MEASURES)},
+    updated_at = now()
+""")
+
+_DROP_EMPTY = text(f"""
+    DELETE FROM exposure_accumulators
+    WHERE grouping_set = :grouping_set AND {' AND '.join(f'{c} = :{c}' for c in DIMENSIONS)} AND policy_count <= 0
+""")
+
+
+def retention_bands() -> List[str]:
+    """Band labels for EXPOSURE_RETENTION_BANDS, e.g. [25, 50, 75] -> 0-25, 25-50, 50-75, 75-100"""
+    edges = [0.0] + list(settings.EXPOSURE_RETENTION_BANDS) + [100.0]
+    return [f"{low:g}-{high:g}" for low, high in zip(edges, edges[1:])]
+
+
+def _band_sql(column: str) -> str:
+    labels = retention_bands()
+    cases = " ".join(
+        f"WHEN {column} < {edge!r} THEN '{label}'"
+        for edge, label in zip(settings.EXPOSURE_RETENTION_BANDS, labels)
+    )
+    return f"CASE WHEN {column} IS NULL THEN '{UNKNOWN_BAND}' {cases} ELSE '{labels[-1]}' END"
+
+
+def _grouping_expression() -> str:
+    return " + ".join(
+        f"(CASE WHEN GROUPING(p.{dim}) = 0 THEN {1 << i} ELSE 0 END)" for i, dim in enumerate(DIMENSIONS)
+    )
+
+
+_REBUILD = text(f"""
+    INSERT INTO exposure_accumulators (grouping_set, {', '.join(DIMENSIONS)}, {', '.join(MEASURES)})
+    SELECT {_grouping_expression()},
+           {', '.join(f"COALESCE(p.{dim}, '{ALL}')" for dim in DIMENSIONS)},
+           COUNT(*), {', '.join(f'COALESCE(SUM(p.{c}), 0)' for c in AMOUNT_COLUMNS)}
+    FROM (
+        SELECT COALESCE(to_char(insurance_period_start_date, 'YYYY-MM'), '{UNKNOWN_MONTH}') AS period_month,
+               {{band}} AS retention_band,
+               COALESCE(insured_name, '{UNKNOWN_INSURED}') AS insured_name,
+               {', '.join(AMOUNT_COLUMNS)}
+        FROM {settings.TABLE_NAME}
+    ) AS p
+    GROUP BY CUBE (p.period_month, p.retention_band, p.insured_name)
+    HAVING COUNT(*) > 0
+""".replace("{band}", _band_sql("own_retention_ppn")))
+
+
+def grouping_mask(dimensions: Sequence[str]) -> int:
+    return sum(1 << DIMENSIONS.index(dim) for dim in set(dimensions))
+
+
+def bucket_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Map policy rows (SOURCE_COLUMNS) to their finest bucket keys and amounts"""
+    months = pd.to_datetime(frame["insurance_period_start_date"], errors="coerce").dt.strftime("%Y-%m")
+    ppn = pd.to_numeric(frame["own_retention_ppn"], errors="coerce").to_numpy(dtype=float)
+    labels = np.array(retention_bands(), dtype=object)
+    bands = labels[np.minimum(np.searchsorted(settings.EXPOSURE_RETENTION_BANDS, ppn, side="right"), len(labels) - 1)]
+    bands[np.isnan(ppn)] = UNKNOWN_BAND
+    buckets = pd.DataFrame({
+        "period_month": months.fillna(UNKNOWN_MONTH).to_numpy(dtype=object),
+        "retention_band": bands,
+        "insured_name": frame["insured_name"].where(frame["insured_name"].notna(), UNKNOWN_INSURED).to_numpy(dtype=object),
+        "policy_count": np.ones(len(frame), dtype=np.int64),
+    })
+    for column in AMOUNT_COLUMNS:
+        buckets[column] = pd.to_numeric(frame[column], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    return buckets
+
+
+def cube_deltas(before: pd.DataFrame, after: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Accumulator deltas for every grouping set, from policy rows before and after a write"""
+    parts = []
+    if len(before):
+        removed = bucket_frame(before)
+        removed[MEASURES] = -removed[MEASURES]
+        parts.append(removed)
+    if len(after):
+        parts.append(bucket_frame(after))
+    if not parts:
+        return []
+    finest = pd.concat(parts, ignore_index=True).groupby(list(DIMENSIONS), sort=False)[MEASURES].sum().reset_index()
+
+    rows = []
+    for grouping_set in range(1 << len(DIMENSIONS)):
+        kept = [dim for i, dim in enumerate(DIMENSIONS) if grouping_set & (1 << i)]
+        level = finest.groupby(kept, sort=False)[MEASURES].sum().reset_index() if kept else finest[MEASURES].sum().to_frame().T
+        # Rewrites that leave a bucket unchanged cancel out here and are not sent
+        level = level[(level["policy_count"] != 0) | (level[AMOUNT_COLUMNS].abs() > AMOUNT_EPSILON).any(axis=1)]
+        for dim in DIMENSIONS:
+            if dim not in kept:
+                level[dim] = ALL
+        level["grouping_set"] = grouping_set
+        rows.extend(level.to_dict("records"))
+    for row in rows:
+        row["policy_count"] = int(row["policy_count"])
+    return rows
+
+
+async def lock_exposure(session: AsyncSession):
+    """Serialize accumulator writers until the caller's transaction ends"""
+    await session.execute(_LOCK, {"key": EXPOSURE_LOCK_KEY})
+
+
+async def fetch_exposure_sources(session: AsyncSession, policy_numbers: List[str]) -> pd.DataFrame:
+    """Current SOURCE_COLUMNS of stored policies, indexed by policy_number (call under lock_exposure)"""
+    frames = []
+    for i in range(0, len(policy_numbers), settings.INGEST_LOOKUP_BATCH_SIZE):
+        result = await session.execute(
+            text(f"SELECT policy_number, {', '.join(SOURCE_COLUMNS)} FROM {settings.TABLE_NAME} "
+                 f"WHERE policy_number = ANY(:policy_numbers)"),
+            {"policy_numbers": policy_numbers[i:i + settings.INGEST_LOOKUP_BATCH_SIZE]}
+        )
+        frames.append(pd.DataFrame(result.all(), columns=["policy_number"] + SOURCE_COLUMNS))
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["policy_number"] + SOURCE_COLUMNS)
+    return frame.set_index("policy_number")
+
+
+async def apply_exposure_deltas(session: AsyncSession, before: pd.DataFrame, written: List[Dict[str, Any]]) -> int:
+    """Move written policies from their previous buckets to their new ones; returns rows changed"""
+    after = pd.DataFrame(written)
+    before = before[before.index.isin(after["policy_number"])]
+    # Columns missing from the workbook keep their stored values
+    for column in SOURCE_COLUMNS:
+        if column not in after.columns:
+            after[column] = after["policy_number"].map(before[column]) if len(before) else None
+
+    deltas = cube_deltas(before.reset_index(), after)
+    for i in range(0, len(deltas), settings.INGEST_BATCH_SIZE):
+        await session.execute(_APPLY_DELTA, deltas[i:i + settings.INGEST_BATCH_SIZE])
+    emptied = [
+        {"grouping_set": row["grouping_set"], **{dim: row[dim] for dim in DIMENSIONS}}
+        for row in deltas if row["policy_count"] < 0
+    ]
+    for i in range(0, len(emptied), settings.INGEST_BATCH_SIZE):
+        await session.execute(_DROP_EMPTY, emptied[i:i + settings.INGEST_BATCH_SIZE])
+    EXPOSURE_DELTA_ROWS.inc(len(deltas))
+    return len(deltas)
+
+
+async def rebuild_exposure(session: AsyncSession) -> int:
+    """Recompute every accumulator from insurance_policies and commit; returns the row count"""
+    started = time.perf_counter()
+    await lock_exposure(session)
+    await session.execute(text("DELETE FROM exposure_accumulators"))
+    result = await session.execute(_REBUILD)
+    await session.commit()
+    elapsed = time.perf_counter() - started
+    EXPOSURE_REBUILD_SECONDS.set(elapsed)
+    logger.info(f"Rebuilt {result.rowcount} exposure accumulator rows in {elapsed:.2f}s")
+    return result.rowcount
+
+
+async def initialize_exposure():
+    """Rebuild at startup when policies exist but no accumulators do (first deploy of the table)"""
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text(
+                f"SELECT NOT EXISTS (SELECT 1 FROM exposure_accumulators) "
+                f"AND EXISTS (SELECT 1 FROM {settings.TABLE_NAME})"
+            ))
+            if result.scalar():
+                await rebuild_exposure(session)
+    except Exception as e:
+        logger.error(f"Failed to initialize exposure accumulators: {str(e)}")
+
+
+async def exposure_report(
+    session: AsyncSession,
+    group_by: Sequence[str],
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    retention_band: Optional[str] = None,
+    insured_name: Optional[str] = None,
+    limit: int = 1000,
+) -> Dict[str, Any]:
+    """Sum accumulators of one grouping set; filters on a dimension read the set that keeps it"""
+    conditions, params = [], {}
+    filtered = []
+    if from_month is not None:
+        conditions.append("period_month >= :from_month AND period_month <> :unknown_month")
+        params.update(from_month=from_month, unknown_month=UNKNOWN_MONTH)
+        filtered.append("period_month")
+    if to_month is not None:
+        conditions.append("period_month <= :to_month AND period_month <> :unknown_month")
+        params.update(to_month=to_month, unknown_month=UNKNOWN_MONTH)
+        filtered.append("period_month")
+    if retention_band is not None:
+        conditions.append("retention_band = :retention_band")
+        params["retention_band"] = retention_band
+        filtered.append("retention_band")
+    if insured_name is not None:
+        conditions.append("insured_name ILIKE :insured_name")
+        params["insured_name"] = f"%{insured_name}%"
+        filtered.append("insured_name")
+
+    group_by = [dim for dim in DIMENSIONS if dim in group_by]
+    sums = ", ".join(f"SUM({c}) AS {c}" for c in MEASURES)
+
+    def statement(keys: Sequence[str], mask: int, row_limit: Optional[int]):
+        where = " AND ".join(["grouping_set = :grouping_set"] + conditions)
+        sql = f"SELECT {', '.join(list(keys) + [sums])} FROM exposure_accumulators WHERE {where}"
+        if keys:
+            sql += f" GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}"
+        if row_limit is not None:
+            sql += f" LIMIT {int(row_limit)}"
+        return text(sql), {**params, "grouping_set": mask}
+
+    sql, bound = statement(group_by, grouping_mask(group_by + filtered), limit + 1)
+    buckets = [dict(row) for row in (await session.execute(sql, bound)).mappings().all()]
+    sql, bound = statement([], grouping_mask(filtered), None)
+    totals = dict((await session.execute(sql, bound)).mappings().one())
+
+    def clean(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **row,
+            "policy_count": int(row.get("policy_count") or 0),
+            **{c: float(row.get(c) or 0) for c in AMOUNT_COLUMNS},
+        }
+
+    return {
+        "group_by": group_by,
+        "buckets": [clean(row) for row in buckets[:limit]],
+        "totals": clean(totals),
+        "truncated": len(buckets) > limit,
+    }
+
+
+async def _main():
+    async with AsyncSessionLocal() as session:
+        await rebuild_exposure(session)
+
+
+if __name__ == "__main__":
+    # Full rebuild for backfills: python -m src.services.exposure
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
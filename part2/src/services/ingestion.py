@@ -1,17 +1,121 @@
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, UploadFile
+import hashlib
 import logging
+import math
+from datetime import date, datetime
 from io import BytesIO
-from ..services.pinecone_client import PineconeClient
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import settings
+from ..services.analytics import analytics_engine
+from ..services.exposure import apply_exposure_deltas, fetch_exposure_sources, lock_exposure
+from ..services.period_index import period_index
+from ..services.sql_cache import bump_data_version, forget_data_version
+from ..services.vector_outbox import enqueue_vectors, outbox_drainer
+from ..utils.metrics import DB_UPSERT_SECONDS, EXCEL_PARSE_SECONDS, INGEST_SPLIT_VIOLATIONS, INGESTED_ROWS
+from ..utils.validation import check_reinsurance_splits, summarize_split_violations
+import time
 import uuid
 
 logger = logging.getLogger(__name__)
 
+# Columns written from the workbook, in fingerprint order
+POLICY_COLUMNS = [
+    'policy_number', 'insured_name', 'sum_insured', 'premium',
+    'own_retention_ppn', 'own_retention_sum_insured', 'own_retention_premium',
+    'treaty_retention_ppn', 'treaty_sum_insured', 'treaty_premium',
+    'facultative_outward_ppn', 'facultative_outward_sum_insured',
+    'facultative_outward_premium', 'insurance_period_start_date',
+    'insurance_period_end_date'
+]
+
+# Namespace for deterministic vector IDs: the same policy always maps to the same vector
+VECTOR_ID_NAMESPACE = uuid.UUID("6f1d3c1e-6b0a-4c59-9d53-8f0b8e7b5a21")
+
+def vector_id_for(policy_number: str) -> str:
+    return str(uuid.uuid5(VECTOR_ID_NAMESPACE, policy_number))
+
+def _clean_value(value: Any) -> Any:
+    """Convert pandas/numpy scalars to plain Python values, mapping NaN/NaT to None"""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return None if pd.isna(value) else value.to_pydatetime()
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def _fingerprint_value(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def compute_fingerprint(record: Dict[str, Any], columns: List[str]) -> str:
+    """SHA-256 over the row's column values; equal fingerprints mean nothing to write or embed"""
+    payload = '\x1f'.join(f"{col}={_fingerprint_value(record.get(col))}" for col in columns)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+async def _fetch_existing(session: AsyncSession, policy_numbers: List[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """Map policy_number -> (content_hash, vector_id) for the rows already stored"""
+    existing = {}
+    for i in range(0, len(policy_numbers), settings.INGEST_LOOKUP_BATCH_SIZE):
+        result = await session.execute(
+            text(f"SELECT policy_number, content_hash, vector_id FROM {settings.TABLE_NAME} WHERE policy_number = ANY(:policy_numbers)"),
+            {"policy_numbers": policy_numbers[i:i + settings.INGEST_LOOKUP_BATCH_SIZE]}
+        )
+        for policy_number, content_hash, vector_id in result.all():
+            existing[policy_number] = (content_hash, vector_id)
+    return existing
+
+def _upsert_statement(columns: List[str]):
+    column_list = ', '.join(columns)
+    placeholders = ', '.join([f":{col}" for col in columns])
+    update_clause = ', '.join([f"{col} = EXCLUDED.{col}" for col in columns if col != 'policy_number'])
+    return text(f"""
+    INSERT INTO {settings.TABLE_NAME} ({column_list})
+    VALUES ({placeholders})
+    ON CONFLICT (policy_number) DO UPDATE SET {update_clause}
+    """)
+
+async def _write_batch(session: AsyncSession, statement, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Upsert a batch inside a savepoint; if it fails, retry row by row to isolate bad rows"""
+    try:
+        async with session.begin_nested():
+            with DB_UPSERT_SECONDS.time():
+                await session.execute(statement, batch)
+        return batch, []
+    except Exception as e:
+        logger.error(f"Batch upsert of {len(batch)} rows failed, retrying individually: {str(e)}")
+
+    written, failed = [], []
+    for record in batch:
+        try:
+            async with session.begin_nested():
+                await session.execute(statement, record)
+            written.append(record)
+        except Exception as e:
+            logger.error(f"Error processing policy {record.get('policy_number')}: {str(e)}")
+            failed.append(record)
+    return written, failed
+
+def policy_text(record: Dict[str, Any]) -> str:
+    """Text embedded for a policy, by the outbox and by the full re-index alike"""
+    return f"Policy {record['policy_number']} for {record.get('insured_name') or 'Unknown'} with sum insured {record.get('sum_insured') or 0} and premium {record.get('premium') or 0}"
+
 async def ingest_excel_data(session: AsyncSession, file_content: bytes, filename: str):
     """Process and ingest Excel data into database and vector store"""
     try:
+        parse_started = time.perf_counter()
+        
         # Use BytesIO to handle file content
         file_io = BytesIO(file_content)
         
@@ -56,80 +160,127 @@ async def ingest_excel_data(session: AsyncSession, file_content: bytes, filename
             df_combined['insurance_period_start_date'] = pd.to_datetime(df_combined['insurance_period_start_date'], format='%d/%m/%Y')
             df_combined['insurance_period_end_date'] = pd.to_datetime(df_combined['insurance_period_end_date'], format='%d/%m/%Y')
             
-        # Generate vector IDs for new records
-        df_combined['vector_id'] = [str(uuid.uuid4()) for _ in range(len(df_combined))]
-        
-        # Initialize Pinecone client
-        pinecone_client = PineconeClient()
-        await pinecone_client.init()
-        
-        # Log the data we're about to insert
-        logger.info(f"Preparing to insert {len(df_combined)} records")
-        
-        # Keep track of successful inserts
-        successful_inserts = 0
-        
-        # Process each row
-        for _, row in df_combined.iterrows():
-            try:
-                # Ensure policy_number is not null
-                policy_number = row.get('policy_number', '')
-                if not policy_number:
-                    logger.warning("Skipping row with empty policy_number")
-                    continue
-                    
-                # Debug: Log the row we're about to insert
-                logger.info(f"Inserting policy: {policy_number}")
-                
-                # Prepare values for database insertion
-                values = {col: row.get(col) for col in [
-                    'policy_number', 'insured_name', 'sum_insured', 'premium',
-                    'own_retention_ppn', 'own_retention_sum_insured', 'own_retention_premium',
-                    'treaty_retention_ppn', 'treaty_sum_insured', 'treaty_premium',
-                    'facultative_outward_ppn', 'facultative_outward_sum_insured', 
-                    'facultative_outward_premium', 'insurance_period_start_date',
-                    'insurance_period_end_date', 'vector_id'
-                ] if col in row}
-                
-                # Insert into database using parameterized query
-                columns = ', '.join(values.keys())
-                placeholders = ', '.join([f":{col}" for col in values.keys()])
-                update_clause = ', '.join([f"{col} = EXCLUDED.{col}" for col in values.keys() if col != 'policy_number'])
-                
-                query = f"""
-                INSERT INTO insurance_policies ({columns})
-                VALUES ({placeholders})
-                ON CONFLICT (policy_number) DO UPDATE SET {update_clause}
-                """
-                
-                await session.execute(text(query), values)
-                
-                # Generate embedding and store in Pinecone
-                policy_text = f"Policy {policy_number} for {row.get('insured_name', 'Unknown')} with sum insured {row.get('sum_insured', 0)} and premium {row.get('premium', 0)}"
-                
-                # Store in Pinecone
-                await pinecone_client.upsert_vector(
-                    row['vector_id'],
-                    policy_text,
-                    {
-                        'policy_number': str(row.get('policy_number', '')),
-                        'insured_name': str(row.get('insured_name', '')),
-                        'sum_insured': float(row.get('sum_insured', 0)),
-                        'premium': float(row.get('premium', 0))
-                    }
+        EXCEL_PARSE_SECONDS.observe(time.perf_counter() - parse_started)
+        
+        # Drop rows without a policy number; later duplicates in the file win
+        df_combined['policy_number'] = df_combined['policy_number'].map(_clean_value).map(
+            lambda v: str(v).strip() if v is not None else ''
+        )
+        empty_rows = int((df_combined['policy_number'] == '').sum())
+        if empty_rows:
+            logger.warning(f"Skipping {empty_rows} rows with empty policy_number")
+            INGESTED_ROWS.inc(empty_rows, outcome="skipped")
+        df_combined = df_combined[df_combined['policy_number'] != '']
+        df_combined = df_combined.drop_duplicates(subset='policy_number', keep='last')
+        
+        # Check reinsurance splits as column operations over the whole file; flags are stored per row
+        split_flags = np.zeros(len(df_combined), dtype=np.uint8)
+        split_violations = {}
+        rejected = 0
+        if settings.SPLIT_VALIDATION_MODE != "off":
+            split_flags = check_reinsurance_splits(df_combined)
+            split_violations = summarize_split_violations(split_flags)
+            for violation, count in split_violations.items():
+                INGEST_SPLIT_VIOLATIONS.inc(count, violation=violation)
+            if split_violations:
+                logger.warning(
+                    f"{int(np.count_nonzero(split_flags))} rows fail reinsurance split checks: {split_violations}"
                 )
-                
-                successful_inserts += 1
-                
-            except Exception as e:
-                logger.error(f"Error processing row {_}: {str(e)}")
-                # Continue with next row instead of failing entirely
+            if settings.SPLIT_VALIDATION_MODE == "reject":
+                valid = split_flags == 0
+                rejected = int(np.count_nonzero(~valid))
+                INGESTED_ROWS.inc(rejected, outcome="invalid")
+                df_combined, split_flags = df_combined[valid], split_flags[valid]
+        
+        # Fingerprint every row and compare with what is stored, in bulk
+        columns = [col for col in POLICY_COLUMNS if col in df_combined.columns]
+        records = [
+            {**{col: _clean_value(value) for col, value in zip(columns, values)}, 'validation_flags': int(flags)}
+            for values, flags in zip(df_combined[columns].itertuples(index=False, name=None), split_flags)
+        ]
+        # Held until commit so the stored values read below stay exact for the exposure deltas
+        await lock_exposure(session)
+        existing = await _fetch_existing(session, [record['policy_number'] for record in records])
+        
+        to_write = []
+        inserted = updated = unchanged = 0
+        for record in records:
+            record['content_hash'] = compute_fingerprint(record, columns)
+            stored = existing.get(record['policy_number'])
+            if stored is None:
+                inserted += 1
+            elif stored[0] == record['content_hash']:
+                unchanged += 1
+                continue
+            else:
+                updated += 1
+            # Keep an existing vector_id so re-embedding overwrites the old vector instead of orphaning it
+            record['vector_id'] = (stored[1] if stored and stored[1] else None) or vector_id_for(record['policy_number'])
+            to_write.append(record)
+        
+        logger.info(
+            f"Preparing to write {len(to_write)} of {len(records)} records "
+            f"({inserted} new, {updated} changed, {unchanged} unchanged)"
+        )
+        INGESTED_ROWS.inc(unchanged, outcome="unchanged")
+        
+        # Previous values of changed rows, subtracted from the exposure accumulators after the write
+        exposure_before = await fetch_exposure_sources(
+            session, [record['policy_number'] for record in to_write if record['policy_number'] in existing]
+        )
+        
+        # Write new and changed rows in batches
+        statement = _upsert_statement(columns + ['validation_flags', 'vector_id', 'content_hash'])
+        written, failed = [], []
+        for i in range(0, len(to_write), settings.INGEST_BATCH_SIZE):
+            batch_written, batch_failed = await _write_batch(session, statement, to_write[i:i + settings.INGEST_BATCH_SIZE])
+            written.extend(batch_written)
+            failed.extend(batch_failed)
+        
+        failed_numbers = {record['policy_number'] for record in failed}
+        inserted -= sum(1 for record in failed if record['policy_number'] not in existing)
+        updated -= sum(1 for record in failed if record['policy_number'] in existing)
+        INGESTED_ROWS.inc(len(written), outcome="success")
+        INGESTED_ROWS.inc(len(failed_numbers), outcome="failed")
+        
+        exposure_rows = await apply_exposure_deltas(session, exposure_before, written) if written else 0
+        if exposure_rows:
+            logger.info(f"Applied {exposure_rows} exposure accumulator deltas")
+        
+        # Queue embeddings for what changed in the same transaction; the outbox drainer syncs Pinecone
+        vectors_queued = await enqueue_vectors(session, written, policy_text) if written else 0
         
         # Commit the transaction if any records were processed
-        if successful_inserts > 0:
+        if written or unchanged:
+            policies_version = await bump_data_version(session) if written else None
             await session.commit()
-            logger.info(f"Successfully inserted {successful_inserts} records")
-            return {"status": "success", "message": "Data ingested successfully", "records_processed": successful_inserts}
+            forget_data_version()
+            if written:
+                try:
+                    period_index.apply(written, policies_version)
+                except Exception as e:
+                    logger.error(f"Failed to update policy period index: {str(e)}")
+                if analytics_engine.loaded:
+                    analytics_engine.request_refresh()
+            if vectors_queued:
+                outbox_drainer.notify()
+            logger.info(
+                f"Ingestion complete: {inserted} inserted, {updated} updated, "
+                f"{unchanged} unchanged, {len(failed_numbers)} failed"
+            )
+            return {
+                "status": "success",
+                "message": "Data ingested successfully",
+                "records_processed": len(written),
+                "inserted": inserted,
+                "updated": updated,
+                "unchanged": unchanged,
+                "failed": len(failed_numbers),
+                "rejected": rejected,
+                "split_violations": split_violations,
+                "vectors_queued": vectors_queued,
+                "vectors_failed": 0
+            }
         else:
             await session.rollback()
             logger.error("No records were successfully processed")
@@ -0,0 +1,363 @@
+"""In-memory index of policy insurance periods for in-force and expiry questions.
+
+Periods are stored as closed day intervals in a static centered interval tree over NumPy
+arrays. Each tree node keeps the intervals that contain its center twice, once sorted by
+start and once by end. A stabbing query ("in force on d") therefore takes one contiguous
+slice per level, and runs in O(log n + k). An overlap query for [a, b] is the stabbing
+result at `a`, plus the intervals that start in (a, b], found by bisecting a globally
+start-sorted array. Expiry questions bisect an end-sorted array.
+
+The index is loaded from the policy table and tracks the table's data version. Ingestion
+passes changed rows to `apply`, which records them in a small delta. The tree is rebuilt
+once the delta grows past PERIOD_INDEX_MAX_DELTA rows. Writes from other processes are
+seen through the data version, which triggers a reload.
+"""
+import heapq
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from src.config import settings
+from src.database import sync_engine
+from src.services.readiness import readiness
+from src.services.sql_cache import read_table_version
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PERIOD_INDEX_SECONDS = REGISTRY.histogram(
+    "insurance_period_index_seconds", "Latency of policy period index operations", ["operation"]
+)
+
+_EPOCH = date(1970, 1, 1)
+
+_LOAD_QUERY = text(
+    f"SELECT policy_number, insurance_period_start_date, insurance_period_end_date "
+    f"FROM {settings.TABLE_NAME} "
+    f"WHERE insurance_period_start_date IS NOT NULL AND insurance_period_end_date IS NOT NULL "
+    f'ORDER BY policy_number COLLATE "C"'
+)
+
+
+def to_day(value: Any) -> Optional[int]:
+    """Days since 1970-01-01 for a date/datetime; None for missing values"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+class IntervalTree:
+    """Static centered interval tree over closed integer intervals [starts[i], ends[i]]"""
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        # Per node: center, children (-1 for none) and the slice of the node arrays below
+        centers, lefts, rights, offsets, counts = [], [], [], [], []
+        by_start, by_end = [], []
+        position = 0
+
+        stack = [(np.arange(len(self.starts)), -1, 0)] if len(self.starts) else []
+        while stack:
+            members, parent, side = stack.pop()
+            node = len(centers)
+            if parent >= 0:
+                (lefts if side < 0 else rights)[parent] = node
+            node_starts, node_ends = self.starts[members], self.ends[members]
+            # An actual endpoint as center guarantees at least one interval stays at this node
+            endpoints = np.concatenate([node_starts, node_ends])
+            center = int(np.partition(endpoints, len(endpoints) // 2)[len(endpoints) // 2])
+            here = (node_starts <= center) & (node_ends >= center)
+
+            ids = members[here]
+            by_start.append(ids[np.argsort(self.starts[ids], kind="stable")])
+            by_end.append(ids[np.argsort(-self.ends[ids], kind="stable")])
+            centers.append(center)
+            lefts.append(-1)
+            rights.append(-1)
+            offsets.append(position)
+            counts.append(len(ids))
+            position += len(ids)
+
+            left, right = members[node_ends < center], members[node_starts > center]
+            if len(left):
+                stack.append((left, node, -1))
+            if len(right):
+                stack.append((right, node, 1))
+
+        self.centers = np.asarray(centers, dtype=np.int64)
+        self.lefts = np.asarray(lefts, dtype=np.int64)
+        self.rights = np.asarray(rights, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        empty = np.empty(0, dtype=np.int64)
+        self.by_start = np.concatenate(by_start) if by_start else empty
+        self.by_end = np.concatenate(by_end) if by_end else empty
+        self.by_start_keys = self.starts[self.by_start]
+        self.by_end_keys = -self.ends[self.by_end]  # ascending, so searchsorted works
+
+        # Global orders for "starts in (a, b]" and "ends in [a, b]"
+        self.start_order = np.argsort(self.starts, kind="stable")
+        self.sorted_starts = self.starts[self.start_order]
+        self.end_order = np.argsort(self.ends, kind="stable")
+        self.sorted_ends = self.ends[self.end_order]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def stab(self, point: int) -> np.ndarray:
+        """Positions of intervals containing `point`"""
+        parts = []
+        node = 0 if len(self.centers) else -1
+        while node >= 0:
+            center = self.centers[node]
+            lo = self.offsets[node]
+            hi = lo + self.counts[node]
+            if point < center:
+                # Every interval here ends at or after center > point; keep those starting by point
+                k = np.searchsorted(self.by_start_keys[lo:hi], point, side="right")
+                parts.append(self.by_start[lo:lo + k])
+                node = self.lefts[node]
+            elif point > center:
+                k = np.searchsorted(self.by_end_keys[lo:hi], -point, side="right")
+                parts.append(self.by_end[lo:lo + k])
+                node = self.rights[node]
+            else:
+                parts.append(self.by_start[lo:hi])
+                break
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def overlap(self, low: int, high: int) -> np.ndarray:
+        """Positions of intervals sharing at least one day with [low, high]"""
+        if high < low:
+            return np.empty(0, dtype=np.int64)
+        lo = np.searchsorted(self.sorted_starts, low, side="right")
+        hi = np.searchsorted(self.sorted_starts, high, side="right")
+        return np.concatenate([self.stab(low), self.start_order[lo:hi]])
+
+    def ending(self, low: int, high: int) -> np.ndarray:
+        """Positions of intervals whose end lies in [low, high]"""
+        lo = np.searchsorted(self.sorted_ends, low, side="left")
+        hi = np.searchsorted(self.sorted_ends, high, side="right")
+        return self.end_order[lo:hi]
+
+
+class _Snapshot:
+    """Immutable index state; queries read one snapshot while updates build the next"""
+
+    def __init__(self, names: np.ndarray, tree: IntervalTree, version: Optional[int],
+                 removed: Optional[np.ndarray] = None, delta: Optional[Dict[str, Tuple[int, int]]] = None,
+                 positions: Optional[Dict[str, int]] = None):
+        self.names = names
+        self.tree = tree
+        self.version = version
+        self.removed = removed if removed is not None else np.zeros(len(names), dtype=bool)
+        self.delta = delta or {}
+        self.positions = positions if positions is not None else {name: i for i, name in enumerate(names.tolist())}
+        self.delta_names = np.asarray(list(self.delta), dtype=object)
+        periods = np.asarray(list(self.delta.values()), dtype=np.int64).reshape(-1, 2)
+        self.delta_starts, self.delta_ends = periods[:, 0], periods[:, 1]
+
+    @classmethod
+    def from_arrays(cls, names: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                    version: Optional[int]) -> "_Snapshot":
+        # Names are kept in policy-number order so results come out sorted by sorting positions
+        if len(names) > 1 and not np.all(names[:-1] <= names[1:]):
+            order = np.argsort(names, kind="stable")
+            names, starts, ends = names[order], starts[order], ends[order]
+        return cls(names, IntervalTree(starts, ends), version)
+
+    def collect(self, positions: np.ndarray, delta_mask: np.ndarray) -> List[str]:
+        """Policy numbers, sorted, for base positions and matching delta rows"""
+        positions = np.sort(positions[~self.removed[positions]])
+        base = self.names[positions].tolist()
+        if not delta_mask.any():
+            return base
+        return list(heapq.merge(base, sorted(self.delta_names[delta_mask].tolist())))
+
+
+class PolicyPeriodIndex:
+    """Policy periods answering in-force, overlap and expiry queries without touching Postgres"""
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._snapshot.version if self._snapshot is not None else None
+
+    def __len__(self) -> int:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return 0
+        return int((~snapshot.removed).sum()) + len(snapshot.delta)
+
+    def build(self, rows: Iterable[Tuple[str, Any, Any]], version: Optional[int] = None):
+        """Replace the index with (policy_number, start, end) rows"""
+        with PERIOD_INDEX_SECONDS.time(operation="build"):
+            names, starts, ends = [], [], []
+            for policy_number, start, end in rows:
+                start_day, end_day = to_day(start), to_day(end)
+                if start_day is None or end_day is None:
+                    continue
+                names.append(policy_number)
+                starts.append(start_day)
+                ends.append(end_day)
+            self._snapshot = _Snapshot.from_arrays(
+                np.asarray(names, dtype=object), np.asarray(starts, dtype=np.int64),
+                np.asarray(ends, dtype=np.int64), version
+            )
+        self._checked_at = time.monotonic()
+        logger.info(f"Built policy period index over {len(names)} policies (data version {version})")
+
+    def refresh(self):
+        """Reload every policy period from the database"""
+        with self._lock:
+            with sync_engine.connect() as connection:
+                # Version first: a write committed in between only causes one extra reload later
+                version = read_table_version(connection)
+                rows = connection.execute(_LOAD_QUERY).all()
+            self.build(rows, version)
+
+    def ensure_fresh(self):
+        """Load on first use and reload when another writer advanced the table's data version"""
+        if self._snapshot is not None and time.monotonic() - self._checked_at < settings.DATA_VERSION_TTL_SECONDS:
+            return
+        if self._snapshot is None:
+            self.refresh()
+            return
+        try:
+            with sync_engine.connect() as connection:
+                version = read_table_version(connection)
+        except Exception as e:
+            logger.error(f"Failed to read data version for period index: {str(e)}")
+            return
+        self._checked_at = time.monotonic()
+        if version != self._snapshot.version:
+            self.refresh()
+
+    def apply(self, records: Sequence[Dict[str, Any]], version: Optional[int]):
+        """Fold rows written by an ingest into the index; `version` is the table version that write produced"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        if version is None or snapshot.version is None or version != snapshot.version + 1:
+            # Another writer got in between; let the next query reload
+            self._checked_at = 0.0
+            return
+        with self._lock, PERIOD_INDEX_SECONDS.time(operation="apply"):
+            removed = snapshot.removed.copy()
+            delta = dict(snapshot.delta)
+            for record in records:
+                if "insurance_period_start_date" not in record and "insurance_period_end_date" not in record:
+                    continue  # the upsert left the stored period untouched
+                policy_number = record["policy_number"]
+                position = snapshot.positions.get(policy_number)
+                if position is not None:
+                    removed[position] = True
+                start, end = to_day(record.get("insurance_period_start_date")), to_day(record.get("insurance_period_end_date"))
+                if start is None or end is None:
+                    delta.pop(policy_number, None)
+                else:
+                    delta[policy_number] = (start, end)
+
+            if len(delta) > settings.PERIOD_INDEX_MAX_DELTA:
+                keep = ~removed
+                names = np.concatenate([snapshot.names[keep], np.asarray(list(delta), dtype=object)])
+                periods = np.asarray(list(delta.values()), dtype=np.int64).reshape(-1, 2)
+                self._snapshot = _Snapshot.from_arrays(
+                    names, np.concatenate([snapshot.tree.starts[keep], periods[:, 0]]),
+                    np.concatenate([snapshot.tree.ends[keep], periods[:, 1]]), version
+                )
+            else:
+                self._snapshot = _Snapshot(snapshot.names, snapshot.tree, version, removed, delta, snapshot.positions)
+
+    def in_force(self, on: date) -> List[str]:
+        """Policies whose period contains `on`"""
+        self.ensure_fresh()
+        with PERIOD_INDEX_SECONDS.time(operation="in_force"):
+            snapshot, day = self._snapshot, to_day(on)
+            return snapshot.collect(
+                snapshot.tree.stab(day), (snapshot.delta_starts <= day) & (snapshot.delta_ends >= day)
+            )
+
+    def overlapping(self, start: date, end: date) -> List[str]:
+        """Policies in force on at least one day of [start, end]"""
+        self.ensure_fresh()
+        with PERIOD_INDEX_SECONDS.time(operation="overlap"):
+            snapshot, low, high = self._snapshot, to_day(start), to_day(end)
+            return snapshot.collect(
+                snapshot.tree.overlap(low, high), (snapshot.delta_starts <= high) & (snapshot.delta_ends >= low)
+            )
+
+    def expiring(self, start: date, end: date) -> List[str]:
+        """Policies whose period ends within [start, end]"""
+        self.ensure_fresh()
+        with PERIOD_INDEX_SECONDS.time(operation="expiring"):
+            snapshot, low, high = self._snapshot, to_day(start), to_day(end)
+            return snapshot.collect(
+                snapshot.tree.ending(low, high), (snapshot.delta_ends >= low) & (snapshot.delta_ends <= high)
+            )
+
+
+# SQL equivalents: the fallback while the index is unavailable, and the benchmark baseline
+_SQL_QUERIES = {
+    "in_force": (
+        "insurance_period_start_date <= :end AND insurance_period_end_date >= :start"
+    ),
+    "expiring": (
+        "insurance_period_end_date BETWEEN :start AND :end"
+    ),
+}
+
+
+def sql_period_query(kind: str, start: date, end: date, connection=None) -> List[str]:
+    """Policy numbers matching an in_force (overlap with [start, end]) or expiring query, via Postgres"""
+    query = text(
+        f"SELECT policy_number FROM {settings.TABLE_NAME} "
+        f"WHERE insurance_period_start_date IS NOT NULL AND {_SQL_QUERIES[kind]} "
+        f'ORDER BY policy_number COLLATE "C"'
+    )
+    if connection is not None:
+        return list(connection.execute(query, {"start": start, "end": end}).scalars())
+    with sync_engine.connect() as connection:
+        return list(connection.execute(query, {"start": start, "end": end}).scalars())
+
+
+def find_policies(kind: str, start: date, end: Optional[date] = None) -> List[str]:
+    """In-force (on `start`, or at any time in [start, end]) or expiring policies; falls back to SQL on index errors"""
+    end = end or start
+    try:
+        if kind == "expiring":
+            return period_index.expiring(start, end)
+        if start == end:
+            return period_index.in_force(start)
+        return period_index.overlapping(start, end)
+    except Exception as e:
+        logger.error(f"Policy period index unavailable, using SQL: {str(e)}")
+        return sql_period_query(kind, start, end)
+
+
+period_index = PolicyPeriodIndex()
+
+
+def _load_period_index() -> PolicyPeriodIndex:
+    period_index.refresh()
+    return period_index
+
+
+# Loaded by the startup warm-up; queries fall back to SQL until it is ready
+period_index_component = readiness.register("period_index", _load_period_index, required=False)
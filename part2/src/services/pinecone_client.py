@@ -1,39 +1,50 @@
 import os
-import uuid
 import pandas as pd
-import google.generativeai as genai
 from pinecone import Pinecone, ServerlessSpec
 import logging
 from typing import Dict, List, Any, Optional
 import asyncio
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 
 from src.config import settings
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
+from src.services.embeddings import aembed_documents, aembed_query, embed_documents, embed_query, embedding_provider
+from src.utils.metrics import PINECONE_SECONDS
+from src.utils.resilience import pinecone
 
 logger = logging.getLogger(__name__)
 
 # Constants
 TABLE_NAME = "insurance_policies"
-INDEX_NAME = "insurance-rag-index"
-EMBEDDING_DIMENSION = 768  # Gemini embedding-001 dimension
+
+def ensure_index(pc: Pinecone, index_name: str, dimension: int):
+    """Connect to the index, creating it for `dimension`; an existing index must have that dimension"""
+    if index_name not in pc.list_indexes().names():
+        logger.info(f"Creating Pinecone index: {index_name} ({dimension} dimensions)")
+        pc.create_index(
+            name=index_name,
+            dimension=dimension,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-west-2")
+        )
+    else:
+        existing = pc.describe_index(index_name).dimension
+        if existing != dimension:
+            raise ValueError(
+                f"Pinecone index '{index_name}' has dimension {existing}, but the "
+                f"{settings.EMBEDDING_PROVIDER} embedding provider produces {dimension}; "
+                f"point PINECONE_INDEX_NAME at an index of that dimension"
+            )
+    return pc.Index(index_name)
 
 class PineconeClient:
     def __init__(self):
         self.api_key = os.environ.get("PINECONE_API_KEY", settings.PINECONE_API_KEY)
-        self.index_name = os.environ.get("PINECONE_INDEX", INDEX_NAME)
-        self.google_api_key = os.environ.get("GOOGLE_API_KEY", settings.GOOGLE_API_KEY)
+        self.index_name = settings.PINECONE_INDEX_NAME
         self.pc = None
         self.index = None
-        self.model = None
         
     async def init(self):
-        """Initialize Pinecone and Google AI"""
+        """Initialize Pinecone and the embedding provider"""
         try:
             # Initialize Pinecone
             if not self.api_key:
@@ -43,26 +54,9 @@ class PineconeClient:
             # Create Pinecone client instance    
             self.pc = Pinecone(api_key=self.api_key)
             
-            # Check if index exists, create if it doesn't
-            if self.index_name not in self.pc.list_indexes().names():
-                logger.info(f"Creating Pinecone index: {self.index_name}")
-                self.pc.create_index(
-                    name=self.index_name,
-                    dimension=EMBEDDING_DIMENSION,
-                    metric="cosine",
-                    spec=ServerlessSpec(cloud="aws", region="us-west-2")
-                )
-                
-            # Connect to index
-            self.index = self.pc.Index(self.index_name)
-            
-            # Initialize Google AI for embeddings
-            if not self.google_api_key:
-                logger.error("GOOGLE_API_KEY environment variable not set")
-                raise ValueError("Google API key not provided")
-                
-            genai.configure(api_key=self.google_api_key)
-            self.model = genai.GenerativeModel('embedding-001')
+            # The index dimension must match the configured embedding provider
+            provider = await asyncio.to_thread(embedding_provider.get)
+            self.index = ensure_index(self.pc, self.index_name, provider.dimension)
             
             logger.info("Pinecone client initialized successfully")
             
@@ -71,10 +65,9 @@ class PineconeClient:
             raise
     
     async def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text using Google AI"""
+        """Generate a query embedding with the configured provider"""
         try:
-            result = self.model.embed_content(text)
-            return result.embedding
+            return await aembed_query(text)
         except Exception as e:
             logger.error(f"Error generating embedding: {str(e)}")
             raise
@@ -83,25 +76,37 @@ class PineconeClient:
         """Upsert vector to Pinecone"""
         try:
             # Generate embedding
-            embedding = await self.generate_embedding(text)
+            embedding = (await aembed_documents([text]))[0]
             
             # Prepare metadata
             if metadata is None:
                 metadata = {}
                 
             # Upsert to Pinecone
-            self.index.upsert(
-                vectors=[(vector_id, embedding, metadata)],
-                namespace='insurance_namespace'
-            )
+            with PINECONE_SECONDS.time(operation="upsert"):
+                await pinecone.acall(
+                    self.index.upsert,
+                    vectors=[(vector_id, embedding, metadata)],
+                    namespace='insurance_namespace'
+                )
             
-            logger.info(f"Successfully upserted vector {vector_id}")
+            logger.debug(f"Successfully upserted vector {vector_id}")
             return True
             
         except Exception as e:
             logger.error(f"Error upserting vector: {str(e)}")
             return False
             
+    async def upsert_batch(self, items: List[tuple]):
+        """Embed (vector_id, text, metadata) items in one request and upsert them in one call; raises on failure"""
+        embeddings = await aembed_documents([item_text for _, item_text, _ in items])
+        vectors = [
+            (vector_id, embedding, metadata or {})
+            for (vector_id, _, metadata), embedding in zip(items, embeddings)
+        ]
+        with PINECONE_SECONDS.time(operation="upsert"):
+            await pinecone.acall(self.index.upsert, vectors=vectors, namespace='insurance_namespace')
+
     async def query(self, query_text: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Query Pinecone index"""
         try:
@@ -109,12 +114,14 @@ class PineconeClient:
             query_embedding = await self.generate_embedding(query_text)
             
             # Query Pinecone
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True,
-                namespace='insurance_namespace'
-            )
+            with PINECONE_SECONDS.time(operation="query"):
+                results = await pinecone.acall(
+                    self.index.query,
+                    vector=query_embedding,
+                    top_k=top_k,
+                    include_metadata=True,
+                    namespace='insurance_namespace'
+                )
             
             return results.matches
             
@@ -124,42 +131,38 @@ class PineconeClient:
 
 
 def get_embedding(text):
-    """Generate embedding for text using Google AI (synchronous version)"""
+    """Generate a query embedding with the configured provider (synchronous version)"""
     try:
-        genai.configure(api_key=settings.GOOGLE_API_KEY)
-        result = genai.embed_content(model='models/embedding-001', 
-                                     content=text, 
-                                     task_type="retrieval_document")
-        return result['embedding']
+        return embed_query(text)
     except Exception as e:
-        logger.error(f"Gemini embedding API call failed: {e}")
+        logger.error(f"Embedding call failed: {e}")
         return None
 
 
-def row_to_text(row):
-    """Convert a database row to text for embedding"""
-    return (
-        f"Policy Number: {row.get('policy_number', '')}\n"
-        f"Sum Insured: {row.get('sum_insured', '')}\n"
-        f"Premium: {row.get('premium', '')}\n"
-        f"Own Retention PPN: {row.get('own_retention_ppn', '')}\n"
-        f"Own Retention Sum Insured: {row.get('own_retention_sum_insured', '')}\n"
-        f"Own Retention Premium: {row.get('own_retention_premium', '')}\n"
-        f"Treaty PPN: {row.get('treaty_ppn', '')}\n"
-        f"Treaty Sum Insured: {row.get('treaty_sum_insured', '')}\n"
-        f"Treaty Premium: {row.get('treaty_premium', '')}\n"
-        f"Start Date: {row.get('insurance_period_start_date', '')}\n"
-        f"End Date: {row.get('insurance_period_end_date', '')}"
-    )
+def get_embeddings(texts: List[str], chunk_size: int = 1000) -> List[Optional[List[float]]]:
+    """Embed documents in chunks; rows of a chunk that fails get None"""
+    vectors: List[Optional[List[float]]] = []
+    for i in range(0, len(texts), chunk_size):
+        chunk = texts[i:i + chunk_size]
+        try:
+            vectors.extend(embed_documents(chunk))
+        except Exception as e:
+            logger.error(f"Embedding rows {i}-{i + len(chunk) - 1} failed: {e}")
+            vectors.extend([None] * len(chunk))
+    return vectors
 
 
 def index_database_records():
-    """Index all records from the database to Pinecone"""
+    """Index all records from the database to Pinecone
+
+    Vectors keep the IDs ingestion assigned (or the deterministic ID for the policy), and are
+    embedded from the same text as the vector outbox, so a re-index overwrites rather than duplicates.
+    """
+    # Imported here: ingestion imports the vector outbox, which imports this module
+    from src.services.ingestion import policy_text, vector_id_for
+
     try:
-        # Step 1: Configure Google AI
-        os.environ["GOOGLE_API_KEY"] = settings.GOOGLE_API_KEY
-        
-        # Step 2: Connect to SQL DB and fetch data
+        # Step 1: Connect to SQL DB and fetch data
         engine = create_engine(
             f"postgresql+psycopg2://{settings.DB_USERNAME}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
         )
@@ -171,37 +174,29 @@ def index_database_records():
             logger.warning("No records found in database, skipping indexing")
             return
         
-        # Step 3: Generate unique vector IDs
-        df['vector_id'] = [str(uuid.uuid4()) for _ in range(len(df))]
+        # Step 2: Reuse stored vector IDs
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        df['vector_id'] = [record['vector_id'] or vector_id_for(record['policy_number']) for record in records]
         
-        # Step 4: Prepare text for embedding
-        df['embedding_text'] = df.apply(row_to_text, axis=1)
+        # Step 3: Prepare text for embedding
+        df['embedding_text'] = [policy_text(record) for record in records]
         
-        # Step 5: Generate embeddings using Gemini
-        logger.info("Generating embeddings for database records...")
-        df['embedding'] = df['embedding_text'].apply(get_embedding)
+        # Step 4: Generate embeddings in batches with the configured provider
+        logger.info(f"Generating embeddings for database records with the {settings.EMBEDDING_PROVIDER} provider...")
+        df['embedding'] = get_embeddings(df['embedding_text'].tolist())
         
         # Remove rows where embedding failed
         df = df[df['embedding'].notnull()]
         logger.info(f"{len(df)} records successfully embedded")
         
-        # Step 6: Initialize Pinecone
+        # Step 5: Initialize Pinecone
         logger.info("Initializing Pinecone...")
         pc = Pinecone(api_key=settings.PINECONE_API_KEY)
         
-        # Create index if it doesn't exist
-        if INDEX_NAME not in pc.list_indexes().names():
-            logger.info(f"Creating Pinecone index: {INDEX_NAME}")
-            pc.create_index(
-                name=INDEX_NAME,
-                dimension=EMBEDDING_DIMENSION,
-                metric='cosine',
-                spec=ServerlessSpec(cloud='aws', region='us-west-2')
-            )
-        
-        index = pc.Index(INDEX_NAME)
+        # Create index if it doesn't exist, sized for the embedding provider
+        index = ensure_index(pc, settings.PINECONE_INDEX_NAME, embedding_provider.get().dimension)
         
-        # Step 7: Prepare data for upsert
+        # Step 6: Prepare data for upsert
         vectors = []
         for i, row in df.iterrows():
             vec_id = str(row['vector_id'])
@@ -230,24 +225,16 @@ def index_database_records():
             
             vectors.append((vec_id, row['embedding'], metadata))
         
-        # Step 8: Upsert vectors to Pinecone
+        # Step 7: Upsert vectors to Pinecone
         batch_size = 100
         for i in range(0, len(vectors), batch_size):
             batch = vectors[i:i+batch_size]
-            index.upsert(vectors=batch, namespace='insurance_namespace')
+            with PINECONE_SECONDS.time(operation="upsert"):
+                pinecone.call(index.upsert, vectors=batch, namespace='insurance_namespace')
             logger.info(f"Upserted batch {i//batch_size + 1}/{(len(vectors)//batch_size) + 1} to Pinecone")
         
-        logger.info(f"Successfully upserted {len(vectors)} vectors to Pinecone index '{INDEX_NAME}'.")
+        logger.info(f"Successfully upserted {len(vectors)} vectors to Pinecone index '{settings.PINECONE_INDEX_NAME}'.")
         
-        # Step 9: Update PostgreSQL with vector_id
-        with engine.begin() as conn:
-            for _, row in df[['vector_id', 'policy_number']].iterrows():
-                update_stmt = text(
-                    "UPDATE insurance_policies SET vector_id = :vector_id WHERE policy_number = :policy_number"
-                )
-                conn.execute(update_stmt, {"vector_id": row['vector_id'], "policy_number": row['policy_number']})
-        
-        logger.info("Updated database with vector IDs.")
         return True
         
     except Exception as e:
@@ -260,7 +247,7 @@ def query_rag(user_query, top_k=5):
     try:
         # Initialize Pinecone
         pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-        index = pc.Index(INDEX_NAME)
+        index = pc.Index(settings.PINECONE_INDEX_NAME)
         
         # Generate embedding for query
         query_emb = get_embedding(user_query)
@@ -269,12 +256,14 @@ def query_rag(user_query, top_k=5):
             return None
             
         # Query Pinecone
-        results = index.query(
-            vector=query_emb, 
-            top_k=top_k, 
-            include_metadata=True,
-            namespace='insurance_namespace'
-        )
+        with PINECONE_SECONDS.time(operation="query"):
+            results = pinecone.call(
+                index.query,
+                vector=query_emb,
+                top_k=top_k, 
+                include_metadata=True,
+                namespace='insurance_namespace'
+            )
         
         return results
         
@@ -287,6 +276,11 @@ def query_rag(user_query, top_k=5):
 if __name__ == "__main__":
     import sys
     
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+    
     if len(sys.argv) > 1 and sys.argv[1] == "--index":
         logger.info("Starting database indexing process...")
         index_database_records()
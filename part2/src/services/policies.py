@@ -0,0 +1,104 @@
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.models import InsurancePolicy
+from src.schemas import InsurancePolicy as InsurancePolicySchema
+from src.services.sql_cache import data_version_async
+from src.utils.cache import get_cache
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+POLICY_LOOKUP_SECONDS = REGISTRY.histogram(
+    "insurance_policy_lookup_seconds", "Latency of direct policy lookups", ["source"]
+)
+
+# (data version, policy_number) -> JSON serialized through the response schema, so a hit needs
+# no DB round-trip or re-encoding. Keying on the table_versions version that ingestion bumps makes
+# every worker drop stale policies once it re-reads the version, whichever cache backend is used,
+# and an entry filled from a read that raced an ingest is filed under the older version.
+policy_cache = get_cache("policy", settings.POLICY_CACHE_MAX_SIZE, settings.POLICY_CACHE_TTL_SECONDS)
+
+# Database column -> API field, following schemas.InsurancePolicy
+_FIELD_NAMES = {"treaty_retention_ppn": "treaty_ppn"}
+
+# Only the columns the API schema exposes (not content_hash or other internal bookkeeping)
+_COLUMNS = [
+    column for column in InsurancePolicy.__table__.columns
+    if _FIELD_NAMES.get(column.name, column.name) in InsurancePolicySchema.model_fields
+]
+
+
+def _to_record(row: Any) -> Dict[str, Any]:
+    mapping = row._mapping
+    return {_FIELD_NAMES.get(column.name, column.name): mapping[column.name] for column in _COLUMNS}
+
+
+async def get_policy_json(session: AsyncSession, policy_number: str) -> Optional[bytes]:
+    """Return one policy as JSON bytes, reading through the policy cache"""
+    # Read before the row, so a cached row is never older than the version it is filed under
+    version = await data_version_async(session)
+    key = (version, policy_number) if version is not None else None
+    if key is not None:
+        cached = policy_cache.get(key)
+        if cached is not None:
+            return cached
+
+    with POLICY_LOOKUP_SECONDS.time(source="database"):
+        result = await session.execute(
+            select(*_COLUMNS).where(InsurancePolicy.policy_number == policy_number)
+        )
+        row = result.first()
+    if row is None:
+        return None
+
+    payload = InsurancePolicySchema.model_validate(_to_record(row)).model_dump_json().encode()
+    if key is not None:
+        policy_cache.set(key, payload)
+    return payload
+
+
+async def list_policies(
+    session: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    insured_name: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    min_premium: Optional[float] = None,
+    max_premium: Optional[float] = None,
+) -> Dict[str, Any]:
+    """List policies ordered by policy_number using keyset pagination.
+
+    `cursor` is the last policy_number of the previous page; the next page starts strictly
+    after it, so deep pages cost the same as the first one.
+    """
+    query = select(*_COLUMNS)
+    if cursor:
+        query = query.where(InsurancePolicy.policy_number > cursor)
+    if insured_name:
+        query = query.where(InsurancePolicy.insured_name.ilike(f"%{insured_name}%"))
+    if start_date is not None:
+        query = query.where(InsurancePolicy.insurance_period_start_date >= start_date)
+    if end_date is not None:
+        query = query.where(InsurancePolicy.insurance_period_end_date <= end_date)
+    if min_premium is not None:
+        query = query.where(InsurancePolicy.premium >= min_premium)
+    if max_premium is not None:
+        query = query.where(InsurancePolicy.premium <= max_premium)
+    # Fetch one extra row to know whether another page exists
+    query = query.order_by(InsurancePolicy.policy_number).limit(limit + 1)
+
+    with POLICY_LOOKUP_SECONDS.time(source="list"):
+        result = await session.execute(query)
+        rows = result.all()
+
+    items: List[Dict[str, Any]] = [_to_record(row) for row in rows[:limit]]
+    next_cursor = items[-1]["policy_number"] if len(rows) > limit and items else None
+    return {"items": items, "next_cursor": next_cursor}
+
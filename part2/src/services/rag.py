@@ -1,4 +1,6 @@
-from src.services.agent import query_agent
+from src.services.agent import aquery_agent
+from src.llm import track_llm_usage
+from src.utils.tracing import tracer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,7 +14,12 @@ class InsuranceRAGSystem:
         """Generate response using the LangGraph agent"""
         try:
             # Use the agent for multi-step reasoning
-            response = query_agent(query)
+            with tracer.start_span("InsuranceRAGSystem.generate_response") as span, track_llm_usage() as usage:
+                # Async run: the event loop stays free and parallel tool calls overlap
+                response = await aquery_agent(query)
+                span.set_attribute("llm.calls", usage.calls)
+                span.set_attribute("llm.total_tokens", usage.total_tokens)
+            logger.info(f"Query used {usage.calls} LLM calls and {usage.total_tokens} tokens")
             return response
         except Exception as e:
             logger.error(f"RAG system error: {str(e)}")
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Component:
+    """Heavy client built on first use, with its construction status tracked for readiness"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], required: bool = True):
+        self.name = name
+        self.factory = factory
+        self.required = required
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.init_seconds: Optional[float] = None
+        self._value: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def get(self) -> Any:
+        """Return the component, constructing it on first call; failures are retried on the next call"""
+        if self.status == "ready":
+            return self._value
+        with self._lock:
+            if self.status == "ready":
+                return self._value
+            self.status = "initializing"
+            started = time.perf_counter()
+            try:
+                self._value = self.factory()
+            except Exception as e:
+                self.status = "failed"
+                self.error = str(e)
+                logger.error(f"Failed to initialize {self.name}: {str(e)}")
+                raise
+            self.init_seconds = round(time.perf_counter() - started, 3)
+            self.status = "ready"
+            self.error = None
+            logger.info(f"Initialized {self.name} in {self.init_seconds}s")
+            return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self.status = "pending"
+            self.error = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "init_seconds": self.init_seconds,
+            "error": self.error,
+        }
+
+
+class ReadinessRegistry:
+    """Registry of lazily constructed components, warmed up in the background at startup"""
+
+    def __init__(self):
+        self._components: Dict[str, Component] = {}
+        self.warm_up_task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, factory: Callable[[], Any], required: bool = True) -> Component:
+        component = Component(name, factory, required)
+        self._components[name] = component
+        return component
+
+    @property
+    def components(self) -> List[Component]:
+        return list(self._components.values())
+
+    def is_ready(self) -> bool:
+        return all(c.ready for c in self.components if c.required)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {c.name: c.snapshot() for c in self.components}
+
+    async def warm_up(self):
+        """Construct every registered component off the event loop, in registration order"""
+        for component in self.components:
+            try:
+                await asyncio.to_thread(component.get)
+            except Exception:
+                # Already recorded on the component; it will be retried on first use
+                continue
+
+    def start_warm_up(self):
+        if self.warm_up_task is None or self.warm_up_task.done():
+            self.warm_up_task = asyncio.create_task(self.warm_up())
+        return self.warm_up_task
+
+
+readiness = ReadinessRegistry()
@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_community.utilities import SQLDatabase
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import sync_engine
+from src.utils.cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+# Normalized question + schema version -> SQL the agent produced and executed successfully
+nl2sql_cache = get_cache("nl2sql", settings.NL2SQL_CACHE_MAX_SIZE, settings.NL2SQL_CACHE_TTL_SECONDS)
+
+# (data version, normalized SQL, fetch options) -> result of a read-only statement
+sql_result_cache = get_cache(
+    "sql_result", settings.SQL_RESULT_CACHE_MAX_SIZE, settings.SQL_RESULT_CACHE_TTL_SECONDS
+)
+
+_SCHEMA_QUERY = text(
+    "SELECT table_name, column_name, data_type FROM information_schema.columns "
+    "WHERE table_schema = current_schema() ORDER BY table_name, ordinal_position"
+)
+
+_schema_version: Optional[str] = None
+_schema_checked_at = 0.0
+_schema_lock = threading.Lock()
+
+_DATA_VERSION_QUERY = text(
+    "SELECT COALESCE(string_agg(table_name || ':' || version, ',' ORDER BY table_name), '') FROM table_versions"
+)
+_BUMP_VERSION = text(
+    "INSERT INTO table_versions (table_name, version, updated_at) VALUES (:table_name, 1, now()) "
+    "ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1, updated_at = now() "
+    "RETURNING version"
+)
+
+_TABLE_VERSION_QUERY = text("SELECT version FROM table_versions WHERE table_name = :table_name")
+
+_data_version: Optional[str] = None
+_data_version_checked_at = 0.0
+
+_READ_ONLY = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_WRITE_KEYWORDS = re.compile(
+    r"\b(insert|update|delete|merge|drop|alter|create|truncate|grant|revoke|copy|call)\b", re.IGNORECASE
+)
+
+
+def normalize_question(question: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question"""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.! ").lower()
+
+
+def schema_version() -> str:
+    """Hash of the current schema's columns, re-read at most every SCHEMA_VERSION_TTL_SECONDS"""
+    global _schema_version, _schema_checked_at
+    now = time.monotonic()
+    if _schema_version is not None and now - _schema_checked_at < settings.SCHEMA_VERSION_TTL_SECONDS:
+        return _schema_version
+    with _schema_lock:
+        if _schema_version is None or now - _schema_checked_at >= settings.SCHEMA_VERSION_TTL_SECONDS:
+            with sync_engine.connect() as connection:
+                rows = connection.execute(_SCHEMA_QUERY).all()
+            digest = hashlib.sha256(repr([tuple(row) for row in rows]).encode("utf-8")).hexdigest()[:16]
+            if _schema_version is not None and digest != _schema_version:
+                logger.info(f"Schema version changed from {_schema_version} to {digest}")
+            _schema_version, _schema_checked_at = digest, now
+        return _schema_version
+
+
+def is_read_only(sql: str) -> bool:
+    """Only single SELECT statements are replayed from the cache"""
+    statement = sql.strip().rstrip(";")
+    return bool(_READ_ONLY.match(statement)) and ";" not in statement and not _WRITE_KEYWORDS.search(statement)
+
+
+def _cache_key(question: str, version: str) -> str:
+    return f"{version}:{normalize_question(question)}"
+
+
+def get_cached_sql(question: str) -> Optional[str]:
+    return nl2sql_cache.get(_cache_key(question, schema_version()))
+
+
+def store_sql(question: str, sql: str):
+    if is_read_only(sql):
+        nl2sql_cache.set(_cache_key(question, schema_version()), sql)
+
+
+def evict_sql(question: str):
+    nl2sql_cache.delete(_cache_key(question, schema_version()))
+
+
+class SQLCaptureCallback(BaseCallbackHandler):
+    """Record the statements the SQL agent ran through its sql_db_query tool and whether they succeeded"""
+
+    def __init__(self):
+        self._pending = {}
+        self.succeeded: List[str] = []
+        self.failed: List[str] = []
+
+    def on_tool_start(self, serialized: Any, input_str: str, *, run_id: Any, **kwargs: Any) -> None:
+        if (serialized or {}).get("name") == "sql_db_query":
+            self._pending[run_id] = input_str
+
+    def on_tool_end(self, output: Any, *, run_id: Any, **kwargs: Any) -> None:
+        sql = self._pending.pop(run_id, None)
+        if sql is None:
+            return
+        # QuerySQLDatabaseTool reports database errors as an "Error: ..." result instead of raising
+        content = str(getattr(output, "content", output))
+        (self.failed if content.startswith("Error") else self.succeeded).append(sql)
+
+    def on_tool_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        sql = self._pending.pop(run_id, None)
+        if sql is not None:
+            self.failed.append(sql)
+
+    @property
+    def validated_sql(self) -> Optional[str]:
+        """The answer's SQL, when the agent's result rests on exactly one successful statement"""
+        distinct = list(dict.fromkeys(sql.strip() for sql in self.succeeded))
+        return distinct[0] if len(distinct) == 1 else None
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace outside string literals and drop a trailing semicolon"""
+    parts = re.split(r"('(?:[^']|'')*')", sql.strip().rstrip(";").strip())
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts))
+
+
+def _data_version_fresh() -> bool:
+    return (
+        _data_version is not None
+        and time.monotonic() - _data_version_checked_at < settings.DATA_VERSION_TTL_SECONDS
+    )
+
+
+def _remember_data_version(version: str) -> str:
+    global _data_version, _data_version_checked_at
+    _data_version, _data_version_checked_at = version, time.monotonic()
+    return version
+
+
+def data_version() -> Optional[str]:
+    """Versions of every tracked table, re-read at most every DATA_VERSION_TTL_SECONDS; None if unavailable"""
+    if _data_version_fresh():
+        return _data_version
+    try:
+        with sync_engine.connect() as connection:
+            return _remember_data_version(connection.execute(_DATA_VERSION_QUERY).scalar() or "")
+    except Exception as e:
+        logger.error(f"Failed to read data version: {str(e)}")
+        return None
+
+
+async def data_version_async(session: AsyncSession) -> Optional[str]:
+    if _data_version_fresh():
+        return _data_version
+    try:
+        # Savepoint, so a missing table_versions does not abort the caller's transaction
+        async with session.begin_nested():
+            result = await session.execute(_DATA_VERSION_QUERY)
+        return _remember_data_version(result.scalar() or "")
+    except Exception as e:
+        logger.error(f"Failed to read data version: {str(e)}")
+        return None
+
+
+async def bump_data_version(session: AsyncSession, table_name: str = settings.TABLE_NAME) -> int:
+    """Advance a table's data version inside the caller's transaction, invalidating cached results"""
+    result = await session.execute(_BUMP_VERSION, {"table_name": table_name})
+    return result.scalar()
+
+
+def read_table_version(connection, table_name: str = settings.TABLE_NAME) -> Optional[int]:
+    """Current data version of one table (None before its first write), read on a sync connection"""
+    return connection.execute(_TABLE_VERSION_QUERY, {"table_name": table_name}).scalar()
+
+
+def forget_data_version():
+    """Make this process re-read the data version on the next lookup (call after committing a bump)"""
+    global _data_version
+    _data_version = None
+
+
+def _store_result(key: tuple, result: Any):
+    if len(str(result)) <= settings.SQL_RESULT_CACHE_MAX_BYTES:
+        sql_result_cache.set(key, result)
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """SQLDatabase that answers repeated read-only statements from sql_result_cache until the data changes"""
+
+    def run(self, command, fetch="all", include_columns=False, *,
+            parameters: Optional[Dict[str, Any]] = None, execution_options: Optional[Dict[str, Any]] = None):
+        if not isinstance(command, str) or fetch == "cursor" or not is_read_only(command):
+            return super().run(command, fetch, include_columns, parameters=parameters,
+                               execution_options=execution_options)
+        version = data_version()
+        if version is None:
+            return super().run(command, fetch, include_columns, parameters=parameters,
+                               execution_options=execution_options)
+
+        key = (version, normalize_sql(command), fetch, include_columns, repr(sorted((parameters or {}).items())))
+        cached = sql_result_cache.get(key)
+        if cached is not None:
+            return cached
+        result = super().run(command, fetch, include_columns, parameters=parameters,
+                             execution_options=execution_options)
+        _store_result(key, result)
+        return result
+
+    def get_table_info(self, *args: Any, **kwargs: Any) -> str:
+        """Schema text (DDL plus sample rows) shared by every question until the data changes"""
+        version = data_version()
+        if version is None:
+            return super().get_table_info(*args, **kwargs)
+        key = (version, "table_info", repr(args), repr(sorted(kwargs.items())))
+        cached = sql_result_cache.get(key)
+        if cached is None:
+            cached = super().get_table_info(*args, **kwargs)
+            _store_result(key, cached)
+        return cached
+
+
+async def run_cached_query(session: AsyncSession, sql: str) -> List[tuple]:
+    """Rows of a read-only statement, from sql_result_cache while the data version is unchanged"""
+    version = await data_version_async(session)
+    key = (version, normalize_sql(sql), "rows") if version is not None else None
+    if key is not None:
+        cached = sql_result_cache.get(key)
+        if cached is not None:
+            return cached
+    result = await session.execute(text(sql))
+    rows = [tuple(row) for row in result.all()]
+    if key is not None:
+        _store_result(key, rows)
+    return rows
@@ -0,0 +1,240 @@
+"""Transactional outbox keeping Pinecone in sync with insurance_policies.
+
+Ingestion writes one vector_outbox row per new or changed policy in the same transaction as
+the policy upsert, so the database never commits a policy whose vector sync is lost, and no
+network call happens while that transaction is open. A background drainer claims pending rows
+in short transactions (FOR UPDATE SKIP LOCKED, so several workers can drain concurrently),
+embeds and upserts each batch with one call apiece, and marks the rows done. Failed batches
+are retried with exponential backoff; rows that exhaust OUTBOX_MAX_ATTEMPTS are marked failed
+and their policy's content_hash is cleared so the next ingest of the file queues them again.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.services.pinecone_client import PineconeClient
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BACKLOG = REGISTRY.gauge(
+    "insurance_vector_outbox_backlog", "Vector outbox rows by status", ["status"]
+)
+OUTBOX_PROCESSED = REGISTRY.counter(
+    "insurance_vector_outbox_processed", "Vector outbox rows finished by outcome", ["outcome"]
+)
+OUTBOX_LAG_SECONDS = REGISTRY.gauge(
+    "insurance_vector_outbox_lag_seconds", "Age of the oldest pending vector outbox row"
+)
+
+_ENQUEUE = text(
+    "INSERT INTO vector_outbox (policy_number, vector_id, content_hash, payload) "
+    "VALUES (:policy_number, :vector_id, :content_hash, CAST(:payload AS JSONB))"
+)
+
+# Claim due rows, plus rows whose claimer died before finishing (lease expired)
+_CLAIM = text("""
+    UPDATE vector_outbox SET status = 'processing', claimed_at = now(), attempts = attempts + 1
+    WHERE id IN (
+        SELECT id FROM vector_outbox
+        WHERE (status = 'pending' AND available_at <= now())
+           OR (status = 'processing' AND claimed_at < now() - make_interval(secs => :lease))
+        ORDER BY id
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, policy_number, vector_id, content_hash, payload, attempts
+""")
+
+_BACKLOG = text("""
+    SELECT status, COUNT(*), EXTRACT(EPOCH FROM now() - MIN(created_at))
+    FROM vector_outbox WHERE status IN ('pending', 'processing', 'failed') GROUP BY status
+""")
+
+
+async def enqueue_vectors(session: AsyncSession, records: List[Dict[str, Any]], text_for) -> int:
+    """Queue vector upserts for written policies inside the caller's transaction"""
+    rows = [
+        {
+            "policy_number": record["policy_number"],
+            "vector_id": record["vector_id"],
+            "content_hash": record.get("content_hash"),
+            "payload": json.dumps({
+                "text": text_for(record),
+                "metadata": {
+                    "policy_number": str(record.get("policy_number", "")),
+                    "insured_name": str(record.get("insured_name") or ""),
+                    "sum_insured": float(record.get("sum_insured") or 0),
+                    "premium": float(record.get("premium") or 0),
+                },
+            }),
+        }
+        for record in records
+    ]
+    for i in range(0, len(rows), settings.INGEST_BATCH_SIZE):
+        await session.execute(_ENQUEUE, rows[i:i + settings.INGEST_BATCH_SIZE])
+    return len(rows)
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(settings.OUTBOX_RETRY_MAX_SECONDS, settings.OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1)))
+
+
+class OutboxDrainer:
+    """Background task that drains vector_outbox into Pinecone"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[PineconeClient] = None
+        self._wakeup = asyncio.Event()
+
+    async def _pinecone(self) -> PineconeClient:
+        if self._client is None:
+            client = PineconeClient()
+            await client.init()
+            self._client = client
+        return self._client
+
+    async def drain_once(self) -> int:
+        """Process one claimed batch; returns the number of rows claimed"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                _CLAIM, {"limit": settings.OUTBOX_BATCH_SIZE, "lease": settings.OUTBOX_LEASE_SECONDS}
+            )
+            claimed = result.all()
+            await session.commit()
+            if not claimed:
+                return 0
+
+            # A later ingest may have changed the policy again; its own outbox row carries the new text
+            current = await session.execute(
+                text(f"SELECT policy_number, content_hash FROM {settings.TABLE_NAME} WHERE policy_number = ANY(:numbers)"),
+                {"numbers": list({row.policy_number for row in claimed})},
+            )
+            current_hash = dict(current.all())
+            live = [row for row in claimed if current_hash.get(row.policy_number) == row.content_hash]
+            superseded = [row.id for row in claimed if current_hash.get(row.policy_number) != row.content_hash]
+
+            error = None
+            if live:
+                try:
+                    items = []
+                    for row in live:
+                        payload = row.payload if isinstance(row.payload, dict) else json.loads(row.payload)
+                        items.append((row.vector_id, payload["text"], payload["metadata"]))
+                    client = await self._pinecone()
+                    await client.upsert_batch(items)
+                except Exception as e:
+                    error = str(e)
+                    logger.error(f"Vector outbox batch of {len(live)} rows failed: {error}")
+
+            if superseded:
+                await session.execute(
+                    text("UPDATE vector_outbox SET status = 'superseded', processed_at = now() WHERE id = ANY(:ids)"),
+                    {"ids": superseded},
+                )
+                OUTBOX_PROCESSED.inc(len(superseded), outcome="superseded")
+            if live and error is None:
+                await session.execute(
+                    text("UPDATE vector_outbox SET status = 'done', processed_at = now(), last_error = NULL WHERE id = ANY(:ids)"),
+                    {"ids": [row.id for row in live]},
+                )
+                OUTBOX_PROCESSED.inc(len(live), outcome="done")
+            elif live:
+                await self._record_failure(session, live, error)
+            await session.commit()
+            return len(claimed)
+
+    async def _record_failure(self, session: AsyncSession, rows: List[Any], error: str):
+        exhausted = [row for row in rows if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS]
+        retry = [row for row in rows if row.attempts < settings.OUTBOX_MAX_ATTEMPTS]
+        for row in retry:
+            await session.execute(
+                text("UPDATE vector_outbox SET status = 'pending', last_error = :error, "
+                     "available_at = now() + make_interval(secs => :delay) WHERE id = :id"),
+                {"id": row.id, "error": error, "delay": _retry_delay(row.attempts)},
+            )
+        OUTBOX_PROCESSED.inc(len(retry), outcome="retry")
+        if exhausted:
+            await session.execute(
+                text("UPDATE vector_outbox SET status = 'failed', last_error = :error, processed_at = now() "
+                     "WHERE id = ANY(:ids)"),
+                {"ids": [row.id for row in exhausted], "error": error},
+            )
+            # Clearing the fingerprint makes the next ingest of the same file queue these policies again
+            for row in exhausted:
+                await session.execute(
+                    text(f"UPDATE {settings.TABLE_NAME} SET content_hash = NULL "
+                         f"WHERE policy_number = :policy_number AND content_hash = :content_hash"),
+                    {"policy_number": row.policy_number, "content_hash": row.content_hash},
+                )
+            OUTBOX_PROCESSED.inc(len(exhausted), outcome="failed")
+            logger.error(f"Gave up on {len(exhausted)} vector outbox rows after {settings.OUTBOX_MAX_ATTEMPTS} attempts")
+
+    async def drain_pending(self) -> int:
+        """Drain until no row is due; returns the number of rows processed"""
+        total = 0
+        while True:
+            claimed = await self.drain_once()
+            if not claimed:
+                return total
+            total += claimed
+
+    async def refresh_backlog(self):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(_BACKLOG)
+            counts = {status: (count, age) for status, count, age in result.all()}
+            await session.execute(
+                text("DELETE FROM vector_outbox WHERE status IN ('done', 'superseded') "
+                     "AND processed_at < now() - make_interval(hours => :hours)"),
+                {"hours": settings.OUTBOX_RETENTION_HOURS},
+            )
+            await session.commit()
+        for status in ("pending", "processing", "failed"):
+            OUTBOX_BACKLOG.set(counts.get(status, (0, None))[0], status=status)
+        OUTBOX_LAG_SECONDS.set(float(counts.get("pending", (0, 0))[1] or 0))
+
+    def notify(self):
+        """Wake the drainer now instead of at the next poll (called after an ingest commits)"""
+        self._wakeup.set()
+
+    async def _run(self):
+        logger.info("Vector outbox drainer started")
+        while True:
+            try:
+                processed = await self.drain_pending()
+                if processed:
+                    logger.info(f"Vector outbox drained {processed} rows")
+                await self.refresh_backlog()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Vector outbox drainer error: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+outbox_drainer = OutboxDrainer()
@@ -0,0 +1,207 @@
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+from src.config import settings
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "insurance_cache_requests", "Cache lookups by cache name and result", ["cache", "result"]
+)
+CACHE_ENTRIES = REGISTRY.gauge(
+    "insurance_cache_entries", "Entries currently held by a cache", ["cache"]
+)
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        CACHE_ENTRIES.set_function(lambda: len(self._entries), cache=name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                    return value
+                del self._entries[key]
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_many(self, keys: Iterable[Hashable]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """LRU/TTL cache stored in a local SQLite file shared by every worker process on the host.
+
+    Same interface as TTLCache. The database runs in WAL mode with memory-mapped reads, so
+    lookups from any worker are served from the page cache without blocking writers, and an
+    entry written (or invalidated) by one worker is visible to all of them. Values are pickled.
+    Errors are logged and treated as misses; the cache never fails a request.
+    """
+
+    # Recency of a hit is written back at most this often per entry, so hot reads stay reads
+    TOUCH_INTERVAL = 1.0
+    # Size is enforced every N writes from a process rather than on every write
+    EVICT_EVERY = 64
+
+    def __init__(self, name: str, max_size: int, ttl: float, path: Optional[str] = None,
+                 mmap_bytes: Optional[int] = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path or settings.CACHE_PATH
+        self.mmap_bytes = settings.CACHE_MMAP_BYTES if mmap_bytes is None else mmap_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " cache TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (cache, key)) WITHOUT ROWID"
+        )
+        self._execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_lru ON cache_entries (cache, accessed_at)")
+        CACHE_ENTRIES.set_function(lambda: len(self), cache=name)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections may not be shared between threads; keep one per thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Cursor]:
+        try:
+            return self._connection().execute(sql, params)
+        except sqlite3.Error as e:
+            logger.error(f"Cache '{self.name}' operation failed: {str(e)}")
+            return None
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return repr(key)
+
+    def __len__(self) -> int:
+        cursor = self._execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE cache = ? AND expires_at >= ?", (self.name, time.time())
+        )
+        return cursor.fetchone()[0] if cursor is not None else 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.time()
+        cursor = self._execute(
+            "SELECT value, expires_at, accessed_at FROM cache_entries WHERE cache = ? AND key = ?",
+            (self.name, self._key(key)),
+        )
+        row = cursor.fetchone() if cursor is not None else None
+        if row is not None and row[1] >= now:
+            if now - row[2] > self.TOUCH_INTERVAL:
+                self._execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE cache = ? AND key = ?",
+                    (now, self.name, self._key(key)),
+                )
+            try:
+                value = pickle.loads(row[0])
+            except Exception as e:
+                # Corrupt, or pickled by a version of the code whose classes have changed
+                logger.warning(f"Cache '{self.name}' dropped an unreadable entry: {str(e)}")
+                self.delete(key)
+            else:
+                CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                return value
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.max_size <= 0:
+            return
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._execute(
+            "INSERT OR REPLACE INTO cache_entries (cache, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (self.name, self._key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at, now),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self._evict(now)
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used ones above max_size"""
+        self._execute("DELETE FROM cache_entries WHERE cache = ? AND expires_at < ?", (self.name, now))
+        self._execute(
+            "DELETE FROM cache_entries WHERE cache = ? AND key IN ("
+            " SELECT key FROM cache_entries WHERE cache = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.name, self.name, self.max_size),
+        )
+
+    def delete(self, key: Hashable):
+        self._execute("DELETE FROM cache_entries WHERE cache = ? AND key = ?", (self.name, self._key(key)))
+
+    def delete_many(self, keys: Iterable[Hashable]):
+        rows = [(self.name, self._key(key)) for key in keys]
+        if not rows:
+            return
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute("BEGIN")
+                connection.executemany("DELETE FROM cache_entries WHERE cache = ? AND key = ?", rows)
+        except sqlite3.Error as e:
+            logger.error(f"Cache '{self.name}' invalidation failed: {str(e)}")
+
+    def clear(self):
+        self._execute("DELETE FROM cache_entries WHERE cache = ?", (self.name,))
+
+
+def get_cache(name: str, max_size: int, ttl: float):
+    """Build a cache on the backend selected by CACHE_BACKEND"""
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "sqlite":
+        return SQLiteCache(name, max_size, ttl)
+    if backend != "memory":
+        logger.warning(f"Unknown CACHE_BACKEND '{settings.CACHE_BACKEND}', using in-process cache for '{name}'")
+    return TTLCache(name, max_size, ttl)
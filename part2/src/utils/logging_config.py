@@ -0,0 +1,123 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional, Sequence, Tuple
+
+from src.config import settings
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is emitted as a field
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class CallSiteRateLimitFilter(logging.Filter):
+    """Cap how many records below WARNING a call site in one of `loggers` may emit per second.
+
+    Only the named loggers (and their children) are limited: their per-row loops (ingestion,
+    vector upserts) would otherwise produce one line per row. Every other logger, and warnings
+    and errors from any logger, always pass.
+    """
+
+    def __init__(self, max_per_second: int, loggers: Sequence[str]):
+        super().__init__()
+        self.max_per_second = max_per_second
+        self.loggers = tuple(loggers)
+        self._windows: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def _limited(self, name: str) -> bool:
+        return any(name == logger or name.startswith(logger + ".") for logger in self.loggers)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.max_per_second <= 0 or not self._limited(record.name):
+            return True
+        key = (record.pathname, record.lineno)
+        now = int(time.monotonic())
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != now:
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                self._windows[key] = [now, 1, 0]
+                return True
+            if window[1] < self.max_per_second:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def configure_logging():
+    """Route all logging through a queue drained by a background thread.
+
+    Request handlers only enqueue records; formatting, file rotation and console output
+    happen on the listener thread so the event loop never blocks on disk I/O.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
+
+    file_handler = RotatingFileHandler(
+        settings.LOG_FILE,
+        maxBytes=settings.LOG_MAX_BYTES,
+        backupCount=settings.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    stream_handler = logging.StreamHandler()
+    if settings.LOG_JSON:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+        handler.setLevel(level)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(CallSiteRateLimitFilter(
+        settings.LOG_MAX_PER_SECOND_PER_CALL_SITE, settings.LOG_RATE_LIMITED_LOGGERS
+    ))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,284 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, tuned for calls between ~1ms (cache/DB) and ~1min (agent runs)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Count buckets for per-request token / call counters
+COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class _Metric:
+    """Base class for metrics rendered in the Prometheus text exposition format"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels_dict(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(f"{self.name}_total", self._labels_dict(key), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed on scrape via a callback"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, func: Callable[[], float], **labels):
+        """Evaluate `func` at scrape time instead of storing a value"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = func
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        with self._lock:
+            func = self._functions.get(key)
+            if func is None:
+                return self._values.get(key, 0.0)
+        return float(func())
+
+    def samples(self):
+        with self._lock:
+            items = dict(self._values)
+            functions = list(self._functions.items())
+        for key, func in functions:
+            try:
+                items[key] = float(func())
+            except Exception:
+                continue
+        return [(self.name, self._labels_dict(key), value) for key, value in items.items()]
+
+
+class _HistogramState:
+    __slots__ = ("bucket_counts", "count", "sum")
+
+    def __init__(self, n_buckets: int):
+        self.bucket_counts = [0] * n_buckets
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        self._states: Dict[Tuple[str, ...], _HistogramState] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _HistogramState(len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state.bucket_counts[i] += 1
+                    break
+            state.count += 1
+            state.sum += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the wrapped block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._states.get(self._key(labels))
+            return state.count if state else 0
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = [(key, list(s.bucket_counts), s.count, s.sum) for key, s in self._states.items()]
+        for key, bucket_counts, count, total in items:
+            labels = self._labels_dict(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                out.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            out.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+            out.append((f"{self.name}_count", labels, count))
+            out.append((f"{self.name}_sum", labels, total))
+        return out
+
+
+class MetricsRegistry:
+    """Holds every metric exposed on /health/prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Ingestion
+EXCEL_PARSE_SECONDS = REGISTRY.histogram(
+    "insurance_excel_parse_seconds", "Time spent parsing and transforming an uploaded Excel workbook"
+)
+DB_UPSERT_SECONDS = REGISTRY.histogram(
+    "insurance_db_upsert_seconds", "Time spent executing a policy upsert statement batch"
+)
+INGESTED_ROWS = REGISTRY.counter(
+    "insurance_ingested_rows", "Policy rows processed by ingestion", ["outcome"]
+)
+INGEST_SPLIT_VIOLATIONS = REGISTRY.counter(
+    "insurance_ingest_split_violations", "Ingested rows failing a reinsurance split check", ["violation"]
+)
+
+# Embeddings / vector store
+EMBEDDING_SECONDS = REGISTRY.histogram(
+    "insurance_embedding_seconds", "Latency of embedding calls", ["source"]
+)
+PINECONE_SECONDS = REGISTRY.histogram(
+    "insurance_pinecone_seconds", "Latency of Pinecone calls", ["operation"]
+)
+
+# Agent
+AGENT_SECONDS = REGISTRY.histogram(
+    "insurance_agent_seconds", "Total time spent answering a question with the agent"
+)
+TOOL_SECONDS = REGISTRY.histogram(
+    "insurance_agent_tool_seconds", "Time spent inside agent tools", ["tool"]
+)
+LLM_CALLS = REGISTRY.counter(
+    "insurance_llm_calls", "LLM calls issued", ["model"]
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "insurance_llm_seconds", "Latency of individual LLM calls", ["model"]
+)
+LLM_ROUTED_STEPS = REGISTRY.counter(
+    "insurance_llm_routed_steps", "Agent steps sent to each model tier by the router", ["tier"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "insurance_llm_tokens", "LLM tokens consumed", ["model", "kind"]
+)
+QUERY_LLM_CALLS = REGISTRY.histogram(
+    "insurance_query_llm_calls", "LLM calls issued per /query request", buckets=COUNT_BUCKETS
+)
+QUERY_TOKENS = REGISTRY.histogram(
+    "insurance_query_tokens", "LLM tokens consumed per /query request", buckets=COUNT_BUCKETS
+)
@@ -0,0 +1,261 @@
+"""Timeouts, retries, circuit breaking and hedging for calls to remote services (Gemini, Pinecone).
+
+Every remote dependency gets one RemoteDependency. A logical call has an overall deadline,
+each attempt has its own timeout, and 429/5xx/timeout/connection failures are retried with
+full-jitter exponential backoff. Repeated failures open the dependency's circuit breaker,
+which fails calls fast until a probe after CIRCUIT_RESET_SECONDS succeeds. For
+latency-sensitive calls, `hedged_call` starts a duplicate request when the first has not
+answered within `hedge_after` seconds and returns whichever finishes first.
+"""
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.config import settings
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REMOTE_CALLS = REGISTRY.counter(
+    "insurance_remote_calls", "Remote call attempts by dependency and outcome", ["dependency", "outcome"]
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "insurance_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ["dependency"]
+)
+
+# Sync remote calls run here so a hung SDK call cannot outlive its attempt timeout in the caller
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="remote-call")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the dependency while its circuit breaker is open"""
+
+
+class RemoteTimeoutError(TimeoutError):
+    """An attempt or the overall call deadline expired"""
+
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK exception (google.api_core, pinecone, httpx styles)"""
+    candidates = [getattr(error, name, None) for name in ("status_code", "status", "code")]
+    response = getattr(error, "response", None)
+    if response is not None:
+        candidates.append(getattr(response, "status_code", None))
+    for value in candidates:
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = status_code_of(error)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError))
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Full-jitter exponential backoff for the given 1-based attempt"""
+    return random.uniform(0, min(maximum, base * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; lets one probe through after `reset_timeout`"""
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set_function(lambda: self._STATE_VALUES[self.state], dependency=name)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+class RemoteDependency:
+    """Retry, deadline and circuit-breaker policy for one remote service"""
+
+    def __init__(self, name: str, attempt_timeout: Optional[float] = None, deadline: Optional[float] = None,
+                 max_attempts: Optional[int] = None, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.attempt_timeout = attempt_timeout or settings.REMOTE_ATTEMPT_TIMEOUT_SECONDS
+        self.deadline = deadline or settings.REMOTE_DEADLINE_SECONDS
+        self.max_attempts = max_attempts or settings.REMOTE_MAX_ATTEMPTS
+        self.breaker = breaker or CircuitBreaker(
+            name, settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_SECONDS
+        )
+
+    def with_options(self, **overrides: Any) -> "RemoteDependency":
+        """Same dependency (and breaker) with a different timeout/deadline/attempt policy"""
+        options = {"attempt_timeout": self.attempt_timeout, "deadline": self.deadline,
+                   "max_attempts": self.max_attempts, **overrides}
+        return RemoteDependency(self.name, breaker=self.breaker, **options)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"state": self.breaker.state, "consecutive_failures": self.breaker.failures}
+
+    def _admit(self, deadline_at: float) -> float:
+        """Timeout for the next attempt; fails fast on an open circuit or a spent deadline"""
+        if not self.breaker.allow():
+            REMOTE_CALLS.inc(dependency=self.name, outcome="short_circuit")
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            REMOTE_CALLS.inc(dependency=self.name, outcome="deadline")
+            raise RemoteTimeoutError(f"{self.name} call exceeded its {self.deadline:.1f}s deadline")
+        return min(self.attempt_timeout, remaining)
+
+    def _on_success(self):
+        self.breaker.record_success()
+        REMOTE_CALLS.inc(dependency=self.name, outcome="success")
+
+    def _on_failure(self, error: Exception, attempt: int, deadline_at: float) -> float:
+        """Backoff before the next attempt, or re-raise `error` when it should not be retried"""
+        if not is_retryable(error):
+            # The service answered; a bad request says nothing about its health
+            self.breaker.record_success()
+            REMOTE_CALLS.inc(dependency=self.name, outcome="error")
+            raise error
+        self.breaker.record_failure()
+        delay = backoff_delay(attempt, settings.REMOTE_BACKOFF_BASE_SECONDS, settings.REMOTE_BACKOFF_MAX_SECONDS)
+        if attempt >= self.max_attempts or time.monotonic() + delay >= deadline_at:
+            REMOTE_CALLS.inc(dependency=self.name, outcome="failure")
+            raise error
+        REMOTE_CALLS.inc(dependency=self.name, outcome="retry")
+        logger.warning(f"{self.name} attempt {attempt} failed ({str(error)}), retrying in {delay:.2f}s")
+        return delay
+
+    @staticmethod
+    def _submit(fn: Callable, args: tuple, kwargs: dict):
+        # Carry context variables (current span, per-request LLM usage) into the worker thread
+        return _executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def _attempt(self, fn: Callable, args: tuple, kwargs: dict, timeout: float, hedge_after: float = 0.0) -> Any:
+        started = time.monotonic()
+        futures = [self._submit(fn, args, kwargs)]
+        if 0 < hedge_after < timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done and self.breaker.allow():
+                REMOTE_CALLS.inc(dependency=self.name, outcome="hedged")
+                futures.append(self._submit(fn, args, kwargs))
+
+        pending, error = set(futures), None
+        while pending:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        if pending or error is None:
+            for future in pending:
+                future.cancel()
+            raise RemoteTimeoutError(f"{self.name} attempt timed out after {timeout:.1f}s")
+        raise error
+
+    def call(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking SDK call under this dependency's policy"""
+        return self._call(fn, args, kwargs, 0.0)
+
+    def hedged_call(self, fn: Callable, *args: Any, hedge_after: Optional[float] = None, **kwargs: Any) -> Any:
+        """Like call, but duplicates a slow attempt after `hedge_after` seconds (for idempotent reads)"""
+        hedge = settings.EMBEDDING_HEDGE_AFTER_SECONDS if hedge_after is None else hedge_after
+        return self._call(fn, args, kwargs, hedge)
+
+    def _call(self, fn: Callable, args: tuple, kwargs: dict, hedge_after: float) -> Any:
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._admit(deadline_at)
+            try:
+                result = self._attempt(fn, args, kwargs, timeout, hedge_after)
+            except Exception as e:
+                time.sleep(self._on_failure(e, attempt, deadline_at))
+                continue
+            self._on_success()
+            return result
+
+    async def acall(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Async variant: coroutine functions are awaited, blocking functions run in a thread"""
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._admit(deadline_at)
+            if asyncio.iscoroutinefunction(fn):
+                awaitable: Awaitable = fn(*args, **kwargs)
+            else:
+                awaitable = asyncio.to_thread(fn, *args, **kwargs)
+            try:
+                result = await asyncio.wait_for(awaitable, timeout)
+            except asyncio.TimeoutError:
+                delay = self._on_failure(
+                    RemoteTimeoutError(f"{self.name} attempt timed out after {timeout:.1f}s"), attempt, deadline_at
+                )
+                await asyncio.sleep(delay)
+                continue
+            except Exception as e:
+                await asyncio.sleep(self._on_failure(e, attempt, deadline_at))
+                continue
+            self._on_success()
+            return result
+
+
+gemini_embeddings = RemoteDependency("gemini_embeddings")
+pinecone = RemoteDependency("pinecone")
+# Agent runs are long and not idempotent enough to replay: one attempt, breaker only
+gemini_chat = RemoteDependency(
+    "gemini_chat",
+    attempt_timeout=settings.AGENT_TIMEOUT_SECONDS,
+    deadline=settings.AGENT_TIMEOUT_SECONDS,
+    max_attempts=1,
+)
+
+DEPENDENCIES = {dependency.name: dependency for dependency in (gemini_embeddings, pinecone, gemini_chat)}
@@ -4,11 +4,67 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from src.config import settings
 import logging
 import re
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBasic()
 
+class CredentialCache:
+    """Short-lived record of credentials that already passed verification.
+
+    Entries are keyed by an HMAC of the username, password and configured hash under a
+    per-process random key, so neither plaintext passwords nor reusable digests are kept in
+    memory. Bounded in size (LRU) and expiring after `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._key = os.urandom(32)
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, username: str, password: str, stored_password: str) -> bytes:
+        message = b"\x00".join(s.encode("utf-8") for s in (username, password, stored_password))
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def contains(self, username: str, password: str, stored_password: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        digest = self._digest(username, password, stored_password)
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._entries.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at < now:
+                del self._entries[digest]
+                return False
+            self._entries.move_to_end(digest)
+            return True
+
+    def add(self, username: str, password: str, stored_password: str):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        digest = self._digest(username, password, stored_password)
+        with self._lock:
+            self._entries[digest] = time.monotonic() + self.ttl
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+credential_cache = CredentialCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_SIZE)
+
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
     salt = bcrypt.gensalt()
@@ -39,10 +95,20 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 def get_current_user(credentials: HTTPBasicCredentials = Depends(security)):
-    """Verify basic authentication credentials"""
-    correct_username = credentials.username == settings.API_USERNAME
+    """Verify basic authentication credentials, skipping bcrypt for recently verified ones"""
+    correct_username = hmac.compare_digest(
+        credentials.username.encode("utf-8"), settings.API_USERNAME.encode("utf-8")
+    )
+    if correct_username and credential_cache.contains(
+        credentials.username, credentials.password, settings.API_PASSWORD
+    ):
+        return credentials.username
+
     correct_password = verify_password(credentials.password, settings.API_PASSWORD)
 
+    if correct_username and correct_password:
+        credential_cache.add(credentials.username, credentials.password, settings.API_PASSWORD)
+
     if not (correct_username and correct_password):
         logger.warning(f"Failed authentication attempt for user: {credentials.username}")
         raise HTTPException(
@@ -0,0 +1,279 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+class Span:
+    """Timed unit of work following the OpenTelemetry span data model"""
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None, kind: str = "INTERNAL",
+                 sampled: bool = True):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[Dict[str, Any]] = []
+        self.status_code = "UNSET"
+        self.status_message: Optional[str] = None
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.events.append({
+            "name": name,
+            "timeUnixNano": time.time_ns(),
+            "attributes": dict(attributes or {}),
+        })
+
+    def record_exception(self, exc: BaseException):
+        self.status_code = "ERROR"
+        self.status_message = str(exc)
+        self.add_event("exception", {
+            "exception.type": type(exc).__name__,
+            "exception.message": str(exc),
+        })
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time_unix_nano is None:
+            return None
+        return (self.end_time_unix_nano - self.start_time_unix_nano) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_time_unix_nano,
+            "endTimeUnixNano": self.end_time_unix_nano,
+            "durationMs": self.duration_ms,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+
+
+class SpanExporter:
+    """Base class for span exporters; subclasses receive finished, sampled spans in batches"""
+
+    def export(self, spans: List[Span]):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class NoopSpanExporter(SpanExporter):
+    def export(self, spans: List[Span]):
+        pass
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """Append spans to a file as JSON lines for offline inspection"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """Write spans to the application log"""
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            logger.info(f"span {json.dumps(span.to_dict(), default=str)}")
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keep finished spans in memory; useful for benchmarks and debugging"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Creates spans, applies head sampling and hands finished spans to a background exporter"""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0,
+                 flush_interval: float = 1.0, max_batch_size: int = 512):
+        self.exporter = exporter or NoopSpanExporter()
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue[Span]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 and not isinstance(self.exporter, NoopSpanExporter)
+
+    def set_exporter(self, exporter: SpanExporter):
+        self.flush()
+        self.exporter = exporter
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def create_span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                    kind: str = "INTERNAL", parent: Optional[Span] = None) -> Span:
+        """Create a span without making it current; the caller must pass it to end_span"""
+        parent = parent if parent is not None else _current_span.get()
+        if parent is None:
+            sampled = self.enabled and random.random() < self.sample_rate
+            return Span(name, _new_id(16), None, attributes, kind, sampled)
+        return Span(name, parent.trace_id, parent.span_id, attributes, kind, parent.sampled)
+
+    def end_span(self, span: Span):
+        if span.end_time_unix_nano is not None:
+            return
+        span.end_time_unix_nano = time.time_ns()
+        if span.status_code == "UNSET":
+            span.status_code = "OK"
+        if span.sampled:
+            self._queue.put(span)
+            self._ensure_worker()
+
+    @contextmanager
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: str = "INTERNAL"):
+        """Run the wrapped block inside a new span that becomes the current span"""
+        span = self.create_span(name, attributes, kind)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._worker.start()
+
+    def _drain(self) -> List[Span]:
+        batch = []
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch: List[Span]):
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.error(f"Span export failed: {str(e)}")
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._export([first] + self._drain())
+
+    def flush(self):
+        """Synchronously export every span queued so far"""
+        batch = self._drain()
+        while batch:
+            self._export(batch)
+            batch = self._drain()
+
+
+def _build_exporter(name: str, path: str) -> SpanExporter:
+    if name == "json":
+        return JsonFileSpanExporter(path)
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name not in ("", "none"):
+        logger.warning(f"Unknown span exporter '{name}', tracing disabled")
+    return NoopSpanExporter()
+
+
+tracer = Tracer(
+    exporter=_build_exporter(settings.TRACING_EXPORTER.lower(), settings.TRACING_EXPORT_PATH),
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+)
+
+
+def instrument_engine(engine, span_tracer: Optional[Tracer] = None):
+    """Record a span for every SQL statement executed through a SQLAlchemy engine"""
+    span_tracer = span_tracer or tracer
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current_span.get() is None:
+            return
+        span = span_tracer.create_span("sql", {
+            "db.system": "postgresql",
+            "db.statement": statement,
+            "db.executemany": executemany,
+        }, kind="CLIENT")
+        conn.info.setdefault("_trace_spans", []).append(span)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("_trace_spans")
+        if spans:
+            span = spans.pop()
+            rowcount = getattr(cursor, "rowcount", None)
+            if rowcount is not None:
+                span.set_attribute("db.rowcount", rowcount)
+            span_tracer.end_span(span)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("_trace_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            span.record_exception(exception_context.original_exception)
+            span_tracer.end_span(span)
+
+    return engine
@@ -1,9 +1,12 @@
+import numpy as np
 import pandas as pd
 import re
 from datetime import datetime
 from fastapi import HTTPException
 import logging
 from io import BytesIO
+from typing import Dict, List, Optional
+from src.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -95,6 +98,87 @@ def validate_insurance_data(df_or_file):
     
     return df
 
+# Reinsurance split violations, as bit flags so one row can carry several
+SPLIT_PPN_TOTAL = 1                # own + treaty + facultative PPN is not 100%
+SPLIT_SUM_INSURED_TOTAL = 2        # share sums insured do not add up to the policy sum insured
+SPLIT_PREMIUM_TOTAL = 4            # share premiums do not add up to the policy premium
+SPLIT_SUM_INSURED_SHARE = 8        # a share's sum insured is not its PPN of the policy sum insured
+SPLIT_PREMIUM_SHARE = 16           # a share's premium is not its PPN of the policy premium
+SPLIT_OUT_OF_RANGE = 32            # negative amount, or a PPN outside 0-100
+SPLIT_MISSING_TOTAL = 64           # policy sum insured or premium missing, so totals cannot be checked
+
+SPLIT_VIOLATIONS = {
+    SPLIT_PPN_TOTAL: "ppn_total",
+    SPLIT_SUM_INSURED_TOTAL: "sum_insured_total",
+    SPLIT_PREMIUM_TOTAL: "premium_total",
+    SPLIT_SUM_INSURED_SHARE: "sum_insured_share",
+    SPLIT_PREMIUM_SHARE: "premium_share",
+    SPLIT_OUT_OF_RANGE: "out_of_range",
+    SPLIT_MISSING_TOTAL: "missing_total",
+}
+
+# (PPN, sum insured, premium) column of each share of the risk
+SPLIT_SHARES = [
+    ("own_retention_ppn", "own_retention_sum_insured", "own_retention_premium"),
+    ("treaty_retention_ppn", "treaty_sum_insured", "treaty_premium"),
+    ("facultative_outward_ppn", "facultative_outward_sum_insured", "facultative_outward_premium"),
+]
+
+def _numeric_column(df: pd.DataFrame, column: str, fill: Optional[float]) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), np.nan if fill is None else fill)
+    values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return values if fill is None else np.where(np.isnan(values), fill, values)
+
+def check_reinsurance_splits(df: pd.DataFrame, ppn_tolerance: Optional[float] = None,
+                             rel_tolerance: Optional[float] = None,
+                             abs_tolerance: Optional[float] = None) -> np.ndarray:
+    """Per-row bitmask of SPLIT_* violations, computed as column operations over the whole frame
+
+    Blank share columns count as 0 (e.g. no facultative cover). Amount checks allow
+    `abs_tolerance` plus `rel_tolerance` times the policy total, which also absorbs PPN rounding.
+    """
+    ppn_tolerance = settings.SPLIT_PPN_TOLERANCE if ppn_tolerance is None else ppn_tolerance
+    rel_tolerance = settings.SPLIT_AMOUNT_REL_TOLERANCE if rel_tolerance is None else rel_tolerance
+    abs_tolerance = settings.SPLIT_AMOUNT_ABS_TOLERANCE if abs_tolerance is None else abs_tolerance
+
+    sum_insured = _numeric_column(df, "sum_insured", None)
+    premium = _numeric_column(df, "premium", None)
+    # (3, n) arrays: one row per share
+    ppn = np.stack([_numeric_column(df, columns[0], 0.0) for columns in SPLIT_SHARES])
+    share_sum_insured = np.stack([_numeric_column(df, columns[1], 0.0) for columns in SPLIT_SHARES])
+    share_premium = np.stack([_numeric_column(df, columns[2], 0.0) for columns in SPLIT_SHARES])
+
+    codes = np.zeros(len(df), dtype=np.uint8)
+    codes[np.abs(ppn.sum(axis=0) - 100.0) > ppn_tolerance] |= SPLIT_PPN_TOTAL
+
+    with np.errstate(invalid="ignore"):
+        for total, shares, total_flag, share_flag in (
+            (sum_insured, share_sum_insured, SPLIT_SUM_INSURED_TOTAL, SPLIT_SUM_INSURED_SHARE),
+            (premium, share_premium, SPLIT_PREMIUM_TOTAL, SPLIT_PREMIUM_SHARE),
+        ):
+            allowed = abs_tolerance + rel_tolerance * np.abs(total)  # NaN where the total is missing
+            codes[np.abs(shares.sum(axis=0) - total) > allowed] |= total_flag
+            expected = ppn / 100.0 * total
+            codes[(np.abs(shares - expected) > allowed).any(axis=0)] |= share_flag
+
+        out_of_range = (
+            (ppn < -ppn_tolerance).any(axis=0) | (ppn > 100.0 + ppn_tolerance).any(axis=0)
+            | (share_sum_insured < 0).any(axis=0) | (share_premium < 0).any(axis=0)
+            | (sum_insured < 0) | (premium < 0)
+        )
+    codes[out_of_range] |= SPLIT_OUT_OF_RANGE
+    codes[np.isnan(sum_insured) | np.isnan(premium)] |= SPLIT_MISSING_TOTAL
+    return codes
+
+def summarize_split_violations(codes: np.ndarray) -> Dict[str, int]:
+    """Rows carrying each violation, for violations that occur"""
+    counts = {name: int(np.count_nonzero(codes & flag)) for flag, name in SPLIT_VIOLATIONS.items()}
+    return {name: count for name, count in counts.items() if count}
+
+def split_violation_names(code: int) -> List[str]:
+    return [name for flag, name in SPLIT_VIOLATIONS.items() if code & flag]
+
 def sanitize_input(input_string: str):
     """Sanitize user input to prevent injection attacks"""
     if not input_string:
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Placeholder settings so src.config loads without a .env; nothing here connects to them
+for name, value in {
+    "DB_USERNAME": "test", "DB_PASSWORD": "test", "DB_HOST": "localhost", "DB_PORT": "5432",
+    "DB_NAME": "test", "GOOGLE_API_KEY": "test", "PINECONE_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
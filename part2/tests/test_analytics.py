@@ -0,0 +1,173 @@
+import random
+from collections import defaultdict
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from src.config import settings
+from src.services import analytics
+from src.services.analytics import DATE_COLUMNS, NUMERIC_COLUMNS, ColumnarSnapshot, run_analytics_request
+
+NAMES = [None, "Acme Ltd", "Globex", "Initech", "acme holdings"]
+
+
+def random_policy(rng):
+    start = rng.choice([None, date(rng.choice([2023, 2024]), rng.randint(1, 12), rng.randint(1, 28))])
+    end = None if start is None or rng.random() < 0.1 else date(start.year + 1, start.month, start.day)
+    return {
+        "insured_name": rng.choice(NAMES),
+        **{column: rng.choice([None, round(rng.uniform(0, 1e6), 2)]) for column in NUMERIC_COLUMNS},
+        "insurance_period_start_date": start,
+        "insurance_period_end_date": end,
+    }
+
+
+@pytest.fixture(scope="module")
+def policies():
+    rng = random.Random(7)
+    return [random_policy(rng) for _ in range(500)]
+
+
+@pytest.fixture(scope="module")
+def snapshot(policies):
+    return ColumnarSnapshot(pd.DataFrame(policies), version=3)
+
+
+@pytest.fixture(autouse=True)
+def all_groups(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYTICS_MAX_GROUPS", 10000)
+
+
+def group_key(policy, group_by):
+    if group_by is None:
+        return None
+    if group_by == "insured_name":
+        return policy["insured_name"]
+    day = policy[DATE_COLUMNS[0] if group_by.startswith("start") else DATE_COLUMNS[1]]
+    if day is None:
+        return None
+    return day.strftime("%Y-%m") if group_by.endswith("month") else str(day.year)
+
+
+def matches(policy, filters):
+    for key, value in (filters or {}).items():
+        if key == "insured_name":
+            if policy["insured_name"] is None or value.lower() not in policy["insured_name"].lower():
+                return False
+        elif key == "in_force_on":
+            start, end = policy[DATE_COLUMNS[0]], policy[DATE_COLUMNS[1]]
+            if start is None or end is None or not start <= value <= end:
+                return False
+        else:
+            low, high = value
+            if policy[key] is None or (low is not None and policy[key] < low) or (high is not None and policy[key] > high):
+                return False
+    return True
+
+
+def reference(policies, metrics, group_by=None, filters=None):
+    """The same aggregate, one row at a time"""
+    groups = defaultdict(list)
+    for policy in policies:
+        if matches(policy, filters):
+            groups[group_key(policy, group_by)].append(policy)
+    result = {}
+    for key, members in groups.items():
+        row = {}
+        for metric in metrics:
+            func, _, column = metric.partition(":")
+            values = [member[column] for member in members if member[column] is not None] if column else None
+            if func == "count":
+                row[metric] = len(members)
+            elif not values:
+                row[metric] = None
+            elif func == "sum":
+                row[metric] = sum(values)
+            elif func == "avg":
+                row[metric] = sum(values) / len(values)
+            else:
+                row[metric] = min(values) if func == "min" else max(values)
+        result[key] = row
+    return result
+
+
+def by_group(result, group_by):
+    return {
+        (row[group_by] if group_by else None): {name: row[name] for name in result["columns"] if name != group_by}
+        for row in result["rows"]
+    }
+
+
+def assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, row in expected.items():
+        for name, value in row.items():
+            if isinstance(value, float):
+                assert actual[key][name] == pytest.approx(value), (key, name)
+            else:
+                assert actual[key][name] == value, (key, name)
+
+
+METRICS = ["count", "sum:premium", "avg:sum_insured", "min:treaty_premium", "max:own_retention_ppn",
+           "min:insurance_period_start_date", "max:insurance_period_end_date"]
+
+
+@pytest.mark.parametrize("group_by", [None, "insured_name", "start_month", "end_month", "start_year", "end_year"])
+@pytest.mark.parametrize("filters", [
+    None,
+    {"insured_name": "ACME"},
+    {"in_force_on": "2024-06-01"},
+    {"premium": [100000, 600000]},
+    {"sum_insured": [None, 250000], "insurance_period_start_date": ["2024-01-01", None]},
+])
+def test_aggregate_matches_row_by_row(snapshot, policies, group_by, filters):
+    result = snapshot.aggregate(METRICS, group_by=group_by, filters=filters)
+
+    converted = dict(filters or {})
+    if "in_force_on" in converted:
+        converted["in_force_on"] = date.fromisoformat(converted["in_force_on"])
+    if "insurance_period_start_date" in converted:
+        converted["insurance_period_start_date"] = [
+            None if bound is None else date.fromisoformat(bound) for bound in converted["insurance_period_start_date"]
+        ]
+    expected = reference(policies, METRICS, group_by, converted)
+
+    assert_same(by_group(result, group_by), expected)
+    assert result["groups"] == len(expected)
+    assert result["matched_rows"] == sum(row["count"] for row in expected.values())
+    assert result["data_version"] == 3
+
+
+def test_ordering_and_limit(snapshot, policies):
+    result = snapshot.aggregate(["sum:premium", "count"], group_by="start_month", descending=False, limit=5)
+    expected = reference(policies, ["sum:premium", "count"], "start_month")
+    ranked = sorted(
+        expected.items(),
+        key=lambda item: float("inf") if item[1]["sum:premium"] is None else item[1]["sum:premium"],
+    )[:5]
+
+    assert [row["start_month"] for row in result["rows"]] == [key for key, _ in ranked]
+    assert result["groups"] == len(expected)
+
+
+def test_rejects_unknown_metric_and_order(snapshot):
+    with pytest.raises(ValueError):
+        snapshot.aggregate(["median:premium"])
+    with pytest.raises(ValueError):
+        snapshot.aggregate(["avg:insurance_period_start_date"])
+    with pytest.raises(ValueError):
+        snapshot.aggregate(["count"], order_by="sum:premium")
+
+
+def test_run_analytics_request_renders_table(snapshot, policies, monkeypatch):
+    monkeypatch.setattr(analytics.analytics_engine, "snapshot", lambda: snapshot)
+
+    table = run_analytics_request('{"metrics": "count", "group_by": "insured_name", "limit": 2}')
+
+    counts = sorted((row["count"] for row in reference(policies, ["count"], "insured_name").values()), reverse=True)
+    lines = table.splitlines()
+    assert lines[0] == "insured_name|count"
+    assert [int(line.split("|")[1]) for line in lines[1:3]] == counts[:2]
+    assert lines[-2] == f"(top 2 of {len(counts)} groups)"
+    assert lines[-1] == f"({len(policies)} matching policies)"
@@ -0,0 +1,103 @@
+import pytest
+
+from src.utils import cache
+from src.utils.cache import SQLiteCache, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache, "time", fake)
+    return fake
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def make(max_size=100, ttl=60.0):
+        if request.param == "memory":
+            return TTLCache("test", max_size, ttl)
+        sqlite_cache = SQLiteCache("test", max_size, ttl, path=str(tmp_path / "cache.sqlite3"))
+        sqlite_cache.EVICT_EVERY = 1
+        sqlite_cache.TOUCH_INTERVAL = 0.0
+        return sqlite_cache
+    return make
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path):
+    return SQLiteCache("test", max_size=100, ttl=60.0, path=str(tmp_path / "cache.sqlite3"))
+
+
+def test_entries_expire_after_ttl(make_cache, clock):
+    entries = make_cache(ttl=10.0)
+    entries.set("a", 1)
+    entries.set("b", 2, ttl=30.0)
+    clock.now += 10.0
+    assert entries.get("a") == 1
+    clock.now += 0.5
+    assert entries.get("a") is None
+    assert entries.get("b") == 2
+    clock.now += 20.0
+    assert entries.get("b") is None
+
+
+def test_least_recently_used_entry_is_evicted(make_cache, clock):
+    entries = make_cache(max_size=3)
+    for key in "abc":
+        entries.set(key, key.upper())
+        clock.now += 1.0
+    assert entries.get("a") == "A"  # now the most recently used
+    clock.now += 1.0
+    entries.set("d", "D")
+    assert entries.get("b") is None
+    assert [entries.get(key) for key in "acd"] == ["A", "C", "D"]
+    assert len(entries) == 3
+
+
+def test_delete_many_and_clear(make_cache):
+    entries = make_cache()
+    for key in "abc":
+        entries.set(key, key)
+    entries.delete_many(["a", "b", "missing"])
+    assert [entries.get(key) for key in "abc"] == [None, None, "c"]
+    entries.clear()
+    assert len(entries) == 0
+
+
+def test_zero_size_disables_the_cache(make_cache):
+    entries = make_cache(max_size=0)
+    entries.set("a", 1)
+    assert entries.get("a") is None
+
+
+def test_sqlite_entries_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = SQLiteCache("shared", 10, 60.0, path=path)
+    reader = SQLiteCache("shared", 10, 60.0, path=path)
+    writer.set(("v1", "question"), ["row"])
+    assert reader.get(("v1", "question")) == ["row"]
+    reader.delete(("v1", "question"))
+    assert writer.get(("v1", "question")) is None
+
+
+def test_unreadable_entry_is_a_miss_and_is_dropped(sqlite_cache):
+    sqlite_cache.set("good", {"rows": [1, 2]})
+    sqlite_cache.set("bad", "value")
+    sqlite_cache._execute(
+        "UPDATE cache_entries SET value = ? WHERE cache = ? AND key = ?",
+        (b"not a pickle", "test", sqlite_cache._key("bad")),
+    )
+    assert sqlite_cache.get("bad") is None
+    assert len(sqlite_cache) == 1
+    assert sqlite_cache.get("good") == {"rows": [1, 2]}
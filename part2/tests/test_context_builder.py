@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.config import settings
+from src.services.context_builder import build_context, estimate_tokens, fit_texts
+
+
+@pytest.fixture(autouse=True)
+def no_database(monkeypatch):
+    monkeypatch.setattr(settings, "CONTEXT_FETCH_FROM_DB", False)
+
+
+def doc(text, **metadata):
+    return SimpleNamespace(page_content=text, metadata=metadata)
+
+
+def test_fit_texts_cuts_at_the_budget():
+    texts = ["a" * 40, "b" * 400, "c" * 40]
+    kept = fit_texts(texts, 50)
+    assert kept[0] == texts[0]
+    assert kept[1].startswith("b") and kept[1].endswith(" ...")
+    assert kept[2] == "(+1 more documents omitted)"
+    assert sum(estimate_tokens(text) + 1 for text in kept[:2]) <= 50
+    assert fit_texts(texts, 10_000) == texts
+
+
+def test_unstructured_documents_count_against_the_budget():
+    docs = [doc(f"Policy POL/{i}", policy_number=f"POL/{i}", premium=float(i)) for i in range(3)]
+    docs += [doc("free text " * 500) for _ in range(20)]
+    context = build_context(docs, token_budget=300)
+    assert estimate_tokens(context) <= 300 + 10
+    assert "POL/2" in context
+    assert "more documents omitted" in context
+
+
+def test_unstructured_only():
+    context = build_context([doc("short note"), doc("x" * 10_000)], token_budget=100)
+    assert context.startswith("short note")
+    assert estimate_tokens(context) <= 110
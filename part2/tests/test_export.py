@@ -0,0 +1,59 @@
+import asyncio
+import csv
+import io
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from src.config import settings
+from src.services import export
+from src.services.export import EXPORT_COLUMNS, _last_row_end
+
+
+def test_last_row_end_skips_newlines_inside_quotes():
+    assert _last_row_end(b'a,1\nb,"x\ny"') == 4
+    assert _last_row_end(b'a,1\nb,"x\ny"\n') == len(b'a,1\nb,"x\ny"\n')
+    assert _last_row_end(b'a,"he said ""hi""\n') == 0
+    assert _last_row_end(b'a,"he said ""hi"""\nb') == len(b'a,"he said ""hi"""\n')
+    assert _last_row_end(b'"multi\nline\nname",1') == 0
+    assert _last_row_end(b"no newline") == 0
+
+
+def policy_rows(n):
+    rows = []
+    for i in range(n):
+        row = {column: "" for column in EXPORT_COLUMNS}
+        row.update({
+            "policy_number": f"POL/{i}",
+            "insured_name": f'Insured {i}\nc/o "Broker, Ltd"\n{"x" * (i % 7)}' if i % 3 == 0 else f"Insured {i}",
+            "sum_insured": str(1000.5 * i),
+            "premium": str(10 * i),
+            "insurance_period_start_date": "2024-01-01",
+        })
+        rows.append(row)
+    return rows
+
+
+def test_arrow_export_keeps_rows_with_embedded_newlines(monkeypatch):
+    rows = policy_rows(200)
+    out = io.StringIO()
+    csv.DictWriter(out, EXPORT_COLUMNS, lineterminator="\n").writerows(rows)
+    data = out.getvalue().encode()
+
+    async def copy_chunks(query, args, copy_options):
+        # Postgres chunk boundaries fall anywhere, including inside quoted fields
+        for start in range(0, len(data), 37):
+            yield data[start:start + 37]
+
+    monkeypatch.setattr(export, "_copy_chunks", copy_chunks)
+    monkeypatch.setattr(settings, "EXPORT_ARROW_BATCH_BYTES", 500)
+
+    async def collect():
+        return b"".join([chunk async for chunk in export._stream_arrow("SELECT", [])])
+
+    table = pa.ipc.open_stream(asyncio.run(collect())).read_all()
+    assert table.num_rows == len(rows)
+    assert table.column("policy_number").to_pylist() == [row["policy_number"] for row in rows]
+    assert table.column("insured_name").to_pylist() == [row["insured_name"] for row in rows]
+    assert table.column("sum_insured").to_pylist() == [float(row["sum_insured"]) for row in rows]
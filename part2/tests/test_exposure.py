@@ -0,0 +1,155 @@
+import asyncio
+import random
+from collections import defaultdict
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from src.config import settings
+from src.services import exposure
+from src.services.exposure import (
+    ALL,
+    AMOUNT_COLUMNS,
+    DIMENSIONS,
+    MEASURES,
+    SOURCE_COLUMNS,
+    apply_exposure_deltas,
+    cube_deltas,
+    retention_bands,
+)
+
+
+def random_policy(rng):
+    return {
+        "insurance_period_start_date": rng.choice([None, date(2024, rng.randint(1, 12), rng.randint(1, 28))]),
+        "own_retention_ppn": rng.choice([None, 0.0, 10.0, 25.0, 40.0, 50.0, 75.0, 100.0]),
+        "insured_name": rng.choice([None, "Acme", "Globex", "Initech"]),
+        **{column: round(rng.uniform(0, 1e6), 2) for column in AMOUNT_COLUMNS},
+    }
+
+
+def buckets_of(policy):
+    start = policy["insurance_period_start_date"]
+    ppn = policy["own_retention_ppn"]
+    if ppn is None:
+        band = "unknown"
+    else:
+        band = retention_bands()[min(sum(edge <= ppn for edge in settings.EXPOSURE_RETENTION_BANDS), len(retention_bands()) - 1)]
+    return {
+        "period_month": start.strftime("%Y-%m") if start else "unknown",
+        "retention_band": band,
+        "insured_name": policy["insured_name"] or "Unknown",
+    }
+
+
+def brute_force_cube(book):
+    """What a full rebuild (GROUP BY CUBE over the whole book) produces"""
+    cube = defaultdict(lambda: dict.fromkeys(MEASURES, 0.0))
+    for policy in book.values():
+        keys = buckets_of(policy)
+        for grouping_set in range(1 << len(DIMENSIONS)):
+            key = (grouping_set,) + tuple(keys[dim] if grouping_set & (1 << i) else ALL for i, dim in enumerate(DIMENSIONS))
+            cube[key]["policy_count"] += 1
+            for column in AMOUNT_COLUMNS:
+                cube[key][column] += policy[column]
+    return dict(cube)
+
+
+def apply_to(store, deltas):
+    """_APPLY_DELTA followed by _DROP_EMPTY, on a dict keyed like the table's unique constraint"""
+    for row in deltas:
+        key = (row["grouping_set"],) + tuple(row[dim] for dim in DIMENSIONS)
+        bucket = store.setdefault(key, dict.fromkeys(MEASURES, 0.0))
+        for measure in MEASURES:
+            bucket[measure] += row[measure]
+        if row["policy_count"] < 0 and bucket["policy_count"] <= 0:
+            del store[key]
+
+
+def frame(book, policy_numbers):
+    return pd.DataFrame(
+        [{"policy_number": number, **book[number]} for number in policy_numbers],
+        columns=["policy_number"] + SOURCE_COLUMNS,
+    )
+
+
+def assert_matches(store, book):
+    expected = brute_force_cube(book)
+    assert set(store) == set(expected)
+    for key, measures in expected.items():
+        assert store[key]["policy_count"] == measures["policy_count"]
+        for column in AMOUNT_COLUMNS:
+            assert store[key][column] == pytest.approx(measures[column], rel=1e-9, abs=1e-6)
+
+
+def test_insert_update_delete_deltas_sum_to_rebuild():
+    rng = random.Random(0)
+    book, store = {}, {}
+
+    inserted = {f"POL/{i:04d}": random_policy(rng) for i in range(300)}
+    apply_to(store, cube_deltas(frame(book, []), frame(inserted, inserted)))
+    book.update(inserted)
+    assert_matches(store, book)
+
+    updated_numbers = rng.sample(sorted(book), 120)
+    updated = {number: random_policy(rng) for number in updated_numbers}
+    # A rewrite with identical values must cancel out
+    updated[updated_numbers[0]] = dict(book[updated_numbers[0]])
+    apply_to(store, cube_deltas(frame(book, updated_numbers), frame(updated, updated_numbers)))
+    book.update(updated)
+    assert_matches(store, book)
+
+    deleted_numbers = rng.sample(sorted(book), 80)
+    apply_to(store, cube_deltas(frame(book, deleted_numbers), frame(book, [])))
+    for number in deleted_numbers:
+        del book[number]
+    assert_matches(store, book)
+
+    deleted_numbers = sorted(book)
+    apply_to(store, cube_deltas(frame(book, deleted_numbers), frame(book, [])))
+    assert store == {}
+
+
+def test_unchanged_rewrite_sends_nothing():
+    rng = random.Random(1)
+    book = {f"POL/{i}": random_policy(rng) for i in range(20)}
+    assert cube_deltas(frame(book, book), frame(book, book)) == []
+
+
+class RecordingSession:
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, statement, params=None):
+        self.calls.append((statement, params))
+
+
+def test_apply_exposure_deltas_keeps_stored_values_for_missing_columns():
+    rng = random.Random(2)
+    book = {f"POL/{i:03d}": random_policy(rng) for i in range(50)}
+    store = brute_force_cube(book)
+    before = frame(book, book).set_index("policy_number")
+
+    # Workbook without insured_name and own_retention_ppn, with one new policy
+    written = []
+    for number in rng.sample(sorted(book), 15) + ["POL/NEW"]:
+        stored = book.get(number, {"insured_name": None, "own_retention_ppn": None})
+        policy = {**random_policy(rng), "insurance_period_start_date": date(2025, 1, 1),
+                  "insured_name": stored["insured_name"], "own_retention_ppn": stored["own_retention_ppn"]}
+        book[number] = policy
+        written.append({"policy_number": number,
+                        **{c: v for c, v in policy.items() if c not in ("insured_name", "own_retention_ppn")}})
+
+    session = RecordingSession()
+    changed = asyncio.run(apply_exposure_deltas(session, before, written))
+
+    applied = [row for statement, params in session.calls if statement is exposure._APPLY_DELTA for row in params]
+    dropped = [row for statement, params in session.calls if statement is exposure._DROP_EMPTY for row in params]
+    assert changed == len(applied)
+    emptied = set(store)
+    apply_to(store, applied)
+    emptied -= set(store)
+    assert emptied
+    assert {(row["grouping_set"],) + tuple(row[dim] for dim in DIMENSIONS) for row in dropped} >= emptied
+    assert_matches(store, book)
@@ -0,0 +1,172 @@
+import asyncio
+import copy
+import uuid
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from benchmarks.workbook import generate_workbook
+from src.config import settings
+from src.services import ingestion
+from src.services.exposure import SOURCE_COLUMNS
+from src.services.ingestion import _write_batch, ingest_excel_data, vector_id_for
+
+
+class Result:
+    def __init__(self, rows=(), scalar=None):
+        self.rows = list(rows)
+        self._scalar = scalar
+
+    def all(self):
+        return self.rows
+
+    def scalar(self):
+        return self._scalar
+
+
+class Savepoint:
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        self.saved = copy.deepcopy(self.session.pending)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.session.pending = self.saved
+        return False
+
+
+class FakeSession:
+    """The statements ingestion issues, against dicts; savepoints and commit behave like Postgres"""
+
+    def __init__(self, failing=()):
+        self.committed = {"policies": {}, "outbox": [], "version": 0}
+        self.pending = copy.deepcopy(self.committed)
+        self.failing = set(failing)
+
+    def begin_nested(self):
+        return Savepoint(self)
+
+    async def commit(self):
+        self.committed = copy.deepcopy(self.pending)
+
+    async def rollback(self):
+        self.pending = copy.deepcopy(self.committed)
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        policies = self.pending["policies"]
+        if sql.startswith("SELECT policy_number, content_hash, vector_id"):
+            return Result([
+                (number, policies[number]["content_hash"], policies[number]["vector_id"])
+                for number in params["policy_numbers"] if number in policies
+            ])
+        if sql.startswith(f"SELECT policy_number, {SOURCE_COLUMNS[0]}"):
+            return Result([
+                (number, *(policies[number].get(column) for column in SOURCE_COLUMNS))
+                for number in params["policy_numbers"] if number in policies
+            ])
+        if sql.startswith(f"INSERT INTO {settings.TABLE_NAME}"):
+            rows = params if isinstance(params, list) else [params]
+            for row in rows:
+                if row["policy_number"] in self.failing:
+                    raise ValueError(f"value out of range for {row['policy_number']}")
+                policies[row["policy_number"]] = {**policies.get(row["policy_number"], {}), **row}
+            return Result()
+        if sql.startswith("INSERT INTO vector_outbox"):
+            self.pending["outbox"].extend(params if isinstance(params, list) else [params])
+            return Result()
+        if "table_versions" in sql:
+            self.pending["version"] += 1
+            return Result(scalar=self.pending["version"])
+        # Advisory lock and exposure accumulators
+        return Result()
+
+
+@pytest.fixture(autouse=True)
+def quiet_side_effects(monkeypatch):
+    monkeypatch.setattr(ingestion.period_index, "apply", lambda records, version: None)
+    monkeypatch.setattr(ingestion.outbox_drainer, "notify", lambda: None)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    return open(generate_workbook(str(tmp_path / "policies.xlsx"), 30, seed=1), "rb").read()
+
+
+def policy_numbers(content):
+    book = load_workbook(BytesIO(content), read_only=True)
+    return [row[1] for sheet in book for row in sheet.iter_rows(min_row=2, values_only=True)]
+
+
+def ingest(session, content):
+    return asyncio.run(ingest_excel_data(session, content, "policies.xlsx"))
+
+
+def test_bad_row_falls_back_row_by_row(monkeypatch, workbook):
+    monkeypatch.setattr(settings, "INGEST_BATCH_SIZE", 8)
+    numbers = policy_numbers(workbook)
+    session = FakeSession(failing={numbers[3]})
+
+    result = ingest(session, workbook)
+
+    assert result["failed"] == 1
+    assert result["inserted"] == len(numbers) - 1
+    assert set(session.committed["policies"]) == set(numbers) - {numbers[3]}
+    # The other rows of the failed batch were written individually
+    assert {numbers[i] for i in range(8) if i != 3} <= set(session.committed["policies"])
+    assert {row["policy_number"] for row in session.committed["outbox"]} == set(numbers) - {numbers[3]}
+
+
+def test_write_batch_returns_written_and_failed_rows():
+    session = FakeSession(failing={"B"})
+    records = [{"policy_number": number} for number in "ABC"]
+    written, failed = asyncio.run(_write_batch(session, ingestion._upsert_statement(["policy_number"]), records))
+    assert [record["policy_number"] for record in written] == ["A", "C"]
+    assert [record["policy_number"] for record in failed] == ["B"]
+    assert set(session.pending["policies"]) == {"A", "C"}
+
+
+def test_unchanged_rows_are_skipped_on_reingest(workbook):
+    session = FakeSession()
+    first = ingest(session, workbook)
+    assert first["inserted"] == 30
+    stored = copy.deepcopy(session.committed["policies"])
+    queued = len(session.committed["outbox"])
+
+    second = ingest(session, workbook)
+    assert second["unchanged"] == 30
+    assert second["records_processed"] == 0
+    assert len(session.committed["outbox"]) == queued
+    assert session.committed["policies"] == stored
+
+    book = load_workbook(BytesIO(workbook))
+    book["data_1"]["F2"] = book["data_1"]["F2"].value + 1  # PREMIUM of the first policy
+    changed = BytesIO()
+    book.save(changed)
+    third = ingest(session, changed.getvalue())
+    number = book["data_1"]["B2"].value
+    assert (third["updated"], third["unchanged"]) == (1, 29)
+    assert [row["policy_number"] for row in session.committed["outbox"][queued:]] == [number]
+    assert session.committed["policies"][number]["vector_id"] == stored[number]["vector_id"]
+
+
+def test_vector_id_for_is_deterministic():
+    assert vector_id_for("E/I00000001") == vector_id_for("E/I00000001")
+    assert vector_id_for("E/I00000001") != vector_id_for("E/I00000002")
+    assert uuid.UUID(vector_id_for("E/I00000001")).version == 5
+
+
+def test_existing_vector_id_is_kept(workbook):
+    session = FakeSession()
+    numbers = policy_numbers(workbook)
+    session.committed["policies"][numbers[0]] = {
+        "policy_number": numbers[0], "content_hash": "stale", "vector_id": "legacy-id",
+        **{column: None for column in SOURCE_COLUMNS},
+    }
+    session.pending = copy.deepcopy(session.committed)
+    ingest(session, workbook)
+    assert session.committed["policies"][numbers[0]]["vector_id"] == "legacy-id"
+    assert session.committed["policies"][numbers[1]]["vector_id"] == vector_id_for(numbers[1])
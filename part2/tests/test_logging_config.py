@@ -0,0 +1,43 @@
+import logging
+
+from src.utils import logging_config
+from src.utils.logging_config import CallSiteRateLimitFilter
+
+
+def make_record(name, level=logging.INFO, lineno=10, msg="row"):
+    return logging.LogRecord(name, level, "/app/module.py", lineno, msg, (), None)
+
+
+def passed(log_filter, records):
+    return sum(log_filter.filter(record) for record in records)
+
+
+def test_limits_named_loggers_per_call_site(monkeypatch):
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: 100.0)
+    log_filter = CallSiteRateLimitFilter(3, ["src.services.ingestion"])
+
+    assert passed(log_filter, [make_record("src.services.ingestion", msg=f"row {i}") for i in range(10)]) == 3
+    assert passed(log_filter, [make_record("src.services.ingestion.child") for _ in range(10)]) == 0
+    # Another call site has its own window
+    assert passed(log_filter, [make_record("src.services.ingestion", lineno=20) for _ in range(10)]) == 3
+
+
+def test_other_loggers_and_warnings_always_pass(monkeypatch):
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: 100.0)
+    log_filter = CallSiteRateLimitFilter(3, ["src.services.ingestion"])
+
+    assert passed(log_filter, [make_record("src.routes.query") for _ in range(10)]) == 10
+    assert passed(log_filter, [make_record("src.services.ingestion_extra") for _ in range(10)]) == 10
+    assert passed(log_filter, [make_record("src.services.ingestion", level=logging.WARNING) for _ in range(10)]) == 10
+
+
+def test_next_window_reports_suppressed_count(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+    log_filter = CallSiteRateLimitFilter(2, ["src.services.ingestion"])
+    passed(log_filter, [make_record("src.services.ingestion") for _ in range(5)])
+
+    now[0] = 101.0
+    record = make_record("src.services.ingestion")
+    assert log_filter.filter(record)
+    assert record.suppressed == 3
@@ -0,0 +1,143 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from src.config import settings
+from src.services.period_index import IntervalTree, PolicyPeriodIndex
+
+EPOCH = date(2023, 1, 1)
+
+
+def random_periods(n, seed):
+    rng = random.Random(seed)
+    periods = {}
+    for i in range(n):
+        start = EPOCH + timedelta(days=rng.randrange(0, 900))
+        periods[f"POL/{i:05d}"] = (start, start + timedelta(days=rng.choice([0, 1, 30, 90, 180, 364, 365])))
+    return periods
+
+
+def brute_in_force(periods, low, high):
+    return sorted(name for name, (start, end) in periods.items() if start <= high and end >= low)
+
+
+def brute_expiring(periods, low, high):
+    return sorted(name for name, (_, end) in periods.items() if low <= end <= high)
+
+
+def query_days(seed, n=150):
+    rng = random.Random(seed)
+    return [EPOCH + timedelta(days=rng.randrange(-30, 1300)) for _ in range(n)]
+
+
+@pytest.fixture(autouse=True)
+def no_reload(monkeypatch):
+    # Keep queries on the in-memory snapshot; these tests have no database to check versions against
+    monkeypatch.setattr(settings, "DATA_VERSION_TTL_SECONDS", 1e9)
+
+
+def build_index(periods, version=1):
+    index = PolicyPeriodIndex()
+    index.build(((name, start, end) for name, (start, end) in periods.items()), version)
+    return index
+
+
+def test_interval_tree_matches_brute_force():
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, 1000, 2000)
+    ends = starts + rng.integers(0, 120, 2000)
+    tree = IntervalTree(starts, ends)
+    for point in list(range(-5, 1130, 7)) + [int(starts[0]), int(ends[0])]:
+        expected = np.flatnonzero((starts <= point) & (ends >= point))
+        assert np.array_equal(np.sort(tree.stab(point)), expected)
+    for low in range(-5, 1130, 37):
+        high = low + 20
+        overlap = tree.overlap(low, high)
+        assert len(overlap) == len(set(overlap.tolist()))
+        assert np.array_equal(np.sort(overlap), np.flatnonzero((starts <= high) & (ends >= low)))
+        assert np.array_equal(np.sort(tree.ending(low, high)), np.flatnonzero((ends >= low) & (ends <= high)))
+
+
+def test_empty_tree():
+    tree = IntervalTree(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+    assert len(tree.stab(10)) == 0
+    assert len(tree.overlap(0, 10)) == 0
+
+
+def test_queries_match_brute_force():
+    periods = random_periods(3000, seed=1)
+    index = build_index(periods)
+    for day in query_days(2):
+        assert index.in_force(day) == brute_in_force(periods, day, day)
+        end = day + timedelta(days=30)
+        assert index.overlapping(day, end) == brute_in_force(periods, day, end)
+        assert index.expiring(day, end) == brute_expiring(periods, day, end)
+
+
+def changes(periods, seed):
+    """Ingest-style records: moved periods, new policies and periods cleared to NULL"""
+    rng = random.Random(seed)
+    names = sorted(periods)
+    records = []
+    for name in rng.sample(names, 40):
+        start = EPOCH + timedelta(days=rng.randrange(0, 900))
+        records.append({"policy_number": name, "insurance_period_start_date": start,
+                        "insurance_period_end_date": start + timedelta(days=365)})
+    for i in range(25):
+        start = EPOCH + timedelta(days=rng.randrange(0, 900))
+        records.append({"policy_number": f"NEW/{i:03d}", "insurance_period_start_date": start,
+                        "insurance_period_end_date": start + timedelta(days=90)})
+    for name in rng.sample(names, 10):
+        records.append({"policy_number": name, "insurance_period_start_date": None,
+                        "insurance_period_end_date": None})
+    # Workbook without a period column: the stored period is left as it was
+    records.append({"policy_number": names[0], "premium": 1.0})
+    return records
+
+
+def applied(periods, records):
+    result = dict(periods)
+    for record in records:
+        if "insurance_period_start_date" not in record:
+            continue
+        if record["insurance_period_start_date"] is None:
+            result.pop(record["policy_number"], None)
+        else:
+            result[record["policy_number"]] = (record["insurance_period_start_date"], record["insurance_period_end_date"])
+    return result
+
+
+@pytest.mark.parametrize("max_delta", [10000, 5])
+def test_apply_delta_matches_brute_force(monkeypatch, max_delta):
+    # max_delta 5 forces the rebuild path, 10000 keeps changes in the delta
+    monkeypatch.setattr(settings, "PERIOD_INDEX_MAX_DELTA", max_delta)
+    periods = random_periods(2000, seed=3)
+    index = build_index(periods, version=7)
+    records = changes(periods, seed=4)
+    index.apply(records, 8)
+    expected = applied(periods, records)
+
+    assert index.version == 8
+    assert len(index) == len(expected)
+    for day in query_days(5):
+        end = day + timedelta(days=45)
+        assert index.in_force(day) == brute_in_force(expected, day, day)
+        assert index.overlapping(day, end) == brute_in_force(expected, day, end)
+        assert index.expiring(day, end) == brute_expiring(expected, day, end)
+
+    # A second ingest on top of the first delta
+    more = changes(expected, seed=6)
+    index.apply(more, 9)
+    expected = applied(expected, more)
+    for day in query_days(7, n=50):
+        assert index.overlapping(day, day + timedelta(days=10)) == brute_in_force(expected, day, day + timedelta(days=10))
+
+
+def test_apply_skips_when_another_writer_got_in_between():
+    periods = random_periods(100, seed=8)
+    index = build_index(periods, version=3)
+    index.apply(changes(periods, seed=9), 5)
+    assert index.version == 3
+    assert index._checked_at == 0.0
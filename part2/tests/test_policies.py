@@ -0,0 +1,109 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from src.schemas import InsurancePolicy
+from src.services import policies
+
+
+def test_lookups_select_only_schema_fields():
+    names = {policies._FIELD_NAMES.get(column.name, column.name) for column in policies._COLUMNS}
+    assert names == set(InsurancePolicy.model_fields)
+    assert "content_hash" not in {column.name for column in policies._COLUMNS}
+
+
+class FakeRow:
+    def __init__(self, values):
+        self._mapping = values
+
+
+class FakeSession:
+    def __init__(self, values):
+        self.values = values
+        self.executed = 0
+
+    async def execute(self, statement, params=None):
+        self.executed += 1
+        values = self.values
+
+        class Result:
+            def first(self):
+                return FakeRow(values) if values is not None else None
+
+        return Result()
+
+
+def stored_policy(policy_number="POL/1", **overrides):
+    row = {column.name: None for column in policies._COLUMNS}
+    row.update({
+        "policy_number": policy_number, "insured_name": "Acme", "sum_insured": 1000.0, "premium": 10.0,
+        "own_retention_ppn": 40.0, "own_retention_sum_insured": 400.0, "own_retention_premium": 4.0,
+        "treaty_retention_ppn": 60.0, "treaty_sum_insured": 600.0, "treaty_premium": 6.0,
+        "insurance_period_start_date": datetime(2024, 1, 1), "insurance_period_end_date": datetime(2024, 12, 31),
+        "validation_flags": 0,
+    })
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def data_version(monkeypatch):
+    current = {"version": "insurance_policies:1"}
+
+    async def read(session):
+        return current["version"]
+
+    monkeypatch.setattr(policies, "data_version_async", read)
+    policies.policy_cache.clear()
+    return current
+
+
+def test_policy_json_is_serialized_through_the_schema(data_version):
+    payload = asyncio.run(policies.get_policy_json(FakeSession(stored_policy()), "POL/1"))
+    policy = InsurancePolicy.model_validate_json(payload)
+    assert policy.treaty_ppn == 60.0
+    assert json.loads(payload)["insurance_period_start_date"] == "2024-01-01T00:00:00"
+    assert asyncio.run(policies.get_policy_json(FakeSession(None), "POL/2")) is None
+
+
+def test_policy_missing_required_fields_is_rejected(data_version):
+    with pytest.raises(ValidationError):
+        asyncio.run(policies.get_policy_json(FakeSession(stored_policy(sum_insured=None)), "POL/1"))
+
+
+def test_cache_serves_until_the_data_version_changes(data_version):
+    session = FakeSession(stored_policy(premium=10.0))
+    assert json.loads(asyncio.run(policies.get_policy_json(session, "POL/1")))["premium"] == 10.0
+    session.values = stored_policy(premium=20.0)
+    assert json.loads(asyncio.run(policies.get_policy_json(session, "POL/1")))["premium"] == 10.0
+    assert session.executed == 1
+
+    data_version["version"] = "insurance_policies:2"
+    assert json.loads(asyncio.run(policies.get_policy_json(session, "POL/1")))["premium"] == 20.0
+    assert session.executed == 2
+
+
+def test_lookup_racing_an_ingest_does_not_pin_the_old_row(data_version):
+    class IngestDuringRead(FakeSession):
+        async def execute(self, statement, params=None):
+            result = await super().execute(statement, params)
+            # The ingest commits after this lookup read the version but before it caches the row
+            data_version["version"] = "insurance_policies:2"
+            self.values = stored_policy(premium=20.0)
+            return result
+
+    session = IngestDuringRead(stored_policy(premium=10.0))
+    assert json.loads(asyncio.run(policies.get_policy_json(session, "POL/1")))["premium"] == 10.0
+    assert json.loads(asyncio.run(policies.get_policy_json(session, "POL/1")))["premium"] == 20.0
+
+
+def test_no_caching_without_a_data_version(data_version):
+    data_version["version"] = None
+    session = FakeSession(stored_policy())
+    asyncio.run(policies.get_policy_json(session, "POL/1"))
+    asyncio.run(policies.get_policy_json(session, "POL/1"))
+    assert session.executed == 2
+    assert len(policies.policy_cache) == 0
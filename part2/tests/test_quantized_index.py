@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from benchmarks.quantized_index import QuantizedVectorIndex, evaluate_recall
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((800, 32)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("codec", ["int8", "pq"])
+def test_save_load_round_trip(tmp_path, vectors, codec):
+    ids = [f"POL/{i}" for i in range(len(vectors))]
+    index = QuantizedVectorIndex(32, codec, n_subspaces=8)
+    index.build(ids, vectors, [{"policy_number": policy_number} for policy_number in ids])
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    loaded = QuantizedVectorIndex.load(path, 32, codec, n_subspaces=8)
+    assert loaded.ids == ids
+    assert loaded.metadata[7] == {"policy_number": "POL/7"}
+    assert np.array_equal(loaded.codes, index.codes)
+    for name, state in loaded._quantizer_state().items():
+        assert state.dtype == np.float32
+        assert np.array_equal(state, index._quantizer_state()[name])
+    for query in vectors[:20]:
+        assert loaded.search(query, 5) == index.search(query, 5)
+
+
+def test_load_rejects_another_codec(tmp_path, vectors):
+    index = QuantizedVectorIndex(32, "int8")
+    index.build([str(i) for i in range(len(vectors))], vectors)
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    with pytest.raises(ValueError):
+        QuantizedVectorIndex.load(path, 32, "pq", n_subspaces=8)
+
+
+def test_rescoring_recovers_recall(tmp_path, vectors):
+    index = QuantizedVectorIndex(32, "int8", full_precision_path=str(tmp_path / "full.npy"))
+    index.build([str(i) for i in range(len(vectors))], vectors)
+    assert evaluate_recall(index, vectors, vectors[:50], k=10) == 1.0
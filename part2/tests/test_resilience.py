@@ -0,0 +1,119 @@
+import pytest
+
+from src.utils import resilience
+from src.utils.resilience import CircuitBreaker, CircuitOpenError, RemoteDependency
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience, "time", fake)
+    return fake
+
+
+def test_breaker_opens_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker("test_threshold", failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("test_reset_count", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_closed_open_half_open_closed(clock):
+    breaker = CircuitBreaker("test_cycle", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 29.9
+    assert not breaker.allow()
+
+    clock.now += 0.1
+    assert breaker.allow()  # the single probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # no second caller while the probe is out
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker("test_probe_fails", failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_call_retries_retryable_errors_then_short_circuits(clock, monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt, base, maximum: 0.0)
+    dependency = RemoteDependency(
+        "test_dependency", attempt_timeout=5, deadline=60, max_attempts=3,
+        breaker=CircuitBreaker("test_dependency", failure_threshold=3, reset_timeout=30),
+    )
+    calls = []
+
+    def unavailable():
+        calls.append(1)
+        raise HTTPError(503)
+
+    with pytest.raises(HTTPError):
+        dependency.call(unavailable)
+    assert len(calls) == 3
+    assert dependency.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        dependency.call(unavailable)
+    assert len(calls) == 3
+
+
+def test_client_errors_are_not_retried_and_do_not_trip_the_breaker(clock):
+    dependency = RemoteDependency(
+        "test_client_error", attempt_timeout=5, deadline=60, max_attempts=3,
+        breaker=CircuitBreaker("test_client_error", failure_threshold=1, reset_timeout=30),
+    )
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise HTTPError(400)
+
+    with pytest.raises(HTTPError):
+        dependency.call(bad_request)
+    assert len(calls) == 1
+    assert dependency.breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.config import settings
+from src.services import sql_cache
+from src.services.sql_cache import CachedSQLDatabase, forget_data_version, is_read_only, normalize_sql
+
+TOTAL = "SELECT SUM(premium) FROM insurance_policies"
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """SQLite stand-in for Postgres holding the policy table and table_versions"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'policies.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE insurance_policies (policy_number TEXT PRIMARY KEY, premium REAL)"))
+        connection.execute(text(
+            "CREATE TABLE table_versions (table_name TEXT PRIMARY KEY, version INTEGER, updated_at TEXT)"
+        ))
+        connection.execute(text("INSERT INTO insurance_policies VALUES ('POL/1', 10.0), ('POL/2', 20.0)"))
+        connection.execute(text("INSERT INTO table_versions VALUES ('insurance_policies', 1, '')"))
+    monkeypatch.setattr(sql_cache, "sync_engine", engine)
+    # SQLite spelling of the string_agg version query
+    monkeypatch.setattr(sql_cache, "_DATA_VERSION_QUERY", text(
+        "SELECT COALESCE(group_concat(table_name || ':' || version, ','), '') "
+        "FROM (SELECT * FROM table_versions ORDER BY table_name)"
+    ))
+    monkeypatch.setattr(settings, "DATA_VERSION_TTL_SECONDS", 3600.0)
+    sql_cache.sql_result_cache.clear()
+    sql_cache.nl2sql_cache.clear()
+    forget_data_version()
+    yield engine
+    forget_data_version()
+
+
+def write(engine, sql, bump=False):
+    with engine.begin() as connection:
+        connection.execute(text(sql))
+        if bump:
+            connection.execute(text("UPDATE table_versions SET version = version + 1"))
+
+
+def test_results_are_cached_until_the_version_is_bumped(engine):
+    database = CachedSQLDatabase(engine=engine)
+    assert database.run(TOTAL) == "[(30.0,)]"
+
+    # A write that bypasses ingestion (no bump) is not seen until the version moves
+    write(engine, "INSERT INTO insurance_policies VALUES ('POL/3', 5.0)")
+    assert database.run(TOTAL) == "[(30.0,)]"
+
+    write(engine, "INSERT INTO insurance_policies VALUES ('POL/4', 1.0)", bump=True)
+    assert database.run(TOTAL) == "[(30.0,)]"  # this worker has not re-read the version yet
+    forget_data_version()
+    assert database.run(TOTAL) == "[(36.0,)]"
+
+
+def test_other_workers_see_the_bump_after_the_version_ttl(engine, monkeypatch):
+    database = CachedSQLDatabase(engine=engine)
+    assert database.run(TOTAL) == "[(30.0,)]"
+    write(engine, "INSERT INTO insurance_policies VALUES ('POL/3', 5.0)", bump=True)
+    monkeypatch.setattr(settings, "DATA_VERSION_TTL_SECONDS", 0.0)
+    assert database.run(TOTAL) == "[(35.0,)]"
+
+
+def test_statements_differing_only_in_whitespace_share_an_entry(engine):
+    database = CachedSQLDatabase(engine=engine)
+    database.run(TOTAL)
+    write(engine, "INSERT INTO insurance_policies VALUES ('POL/3', 5.0)")
+    assert database.run("SELECT  SUM(premium)\n FROM insurance_policies;") == "[(30.0,)]"
+    assert normalize_sql("SELECT 'a  b'  FROM t;") == "SELECT 'a  b' FROM t"
+
+
+def test_writes_are_never_cached(engine):
+    assert not is_read_only("DELETE FROM insurance_policies")
+    assert not is_read_only("SELECT 1; DROP TABLE insurance_policies")
+    assert not is_read_only("WITH gone AS (DELETE FROM insurance_policies RETURNING *) SELECT * FROM gone")
+    assert is_read_only("WITH t AS (SELECT 1) SELECT * FROM t")
+
+
+def test_unavailable_version_bypasses_the_cache(engine):
+    database = CachedSQLDatabase(engine=engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE table_versions"))
+    forget_data_version()
+    assert database.run(TOTAL) == "[(30.0,)]"
+    write(engine, "INSERT INTO insurance_policies VALUES ('POL/3', 5.0)")
+    assert database.run(TOTAL) == "[(35.0,)]"
+
+
+def test_nl2sql_entries_are_dropped_when_the_schema_changes(engine, monkeypatch):
+    schema = {"version": "schema-a"}
+    monkeypatch.setattr(sql_cache, "schema_version", lambda: schema["version"])
+    sql_cache.store_sql("Total premium?", TOTAL)
+    sql_cache.store_sql("Delete everything", "DELETE FROM insurance_policies")
+    assert sql_cache.get_cached_sql("total  premium") == TOTAL
+    assert sql_cache.get_cached_sql("Delete everything") is None
+    schema["version"] = "schema-b"
+    assert sql_cache.get_cached_sql("Total premium?") is None
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.validation import (
+    SPLIT_MISSING_TOTAL,
+    SPLIT_OUT_OF_RANGE,
+    SPLIT_PPN_TOTAL,
+    SPLIT_PREMIUM_SHARE,
+    SPLIT_PREMIUM_TOTAL,
+    SPLIT_SUM_INSURED_SHARE,
+    SPLIT_SUM_INSURED_TOTAL,
+    check_reinsurance_splits,
+    split_violation_names,
+    summarize_split_violations,
+)
+
+TOLERANCES = {"ppn_tolerance": 0.01, "rel_tolerance": 1e-4, "abs_tolerance": 1.0}
+
+
+def split_row(own=(40, 400, 40), treaty=(60, 600, 60), facultative=None, sum_insured=1000.0, premium=100.0):
+    row = {
+        "policy_number": "POL/1",
+        "sum_insured": sum_insured,
+        "premium": premium,
+        "own_retention_ppn": own[0], "own_retention_sum_insured": own[1], "own_retention_premium": own[2],
+        "treaty_retention_ppn": treaty[0], "treaty_sum_insured": treaty[1], "treaty_premium": treaty[2],
+    }
+    if facultative is not None:
+        row.update({
+            "facultative_outward_ppn": facultative[0],
+            "facultative_outward_sum_insured": facultative[1],
+            "facultative_outward_premium": facultative[2],
+        })
+    return row
+
+
+@pytest.mark.parametrize("row, expected", [
+    (split_row(), 0),
+    (split_row(own=(30, 300, 30), treaty=(60, 600, 60), facultative=(10, 100, 10)), 0),
+    # Within tolerance: PPN rounding and a fraction of a currency unit
+    (split_row(own=(40.005, 400.5, 40), treaty=(60, 600, 60)), 0),
+    # Shares only cover 90% of the risk
+    (split_row(own=(30, 300, 30)), SPLIT_PPN_TOTAL | SPLIT_SUM_INSURED_TOTAL | SPLIT_PREMIUM_TOTAL),
+    # Totals add up but the sum insured is not split by PPN
+    (split_row(own=(40, 500, 40), treaty=(60, 500, 60)), SPLIT_SUM_INSURED_SHARE),
+    # Premium share of the treaty typed into the wrong column
+    (split_row(treaty=(60, 600, 6)), SPLIT_PREMIUM_TOTAL | SPLIT_PREMIUM_SHARE),
+    # Consistent split, but a negative share
+    (split_row(own=(110, 1100, 110), treaty=(-10, -100, -10)), SPLIT_OUT_OF_RANGE),
+    (split_row(premium=np.nan), SPLIT_MISSING_TOTAL),
+])
+def test_known_rows(row, expected):
+    codes = check_reinsurance_splits(pd.DataFrame([row]), **TOLERANCES)
+    assert codes.dtype == np.uint8
+    assert int(codes[0]) == expected
+
+
+def test_blank_and_text_cells():
+    df = pd.DataFrame([
+        split_row(facultative=(None, None, None)),
+        split_row(own=("40", "400", "40")),
+        split_row(own=("n/a", 400, 40)),
+    ])
+    codes = check_reinsurance_splits(df, **TOLERANCES)
+    assert codes[0] == 0
+    assert codes[1] == 0
+    # An unreadable PPN counts as 0, so only 60% of the risk is placed and the own share looks wrong
+    assert codes[2] == SPLIT_PPN_TOTAL | SPLIT_SUM_INSURED_SHARE | SPLIT_PREMIUM_SHARE
+
+
+def test_default_tolerances_come_from_settings():
+    df = pd.DataFrame([split_row(), split_row(own=(30, 300, 30))])
+    assert np.array_equal(check_reinsurance_splits(df), check_reinsurance_splits(df, **TOLERANCES))
+
+
+def test_summary_and_names():
+    df = pd.DataFrame([split_row(), split_row(own=(30, 300, 30)), split_row(premium=None), split_row(treaty=(60, 600, 6))])
+    codes = check_reinsurance_splits(df, **TOLERANCES)
+    assert summarize_split_violations(codes) == {
+        "ppn_total": 1,
+        "sum_insured_total": 1,
+        "premium_total": 2,
+        "premium_share": 1,
+        "missing_total": 1,
+    }
+    assert split_violation_names(int(codes[0])) == []
+    assert split_violation_names(int(codes[1])) == ["ppn_total", "sum_insured_total", "premium_total"]
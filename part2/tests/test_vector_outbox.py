@@ -0,0 +1,163 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.config import settings
+from src.services import vector_outbox
+from src.services.vector_outbox import OutboxDrainer
+
+
+class Result:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    def all(self):
+        return self.rows
+
+
+class FakeOutbox:
+    """vector_outbox and insurance_policies.content_hash in memory, with a controllable clock.
+
+    The claim follows _CLAIM: due pending rows, plus processing rows whose lease has expired.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.rows = {}
+        self.hashes = {}
+
+    def add(self, policy_number, content_hash, **fields):
+        row_id = len(self.rows) + 1
+        self.rows[row_id] = {
+            "id": row_id, "policy_number": policy_number, "vector_id": f"vec-{policy_number}",
+            "content_hash": content_hash, "attempts": 0, "status": "pending", "available_at": self.now,
+            "claimed_at": None, "last_error": None,
+            "payload": json.dumps({"text": f"{policy_number} {content_hash}", "metadata": {}}),
+            **fields,
+        }
+        self.hashes[policy_number] = content_hash
+        return row_id
+
+    def status(self, row_id):
+        return self.rows[row_id]["status"]
+
+    def execute(self, statement, params):
+        sql = " ".join(str(statement).split())
+        if statement is vector_outbox._CLAIM:
+            due = [
+                row for row in sorted(self.rows.values(), key=lambda row: row["id"])
+                if (row["status"] == "pending" and row["available_at"] <= self.now)
+                or (row["status"] == "processing" and row["claimed_at"] < self.now - params["lease"])
+            ][:params["limit"]]
+            for row in due:
+                row.update(status="processing", claimed_at=self.now, attempts=row["attempts"] + 1)
+            return Result([SimpleNamespace(**row) for row in due])
+        if sql.startswith("SELECT policy_number, content_hash"):
+            return Result([(number, self.hashes.get(number)) for number in params["numbers"]])
+        if "SET content_hash = NULL" in sql:
+            if self.hashes.get(params["policy_number"]) == params["content_hash"]:
+                self.hashes[params["policy_number"]] = None
+            return Result()
+        for status in ("superseded", "done", "failed"):
+            if f"SET status = '{status}'" in sql:
+                for row_id in params["ids"]:
+                    self.rows[row_id].update(status=status, last_error=params.get("error"))
+                return Result()
+        if "SET status = 'pending'" in sql:
+            self.rows[params["id"]].update(
+                status="pending", last_error=params["error"], available_at=self.now + params["delay"]
+            )
+            return Result()
+        raise AssertionError(f"Unexpected statement: {sql}")
+
+
+class FakeSession:
+    def __init__(self, outbox):
+        self.outbox = outbox
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        return self.outbox.execute(statement, params)
+
+    async def commit(self):
+        pass
+
+
+class FakePinecone:
+    def __init__(self):
+        self.upserted = []
+        self.error = None
+
+    async def upsert_batch(self, items):
+        if self.error:
+            raise RuntimeError(self.error)
+        self.upserted.extend(items)
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    fake = FakeOutbox()
+    monkeypatch.setattr(vector_outbox, "AsyncSessionLocal", lambda: FakeSession(fake))
+    monkeypatch.setattr(settings, "OUTBOX_LEASE_SECONDS", 30.0)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 3)
+    return fake
+
+
+@pytest.fixture
+def drainer():
+    drainer = OutboxDrainer()
+    drainer._client = FakePinecone()
+    return drainer
+
+
+def drain(drainer):
+    return asyncio.run(drainer.drain_pending())
+
+
+def test_superseded_rows_are_not_upserted(outbox, drainer):
+    old = outbox.add("POL/1", "hash-1")
+    new = outbox.add("POL/1", "hash-2")  # a later ingest changed the policy again
+    other = outbox.add("POL/2", "hash-3")
+
+    assert drain(drainer) == 3
+    assert outbox.status(old) == "superseded"
+    assert (outbox.status(new), outbox.status(other)) == ("done", "done")
+    assert [text for _, text, _ in drainer._client.upserted] == ["POL/1 hash-2", "POL/2 hash-3"]
+
+
+def test_row_of_a_dead_claimer_is_reclaimed_after_the_lease(outbox, drainer):
+    outbox.now = 100.0
+    stuck = outbox.add("POL/1", "hash-1", status="processing", claimed_at=80.0, attempts=1)
+
+    assert drain(drainer) == 0  # still leased to the other worker
+    assert outbox.status(stuck) == "processing"
+
+    outbox.now = 111.0
+    assert drain(drainer) == 1
+    assert outbox.status(stuck) == "done"
+    assert outbox.rows[stuck]["attempts"] == 2
+    assert [vector_id for vector_id, _, _ in drainer._client.upserted] == ["vec-POL/1"]
+
+
+def test_failed_batches_back_off_then_give_up(outbox, drainer):
+    drainer._client.error = "pinecone unavailable"
+    row = outbox.add("POL/1", "hash-1")
+
+    for attempt in range(1, settings.OUTBOX_MAX_ATTEMPTS):
+        assert drain(drainer) == 1
+        assert outbox.status(row) == "pending"
+        assert drain(drainer) == 0  # not due until the backoff has passed
+        outbox.now = outbox.rows[row]["available_at"]
+
+    assert drain(drainer) == 1
+    assert outbox.status(row) == "failed"
+    assert outbox.rows[row]["last_error"] == "pinecone unavailable"
+    # The policy's fingerprint is cleared so the next ingest queues it again
+    assert outbox.hashes["POL/1"] is None